@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import os
 import Interpreter
 from Compiler import Compiler
@@ -14,8 +15,22 @@ def process_args():
     parser.add_argument("--run", "-r", action="store_true", help="Run the Brainfuck file after compilation")
     parser.add_argument("--minify", "-m", action="store_true", help="Minifies the compiled code")
     parser.add_argument("--optimize", "-opt", action="store_true", help="syntax optimization")
+    parser.add_argument("--source-map", "-s", action="store_true",
+                        help="Also write which source lines each part of the Brainfuck file came from, "
+                             "to the output file with a .map suffix (for Interpreter.py --profile)")
+    parser.add_argument("--hints", action="store_true",
+                        help="Mark the code of divisions, multiplications and array accesses, so that Interpreter.py "
+                             "performs them natively (other interpreters ignore the marks)")
+    parser.add_argument("--backend", choices=["interpreter", "python", "c", "jit", "cpp"], default="interpreter",
+                        help="How to run the Brainfuck file (with --run): interpret it, translate it to Python or C first, "
+                             "compile it to x86-64 machine code, or run it with the C++ interpreter (interpreter/, for "
+                             "compatibility: it isn't faster than interpreting)")
 
     args = parser.parse_args()
+    if args.source_map and args.minify:
+        parser.error("--source-map can't be used with --minify (minifying moves the code around)")
+    if args.hints and args.minify:
+        parser.error("--hints can't be used with --minify (minifying changes the marked code)")
 
     input_file = args.filepath[0]
     if args.output:
@@ -27,18 +42,26 @@ def process_args():
     run_file = args.run
     minify_file = args.minify
     optimize = args.optimize
+    backend = args.backend
+    source_map = args.source_map
+    hints = args.hints
 
-    return input_file, output_file, run_file, minify_file, optimize
+    return input_file, output_file, run_file, minify_file, optimize, backend, source_map, hints
 
 
 def compile_file():
-    input_file, output_file, run_file, minify_bf_code, optimize_code = process_args()
+    input_file, output_file, run_file, minify_bf_code, optimize_code, backend, write_source_map, hints = process_args()
     print("Compiling file '%s'..." % input_file)
 
     with open(input_file, "rb") as f:
         code = f.read().decode("utf8")
 
-    brainfuck_code = Compiler.compile(code, optimize_code)
+    if write_source_map:
+        brainfuck_code, source_map = Compiler.compile_with_source_map(code, optimize_code, hints)
+        with open(output_file + ".map", "wt") as f:
+            json.dump({"source": input_file, "segments": source_map}, f)
+    else:
+        brainfuck_code = Compiler.compile(code, optimize_code, hints)
     brainfuck_code += "\n"
 
     if minify_bf_code:
@@ -51,7 +74,10 @@ def compile_file():
 
     if run_file:
         print("Running compiled code...")
-        Interpreter.brainfuck(brainfuck_code)
+        try:
+            Interpreter.brainfuck(brainfuck_code, backend=backend)
+        except Interpreter.InfiniteLoop as error:
+            print("\n%s" % error)
 
 
 if __name__ == '__main__':
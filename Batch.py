@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import io
+import sys
+import json
+import argparse
+import concurrent.futures
+
+from Engine import VM, load_program, get_error_message, add_execution_arguments
+from Lockstep import LockstepVM
+
+"""
+This file implements the batch runner: many programs run with many input vectors, spread over worker processes
+(see batch). it's also the batch command, Interpreter.py batch (or this file run directly)
+"""
+
+WORKER_PROGRAMS = dict()  # the programs a worker process prepared, see run_batch_job
+
+
+def run_batch_job(path, input_index, input, options):
+    # runs the program in the given file with one input vector, in a batch worker process (see batch)
+    # the program is prepared on the first job that needs it, and reused by the worker's next jobs
+    # returns the result of the run, see batch
+
+    key = (path, options["bits"], options["backend"], options["cache"])
+    result = {"file": path, "input": input_index, "exit_status": 0, "error": None}
+    output = io.BytesIO()
+    vm = VM(options["negative_pointer"], options["eof"], options["max_steps"], options["timeout"],
+            options["max_cells"], options["max_output"])
+    try:
+        if key not in WORKER_PROGRAMS:
+            WORKER_PROGRAMS[key] = load_program(*key)
+        vm.run(WORKER_PROGRAMS[key], input, output, options["stats"])
+    except Exception as error:
+        result["exit_status"] = 1
+        result["error"] = get_error_message(error)
+    result["output"] = output.getvalue().decode("latin-1")
+    result["stats"] = vm.stats
+    return result
+
+
+def run_lockstep_job(path, inputs, options):
+    # runs the program in the given file with all the input vectors at once (see LockstepVM), in a batch worker process
+    # returns the results of the runs, see batch
+
+    results = [{"file": path, "input": input_index, "exit_status": 0, "error": None, "output": "", "stats": None}
+               for input_index in range(len(inputs))]
+    try:
+        vm = LockstepVM(options["negative_pointer"], options["eof"], options["max_steps"])
+        outputs = vm.run(load_program(path, options["bits"], cache=options["cache"]), inputs)
+    except Exception as error:
+        for result in results:
+            result["exit_status"] = 1
+            result["error"] = get_error_message(error)
+        return results
+    for result, output, error in zip(results, outputs, vm.errors):
+        result["output"] = output.decode("latin-1")
+        if error is not None:
+            result["exit_status"] = 1
+            result["error"] = error
+    return results
+
+
+def batch(paths, inputs=(b"",), workers=None, bits=8, negative_pointer="grow", eof="0", backend="interpreter",
+          max_steps=None, timeout=None, max_cells=None, max_output=None, stats=False, lockstep=False, cache=False):
+    # runs every program file in paths (Brainfuck, or C-like .code files) with every input vector in inputs (bytes),
+    # spread over workers processes (defaults to one per CPU). every worker prepares each program once
+    # lockstep runs each program with all the inputs at once instead (see LockstepVM, it needs NumPy),
+    # one program per worker. it supports only the max_steps limit, and no stats
+    # the other arguments are like brainfuck's
+    # yields the result of each run as soon as it ends (not in order), a dictionary of:
+    #   file, input - the path of the program and the index of the input vector
+    #   exit_status - 0 when the program ended normally, 1 when it failed (error is then its error message)
+    #   output - what the program wrote, as a string of the output bytes' code points (the bytes decoded as latin-1)
+    #   stats - the run's execution statistics (see Stats), when asked for with stats
+
+    options = {"bits": bits, "negative_pointer": negative_pointer, "eof": eof, "backend": backend,
+               "max_steps": max_steps, "timeout": timeout, "max_cells": max_cells, "max_output": max_output,
+               "stats": stats, "cache": cache}
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        if lockstep:
+            futures = [executor.submit(run_lockstep_job, path, inputs, options) for path in paths]
+            for future in concurrent.futures.as_completed(futures):
+                yield from future.result()
+            return
+        futures = [executor.submit(run_batch_job, path, input_index, input, options)
+                   for path in paths for input_index, input in enumerate(inputs)]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def batch_main(arguments, prog=None):
+    # the batch command: runs program files with input vectors (see batch), and prints a JSON line per run
+    # prog is the command's name in the usage message (defaults to this file's)
+    # returns the exit code: 1 if any run failed
+
+    parser = argparse.ArgumentParser(prog=prog,
+                                     description="Run every program with every input, in parallel processes, "
+                                                 "and print the result of each run as a line of JSON")
+    parser.add_argument("filepaths", nargs="+", metavar="filepath",
+                        help="Brainfuck files, or C-like .code files (compiled first)")
+    parser.add_argument("--input", "-i", action="append", default=list(), metavar="TEXT",
+                        help="An input vector (can be given many times)")
+    parser.add_argument("--input-file", action="append", default=list(), metavar="FILE",
+                        help="A file whose content is an input vector (can be given many times)")
+    parser.add_argument("--workers", "-j", type=int, help="Amount of worker processes (defaults to the CPU count)")
+    add_execution_arguments(parser)
+    parser.add_argument("--stats", action="store_true", help="Include execution statistics in the results")
+    parser.add_argument("--lockstep", action="store_true",
+                        help="Run each program with all the inputs at once, with vectorized operations "
+                             "(needs NumPy, supports only the --max-steps limit)")
+    args = parser.parse_args(arguments)
+    if args.lockstep and (args.stats or args.timeout or args.max_cells or args.max_output):
+        parser.error("--lockstep supports only the --max-steps limit, and no --stats")
+
+    inputs = [text.encode() for text in args.input]
+    for path in args.input_file:
+        with open(path, 'rb') as f:
+            inputs.append(f.read())
+
+    exit_code = 0
+    for result in batch(args.filepaths, inputs or [b""], args.workers, args.bits, args.negative_pointer, args.eof,
+                        args.backend, args.max_steps, args.timeout, args.max_cells, args.max_output, args.stats,
+                        args.lockstep, not args.no_cache):
+        print(json.dumps(result), flush=True)
+        exit_code = max(exit_code, result["exit_status"])
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(batch_main(sys.argv[1:]))
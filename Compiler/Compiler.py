@@ -1,14 +1,16 @@
 #!/usr/bin/env python3
 from .Exceptions import BFSyntaxError, BFSemanticError
 from .FunctionCompiler import FunctionCompiler
-from .Functions import check_function_exists, get_function_object, insert_function_object
+from .Functions import check_function_exists, get_function_object, insert_function_object, clear_functions
 from .General import is_token_literal, get_literal_token_code, unpack_literal_tokens_to_array_dimensions
-from .Globals import get_global_variables_size, get_variable_size, get_variable_dimensions, insert_global_variable, create_variable_from_definition
+from .Globals import get_global_variables_size, get_variable_size, get_variable_dimensions, insert_global_variable, create_variable_from_definition, clear_global_variables
 from .Lexical_analyzer import analyze
 from .Optimizer import optimize
 from .LibraryFunctionCompiler import insert_library_functions
 from .Parser import Parser
 from .Token import Token
+from . import SourceMap
+from . import Hints
 
 """
 This file is responsible for creating FunctionCompiler objects and global variables objects
@@ -139,6 +141,9 @@ class Compiler:
         return code
 
     def compile(self):
+        # start from a clean slate, in case an earlier program was compiled in this process
+        clear_functions()
+        clear_global_variables()
         insert_library_functions()
         code = self.process_global_definitions()  # code that initializes global variables and advances pointer to after them
 
@@ -148,17 +153,38 @@ class Compiler:
         return code
 
 
-def compile(code, optimize_code=False):
+def compile(code, optimize_code=False, hints=False):
     """
     :param code:  C-like code (string)
     :param optimize_code:  syntax optimization (bool)
+    :param hints:  mark the code of slow operations for the interpreter (bool, see Hints.py)
     :return code:  Brainfuck code (string)
     """
-    compiler = Compiler(code, optimize_code)
-    brainfuck_code = compiler.compile()
+    if hints:
+        Hints.enable()
+    try:
+        compiler = Compiler(code, optimize_code)
+        brainfuck_code = compiler.compile()
+    finally:
+        Hints.disable()
     return brainfuck_code
 
 
+def compile_with_source_map(code, optimize_code=False, hints=False):
+    """
+    :param code:  C-like code (string)
+    :param optimize_code:  syntax optimization (bool)
+    :param hints:  mark the code of slow operations for the interpreter (bool, see Hints.py)
+    :return (code, source_map):  Brainfuck code (string) and which source lines it came from (see SourceMap.py)
+    """
+    SourceMap.enable()
+    try:
+        brainfuck_code = compile(code, optimize_code, hints)
+    finally:
+        SourceMap.disable()
+    return SourceMap.extract(brainfuck_code)
+
+
 if __name__ == '__main__':
     print("This file cannot be directly run")
     print("Please import it and use the 'compile' function")
@@ -7,6 +7,7 @@ from .General import get_literal_token_value, process_switch_cases, is_token_lit
 from .Globals import create_variable_from_definition, get_global_variables, get_variable_size, is_variable_array
 from .Node import NodeToken, NodeTernary, NodeArraySetElement, NodeUnaryPrefix, NodeUnaryPostfix, NodeArrayGetElement, NodeFunctionCall, NodeArrayAssignment
 from .Parser import Parser
+from .SourceMap import mark
 from .Token import Token
 
 """
@@ -86,7 +87,7 @@ class FunctionCompiler:
         self.set_stack_pointer(current_stack_pointer+1)  # make room for return_value cell. next available cell is the next one after it.
         function_code = self.compile_function_scope(self.parameters)
         self.remove_ids_map()  # Global variables
-        return function_code
+        return mark(function_code, "function", self.name, self.tokens[0].line)
 
     # =================
     # helper functions
@@ -1036,6 +1037,11 @@ class FunctionCompiler:
         return code
 
     def compile_statement(self, allow_declaration=True):
+        # returns code that performs the current statement, marked with its line for the source map
+        token = self.parser.current_token()
+        return mark(self.compile_statement_code(allow_declaration), "statement", self.name, token.line)
+
+    def compile_statement_code(self, allow_declaration=True):
         # returns code that performs the current statement
         # at the end, the pointer points to the same location it pointed before the statement was executed
 
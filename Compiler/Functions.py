@@ -8,6 +8,10 @@ def insert_function_object(function):
     functions[function.name] = function
 
 
+def clear_functions():
+    functions.clear()
+
+
 def get_function_object(name):
     """
     must return a copy of the function
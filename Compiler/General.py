@@ -1,5 +1,6 @@
 from .Exceptions import BFSyntaxError, BFSemanticError
 from .Token import Token
+from . import Hints
 from functools import reduce
 
 """
@@ -422,15 +423,15 @@ def get_divmod_code(right_token=None):
 
     # a, b, w, x, y, z
 
-    code += ">>[-]>[-]>[-]>[-]<<<<<"  # zero w,x,y,z, and point to a
-    code += "["  # while a != 0
+    divmod_code = ">>[-]>[-]>[-]>[-]<<<<<"  # zero w,x,y,z, and point to a
+    divmod_code += "["  # while a != 0
 
-    code += "-"  # decrease a by 1
-    code += ">-"  # decrease b by 1
-    code += ">+"  # increase w by 1
-    code += "<"  # point to b
-    code += "[->>>+>+<<<<]>>>>[-<<<<+>>>>]"  # copy b to y (via z)
-    code += "<"  # point to y
+    divmod_code += "-"  # decrease a by 1
+    divmod_code += ">-"  # decrease b by 1
+    divmod_code += ">+"  # increase w by 1
+    divmod_code += "<"  # point to b
+    divmod_code += "[->>>+>+<<<<]>>>>[-<<<<+>>>>]"  # copy b to y (via z)
+    divmod_code += "<"  # point to y
 
     code_inside_if = ""
     code_inside_if += "<+"  # increase x by 1
@@ -440,10 +441,10 @@ def get_divmod_code(right_token=None):
 
     # get_if_equal_to_0 also zeros y
     # i set offset_to_temp_cell = 1 because it can use z, since it is unused inside the if
-    code += get_if_equal_to_0_code(inside_if_code=code_inside_if, offset_to_temp_cell=1)
+    divmod_code += get_if_equal_to_0_code(inside_if_code=code_inside_if, offset_to_temp_cell=1)
 
-    code += "<<<<"  # point to a
-    code += "]"  # end while
+    divmod_code += "<<<<"  # point to a
+    divmod_code += "]"  # end while
 
     """
     a, b, w, x, y, z
@@ -467,6 +468,7 @@ def get_divmod_code(right_token=None):
     b = b-a%b
     """
 
+    code += Hints.mark(divmod_code, "divmod")
     return code
 
 
@@ -770,7 +772,7 @@ def get_op_between_literals_code(op_token, right_token=None):
         code += "]"
 
         code += "<<"  # point back to next available cell (second operand)
-        return code
+        return Hints.mark(code, "mul")
 
     elif op == "/":
         code = get_divmod_code(right_token)
@@ -1151,9 +1153,19 @@ def get_move_right_index_cells_code(current_pointer, node_index):
     # at the end of execution, the layout is:
     # 0 index next_available_cell (point to next available cell)
 
-    # index, steps_taken_counter
     code = node_index.get_code(current_pointer)  # index
-    code += "[-]"  # counter = 0
+    code += get_move_right_index_cell_code()
+
+    return code
+
+
+def get_move_right_index_cell_code():
+    # used for arrays
+    # the part of "get_move_right_index_cells_code" that runs after the index is evaluated
+    # assumes the layout is:
+    # index, steps_taken_counter (pointing to steps_taken_counter)
+
+    code = "[-]"  # counter = 0
     code += "<"  # point to index
 
     code += "["  # while index != 0
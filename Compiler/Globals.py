@@ -20,6 +20,10 @@ def insert_global_variable(variable):
     get_global_variables().append(variable)
 
 
+def clear_global_variables():
+    global_variables.clear()
+
+
 def get_global_variables_size():
     return sum(get_variable_size(variable) for variable in get_global_variables())
 
@@ -0,0 +1,36 @@
+"""
+This file implements the intrinsic hints: markers around the code of some slow operations, naming the operation
+so that an interpreter can perform it natively instead of running the code (see run_intrinsic in Engine.py)
+
+The markers are made of characters that Brainfuck ignores, so the hinted code still runs as is on any interpreter:
+    #<name><the operation's code>#end
+
+The hinted operations (the interpreter checks that the code between the markers is exactly what the compiler
+generates for them, so the layouts below must be kept in sync with it):
+    divmod - the main part of get_divmod_code (without the division by zero check)
+    mul - the * of get_op_between_literals_code
+    arrget - NodeArrayGetElement, from after the index is evaluated
+    arrset - NodeArraySetElement, from after the index and the value are evaluated
+"""
+
+BEGIN = "#"
+END = "#end"
+
+enabled = False
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def mark(code, name):
+    # returns the code wrapped with the markers of the named operation (or as is, when the hints are disabled)
+    if not enabled:
+        return code
+    return BEGIN + name + code + END
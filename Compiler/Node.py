@@ -1,11 +1,12 @@
 from .Exceptions import BFSemanticError
 from .General import get_copy_from_variable_code, get_copy_to_variable_code
-from .General import get_move_left_index_cell_code, get_move_right_index_cells_code
+from .General import get_move_left_index_cell_code, get_move_right_index_cell_code, get_move_right_index_cells_code
 from .General import get_offset_to_variable, get_variable_dimensions_from_token
 from .General import get_op_between_literals_code, get_literal_token_code, get_token_ID_code
 from .General import get_unary_prefix_op_code, get_unary_postfix_op_code, is_token_literal
 from .General import unpack_literal_tokens_to_array_dimensions, get_op_boolean_operator_code
 from .Token import Token
+from . import Hints
 
 """
 This file holds classes that are used to create the parse tree of expressions
@@ -282,15 +283,18 @@ class NodeArrayGetElement(NodeArrayElement):
         self.node_expression = node_expression
 
     def get_code(self, current_pointer, *args, **kwargs):
-        code = get_move_right_index_cells_code(current_pointer, self.node_expression)
-        code += get_copy_from_variable_code(self.ids_map_list, self.token_id, current_pointer + 2)
-        # it is +2 because in "get_move_right_index_cells_code", we moved 2 extra cells to the right, for retrieving the value
+        code = self.node_expression.get_code(current_pointer)  # index
 
-        code += "<"  # point to res
-        code += "[<<+>>-]"  # move res to old "index cell"
-        code += "<"  # point to new index cell
+        element_code = get_move_right_index_cell_code()
+        element_code += get_copy_from_variable_code(self.ids_map_list, self.token_id, current_pointer + 2)
+        # it is +2 because in "get_move_right_index_cell_code", we moved 2 extra cells to the right, for retrieving the value
 
-        code += get_move_left_index_cell_code()
+        element_code += "<"  # point to res
+        element_code += "[<<+>>-]"  # move res to old "index cell"
+        element_code += "<"  # point to new index cell
+
+        element_code += get_move_left_index_cell_code()
+        code += Hints.mark(element_code, "arrget")
         return code
 
 
@@ -335,43 +339,44 @@ class NodeArraySetElement(NodeArrayElement):
         code += "[-]"  # counter = 0
         code += ">"  # point to value cell
         code += self.node_expression_value.get_code(current_pointer + 2)
-        code += "<<<"  # point to index
-
-        code += "["  # while index != 0
-        code += ">>>"  # point to new_value (one after current value)
-        code += "[-]"  # zero new_value
-        code += "<"  # move to old value
-        code += "[>+<-]"  # move old value to new counter
-        code += "<"  # point to old counter
-        code += "+"  # increase old counter
-        code += "[>+<-]"  # move old counter to new counter
-        code += "<"  # point to old index
-        code += "-"  # decrease old index
-        code += "[>+<-]"  # move old index to new index
-        code += ">"  # point to new index
-        code += "]"  # end while
-
-        code += ">>"  # point to value
-        code += get_copy_to_variable_code(self.ids_map_list, self.token_id, current_pointer + 2)
+        element_code = "<<<"  # point to index
+
+        element_code += "["  # while index != 0
+        element_code += ">>>"  # point to new_value (one after current value)
+        element_code += "[-]"  # zero new_value
+        element_code += "<"  # move to old value
+        element_code += "[>+<-]"  # move old value to new counter
+        element_code += "<"  # point to old counter
+        element_code += "+"  # increase old counter
+        element_code += "[>+<-]"  # move old counter to new counter
+        element_code += "<"  # point to old index
+        element_code += "-"  # decrease old index
+        element_code += "[>+<-]"  # move old index to new index
+        element_code += ">"  # point to new index
+        element_code += "]"  # end while
+
+        element_code += ">>"  # point to value
+        element_code += get_copy_to_variable_code(self.ids_map_list, self.token_id, current_pointer + 2)
         # it is +2 because we moved 2 extra cells to the right, for pointing to value
 
         # layout: 0, idx, value (pointing to value)
         # create layout: value, idx
-        code += "[<<+>>-]"  # move value to old "index" cell (which is now 0)
+        element_code += "[<<+>>-]"  # move value to old "index" cell (which is now 0)
 
         # value, index (pointing to one after index)
-        code += "<"  # point to index
-        code += "["  # while index != 0
-        code += "<"  # point to value
-        code += "[<+>-]"  # move value to the left
-        code += ">"  # point to index
-        code += "-"  # sub 1 from index
-        code += "[<+>-]"  # move index to left
-        code += "<"  # point to index
-        code += "]"  # end while
+        element_code += "<"  # point to index
+        element_code += "["  # while index != 0
+        element_code += "<"  # point to value
+        element_code += "[<+>-]"  # move value to the left
+        element_code += ">"  # point to index
+        element_code += "-"  # sub 1 from index
+        element_code += "[<+>-]"  # move index to left
+        element_code += "<"  # point to index
+        element_code += "]"  # end while
 
         # now value is at the desired cell, and we point to the next available cell
 
+        code += Hints.mark(element_code, "arrset")
         return code
 
 
@@ -0,0 +1,79 @@
+import re
+
+"""
+This file implements the source map: which parts of the Brainfuck code were compiled from which source lines
+
+The code is built by concatenating strings, so the position of a statement's code is not known when it is compiled
+Instead, when the source map is enabled, the code of every statement and every (inlined) function call is wrapped
+with markers made of characters that Brainfuck ignores, and extract() removes them at the end while recording
+where each wrapped part ended up
+
+The source map is a list of segments: [start, end, function, line, call_sites]
+    start, end - the range of the Brainfuck code (indexes in the code string)
+    function, line - the innermost statement the code belongs to (or the function's definition line,
+        for the code that sets up and cleans up its scope). function is None for the global variables' code
+    call_sites - the [function, line] of the statements that called the function, outermost first
+        (functions are compiled into their callers' code, once per call)
+"""
+
+BEGIN = "\x01"  # followed by a location index and SEPARATOR
+SEPARATOR = "\x02"
+END = "\x03"
+
+enabled = False
+locations = list()  # Global list of location index --> (kind, function name, line). kind is "statement" or "function"
+
+
+def enable():
+    global enabled
+    enabled = True
+    locations.clear()
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def mark(code, kind, function, line):
+    # returns the code wrapped with markers of the given location (or as is, when the source map is disabled)
+    if not enabled:
+        return code
+    locations.append((kind, function, line))
+    return BEGIN + str(len(locations) - 1) + SEPARATOR + code + END
+
+
+def get_segment_location(stack):
+    # returns (function, line, call_sites) of code inside the given stack of locations (outermost first)
+    call_sites = list()
+    for index, (kind, function, line) in enumerate(stack):
+        if kind == "function" and index > 0:
+            _, caller, caller_line = stack[index - 1]
+            call_sites.append([caller, caller_line])
+    _, function, line = stack[-1] if stack else (None, None, None)
+    return function, line, call_sites
+
+
+def extract(code):
+    # removes the markers from the code
+    # returns the code and its source map
+
+    result = list()
+    segments = list()
+    stack = list()
+    position = 0
+    for part in re.split("(%s[0-9]+%s|%s)" % (BEGIN, SEPARATOR, END), code):
+        if part.startswith(BEGIN):
+            stack.append(locations[int(part[1:-1])])
+        elif part == END:
+            stack.pop()
+        elif part:
+            function, line, call_sites = get_segment_location(stack)
+            if segments and segments[-1][1] == position and segments[-1][2:] == [function, line, call_sites]:
+                segments[-1][1] += len(part)  # continues the previous segment
+            else:
+                segments.append([position, position + len(part), function, line, call_sites])
+            result.append(part)
+            position += len(part)
+
+    return "".join(result), segments
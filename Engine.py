@@ -0,0 +1,2713 @@
+import os
+import re
+import sys
+import array
+import bisect
+import struct
+import hashlib
+import marshal
+import io
+import time
+
+"""
+This file implements the interpreter: Brainfuck compiled to bytecode, run by the VM or translated for one of
+its backends (see Program and VM). Interpreter.py runs programs with it from the command line
+the modules only some of the backends need (like ctypes and subprocess) are imported by them, when they're used,
+so that running a small program doesn't pay for them
+"""
+
+
+def create_jumps_dictionary(program):
+    lbraces = list()
+    res = dict()
+
+    for index, command in enumerate(program):
+        if command == '[':
+            lbraces.append(index)
+        elif command == ']':
+            if len(lbraces) == 0:
+                raise SyntaxError("Brainfuck: mismatched parentheses (at index: %s)" % index)
+
+            lbrace_index = lbraces.pop()
+            res[lbrace_index] = index
+            res[index] = lbrace_index
+
+    if len(lbraces) > 0:
+        raise SyntaxError("Brainfuck: mismatched parentheses (at indexes: %s)" % str(lbraces))
+    return res
+
+
+# bytecode op codes
+ADD = 0             # arg: amount to add to the current cell
+MOVE = 1            # arg: amount to move the data pointer by
+OUTPUT = 2          # arg: unused
+INPUT = 3           # arg: unused
+JUMP_IF_ZERO = 4    # arg: index of the matching JUMP_IF_NOT_ZERO
+JUMP_IF_NOT_ZERO = 5  # arg: index of the matching JUMP_IF_ZERO
+CLEAR = 6           # arg: unused (the multiplier of its iterations in exact bytecode). sets the current cell to 0 ([-] and [+])
+LINEAR = 7          # arg: (multiplier, effects). a loop whose effect is linear in the current cell, see get_linear_loop
+SCAN = 8            # arg: stride. moves the data pointer by stride until it points to a zero cell ([>], [<], [>>>], ...)
+BLOCK = 9           # arg: (low, high, move, effects). a run of +-<> and clears, offset-addressed, see get_block
+INFINITE_LOOP = 10  # arg: index of the loop in the program. a loop that never ends once entered, see is_infinite_loop
+INTRINSIC = 11      # arg: (name, offset, end). code the compiler marked as an operation, see get_hints and run_intrinsic
+
+BLOCK_OPS = (ADD, MOVE, CLEAR, BLOCK)
+
+OUTPUT_FLUSH_THRESHOLD = 8192  # output bytes to collect before writing them at once
+
+FOLDABLE_COMMANDS = {'+': (ADD, 1), '-': (ADD, -1), '>': (MOVE, 1), '<': (MOVE, -1)}
+
+
+def get_linear_loop(body, cell_values):
+    # checks whether a loop body (already compiled to bytecode) has an effect that is linear in the loop counter,
+    # meaning it can be executed at once instead of iteration by iteration
+    # returns an equivalent CLEAR/LINEAR instruction, or None if the loop has to be executed normally
+    #
+    # the body is simulated once with symbolic cell values, relative to the counter cell (offset 0):
+    # ("add", n) means "the value the cell had at the start of the iteration, plus n"
+    # ("set", n) means "the value n, regardless of what the cell had"
+    # a LINEAR instruction's arg is (multiplier, effects), where effects is a tuple of (offset, is_set, value)
+    # when executed on a non-zero counter cell with value v, the loop runs v * multiplier (mod cell_values) times,
+    # or exactly once if the multiplier is None. the counter cell ends up being 0
+
+    def run_inner_loop(offset, multiplier, effects):
+        kind, value = cells.get(offset, ("add", 0))
+        if kind == "add":
+            # the amount of iterations depends on a value we don't know
+            # it is fine only if the inner loop doesn't affect anything but its own counter (e.g [-])
+            if effects:
+                return False
+        elif value % cell_values != 0:
+            iterations = 1 if multiplier is None else value * multiplier % cell_values
+            for effect_offset, is_set, effect_value in effects:
+                if is_set:
+                    cells[offset + effect_offset] = ("set", effect_value)
+                else:
+                    effect_kind, old_value = cells.get(offset + effect_offset, ("add", 0))
+                    cells[offset + effect_offset] = (effect_kind, old_value + iterations * effect_value)
+        cells[offset] = ("set", 0)
+        return True
+
+    cells = dict()
+    offset = 0
+    for op, arg in body:
+        if op == ADD:
+            kind, value = cells.get(offset, ("add", 0))
+            cells[offset] = (kind, value + arg)
+        elif op == MOVE:
+            offset += arg
+        elif op == CLEAR:
+            run_inner_loop(offset, 1, ())
+        elif op == BLOCK:
+            _, _, move, effects = arg
+            for effect_offset, is_set, effect_value in effects:
+                if is_set:
+                    cells[offset + effect_offset] = ("set", effect_value)
+                else:
+                    kind, value = cells.get(offset + effect_offset, ("add", 0))
+                    cells[offset + effect_offset] = (kind, value + effect_value)
+            offset += move
+        elif op == LINEAR:
+            if not run_inner_loop(offset, *arg):
+                return None
+        else:  # I/O or a loop that is not linear
+            return None
+
+    if offset != 0:
+        return None
+
+    kind, value = cells.pop(0, ("add", 0))
+    if kind == "set":
+        if value % cell_values != 0:
+            return None  # the loop never ends
+        multiplier = None  # the body runs exactly once
+    else:
+        if value % 2 == 0:
+            return None  # the counter may never reach 0
+        # the amount of iterations n solves v + n * value = 0 (mod cell_values)
+        multiplier = pow(-value % cell_values, -1, cell_values)
+
+    effects = tuple((effect_offset, kind == "set", value % cell_values)
+                    for effect_offset, (kind, value) in sorted(cells.items())
+                    if kind == "set" or value % cell_values != 0)
+    if not effects:
+        return (CLEAR, 0)
+    return (LINEAR, (multiplier, effects))
+
+
+def is_infinite_loop(body, cell_values):
+    # checks whether a loop body (already compiled to bytecode) can never change the loop's condition:
+    # it does no I/O, has no inner loops (except clears), doesn't move the data pointer in total, and leaves
+    # the current cell as it was or sets it to a non-zero value. such a loop never ends once it's entered, e.g [] or [>+<]
+
+    if any(op not in BLOCK_OPS for op, _ in body):
+        return False
+    _, _, move, effects = get_block(body, cell_values)
+    if move != 0:
+        return False
+    return all(offset != 0 or (is_set and value != 0) for offset, is_set, value in effects)
+
+
+def get_block(instructions, cell_values):
+    # combines a run of ADD/MOVE/CLEAR/BLOCK instructions into the arg of a single BLOCK: (low, high, move, effects)
+    # effects is a tuple of (offset, is_set, value) like in LINEAR, relative to the data pointer at the start of the run,
+    # with at most one effect per cell. the data pointer is moved by move after applying them
+    # low and high are the lowest and highest offsets the run touches or moves the data pointer to, so that a single
+    # bounds check is enough for the whole run
+
+    cells = dict()  # offset -> (is_set, value)
+    offset = 0
+    accessed = [0]
+    for op, arg in instructions:
+        if op == ADD:
+            is_set, value = cells.get(offset, (False, 0))
+            cells[offset] = (is_set, (value + arg) % cell_values)
+            accessed.append(offset)
+        elif op == CLEAR:
+            cells[offset] = (True, 0)
+            accessed.append(offset)
+        elif op == MOVE:
+            offset += arg
+        else:
+            low, high, move, effects = arg
+            accessed.extend((offset + low, offset + high))
+            for effect_offset, is_set, value in effects:
+                if is_set:
+                    cells[offset + effect_offset] = (True, value)
+                else:
+                    old_is_set, old_value = cells.get(offset + effect_offset, (False, 0))
+                    cells[offset + effect_offset] = (old_is_set, (old_value + value) % cell_values)
+            offset += move
+    accessed.append(offset)
+
+    effects = tuple((effect_offset, is_set, value) for effect_offset, (is_set, value) in sorted(cells.items())
+                    if is_set or value != 0)
+    return min(accessed), max(accessed), offset, effects
+
+
+def get_block_instructions(instructions, cell_values):
+    # returns the instructions that replace a run of ADD/MOVE/CLEAR/BLOCK instructions, see get_block
+    # simple runs stay (or become) a single ADD, MOVE or CLEAR, which are faster to dispatch than a BLOCK
+
+    if not instructions:
+        return []
+    block = get_block(instructions, cell_values)
+    low, high, move, effects = block
+    if not effects:
+        return [(MOVE, move)] if move != 0 else []
+    if move == 0 and len(effects) == 1 and effects[0][0] == 0:
+        _, is_set, value = effects[0]
+        if not is_set:
+            return [(ADD, value)]
+        if value == 0:
+            return [(CLEAR, 0)]
+    return [(BLOCK, block)]
+
+
+# the code the compiler emits for the operations it marks with intrinsic hints, see Compiler/Hints.py
+# the offset of an array access is from the cell its value is copied through (with an index of 0) to the array
+HINT_DIVMOD_CODE = ">>[-]>[-]>[-]>[-]<<<<<[->->+<[->>>+>+<<<<]>>>>[-<<<<+>>>>]<>[-]+<[>-<[-]]>[<<+<[-<+>]>>>-]<<<<<]"
+HINT_MUL_CODE = ">>[-]>[-]<<<[>>>+<<<-]>>>[<<[<+>>+<-]>[<+>-]>-]<<"
+HINT_ARRGET_PREFIX = "[-]<[>>[-]+<[>+<-]<-[>+<-]>]>>[-]>[-]"
+HINT_ARRSET_PREFIX = "<<<[>>>[-]<[>+<-]<+[>+<-]<-[>+<-]>]>>>[-]"
+HINT_MOVE_LEFT_CODE = "[<[<+>-]>-[<+>-]<]"
+HINT_PATTERN = re.compile("#(divmod|mul|arrget|arrset)([^#]*)#end")
+
+
+def get_hint_code(name, offset):
+    # returns the code the compiler emits for the named operation
+    if name == "divmod":
+        return HINT_DIVMOD_CODE
+    if name == "mul":
+        return HINT_MUL_CODE
+    if name == "arrget":
+        copy = "<" * (offset + 1) + "[" + ">" * offset + "+>+" + "<" * (offset + 1) + "-]"
+        copy += ">" * (offset + 1) + "[" + "<" * (offset + 1) + "+" + ">" * (offset + 1) + "-]"
+        return HINT_ARRGET_PREFIX + copy + "<[<<+>>-]<" + HINT_MOVE_LEFT_CODE
+    copy = "<" * (offset + 1) + "[-]" + ">" * offset + "[>+" + "<" * (offset + 1) + "+" + ">" * offset + "-]>[<+>-]<"
+    return HINT_ARRSET_PREFIX + copy + "[<<+>>-]<" + HINT_MOVE_LEFT_CODE
+
+
+def get_hints(program):
+    # returns the intrinsic hints in the program: a dictionary of the index where a hint starts ->
+    # (name, offset, index of the first command, index where the hint ends)
+    # a hint is used only if the code it marks is exactly what the compiler emits for the operation,
+    # anything else (a different compiler version, a hand-edited program) runs as is
+
+    hints = dict()
+    for match in HINT_PATTERN.finditer(program):
+        name, text = match.groups()
+        code = "".join(command for command in text if command in "+-<>.,[]")
+        offset = 0
+        if name in ("arrget", "arrset"):
+            prefix = HINT_ARRGET_PREFIX if name == "arrget" else HINT_ARRSET_PREFIX
+            offset = len(code) - len(code[len(prefix):].lstrip("<")) - len(prefix) - 1
+        if offset >= 0 and code == get_hint_code(name, offset):
+            hints[match.start()] = (name, offset, match.start(2), match.end(2))
+    return hints
+
+
+def run_intrinsic(data, bits, data_pointer, name, offset):
+    # performs the operation of an intrinsic hint at once, see get_hints and Compiler/Hints.py
+    # returns the data pointer after the operation, or None if its code has to run as is: when it would reach
+    # beyond the tape (which grows as it normally does), or in cases the native operation doesn't match it
+    # (a division by zero, an array access that overlaps the cells it works with, or a set whose counter
+    # cell the compiler zeroed before evaluating the value isn't zero)
+
+    if name == "divmod":
+        # a, b, w, x, y, z --> 0, b-a%b, a%b, a/b, 0, 0 (pointing to the first cell)
+        if data_pointer + 5 >= len(data) or data[data_pointer + 1] == 0:
+            return None
+        quotient, remainder = divmod(data[data_pointer], data[data_pointer + 1])
+        data[data_pointer + 1] -= remainder
+        data[data_pointer + 2] = remainder
+        data[data_pointer + 3] = quotient
+        data[data_pointer] = data[data_pointer + 4] = data[data_pointer + 5] = 0
+        return data_pointer
+
+    if name == "mul":
+        # a, b, temp1, temp2 --> a*b, b, 0, 0 (pointing to b)
+        if data_pointer + 3 >= len(data):
+            return None
+        data[data_pointer] = data[data_pointer] * data[data_pointer + 1] & (2 ** bits - 1)
+        data[data_pointer + 2] = data[data_pointer + 3] = 0
+        return data_pointer + 1
+
+    # arrget: index, ? (pointing to ?) --> array[index], 0 (pointing to the 0)
+    # arrset: index, ?, value, ? (pointing to the last ?) --> value, 0 (pointing to the 0) and array[index] = value
+    # either way <index> + 4 cells starting at the index are used, then cleared
+    index_cell = data_pointer - 1 if name == "arrget" else data_pointer - 3
+    if index_cell < 0 or (name == "arrset" and data[index_cell + 1] != 0):
+        return None
+    index = data[index_cell]
+    last_cell = index_cell + index + 3
+    element = index_cell + index + 2 - offset
+    if last_cell >= len(data) or index_cell <= element <= last_cell or element < 0:
+        return None
+    if name == "arrget":
+        value = data[element]
+    else:
+        value = data[index_cell + 2]
+        data[element] = value
+    data[index_cell] = value
+    data[index_cell + 1:last_cell + 1] = create_tape(bits, index + 3)
+    return index_cell + 1
+
+
+def compile_bytecode(program, bits=8, spans=None, exact=False):
+    # translates the program into a list of (op, arg) instructions
+    # comments are dropped, each run of +-<> (and loops that clear a cell) is combined into a single
+    # offset-addressed instruction, loops with a linear effect are replaced by a single instruction,
+    # loops that can never end are detected, and the jump targets are resolved once
+    # spans, if given, is a list that gets the (start, end) range of the program each instruction was compiled from
+    # code marked with an intrinsic hint is compiled as usual, after an INTRINSIC instruction that can skip it
+    # exact keeps what Stats needs to count the executed commands exactly: loops that clear a cell stay
+    # apart (a CLEAR with the multiplier of their iterations), loops with inner loops are not replaced (their
+    # iterations don't all run the same commands), and commands that cancelled each other out become an empty MOVE
+
+    cell_values = 2 ** bits
+    bytecode = list()
+    spans = list() if spans is None else spans
+    lbraces = list()
+    run_start = 0  # where the current run of ADD/MOVE/CLEAR/BLOCK instructions starts in bytecode
+    run_source = 0  # where it starts in the program (commands at its start may have cancelled each other out)
+    run_limit = 0  # where a run may start at the earliest: the code of a hint is never combined with what follows it
+    hints = get_hints(program) if '#' in program else dict()
+    hint = None  # (index of the INTRINSIC instruction, name, offset, index where the hint ends) while in one
+
+    def end_run(end):
+        # replaces the current run with its block instructions, that come from the program up to end
+        instructions = get_block_instructions(bytecode[run_start:], cell_values)
+        if instructions:
+            spans[run_start:] = [(min(spans[run_start][0], run_source), end)]
+        else:
+            del spans[run_start:]
+        bytecode[run_start:] = instructions
+        if exact and not instructions and any(command in "+-<>" for command in program[run_source:end]):
+            bytecode.append((MOVE, 0))  # keeps the commands that cancelled out in a span of their own
+            spans.append((run_source, end))
+
+    for index, command in enumerate(program):
+        if index in hints or (hint is not None and index == hint[3]):
+            end_run(index)
+            if len(bytecode) > run_start:
+                run_source = index
+            if hint is None:
+                name, offset, code_start, code_end = hints[index]
+                hint = (len(bytecode), name, offset, code_end)
+                bytecode.append((INTRINSIC, None))
+                spans.append((run_source, code_start))
+                run_source = code_start
+            else:
+                instruction, name, offset, _ = hint
+                bytecode[instruction] = (INTRINSIC, (name, offset, len(bytecode) - 1))
+                hint = None
+            run_start = run_limit = len(bytecode)
+
+        if command in FOLDABLE_COMMANDS:
+            op, amount = FOLDABLE_COMMANDS[command]
+            start = index
+            if len(bytecode) > run_start and bytecode[-1][0] == op:
+                amount += bytecode.pop()[1]
+                start, _ = spans.pop()
+                if amount == 0:
+                    continue
+            bytecode.append((op, amount))
+            spans.append((start, index + 1))
+            continue
+
+        if command not in '.,[]':  # everything else is comment
+            continue
+
+        end_run(index)
+        if len(bytecode) > run_start:
+            run_source = index  # the run took the commands before this one
+
+        if command == '.':
+            bytecode.append((OUTPUT, 0))
+        elif command == ',':
+            bytecode.append((INPUT, 0))
+        elif command == '[':
+            lbraces.append((index, len(bytecode)))
+            bytecode.append((JUMP_IF_ZERO, None))
+        elif command == ']':
+            if len(lbraces) == 0:
+                raise SyntaxError("Brainfuck: mismatched parentheses (at index: %s)" % index)
+
+            lbrace_index, lbrace_instruction = lbraces.pop()
+            body = bytecode[lbrace_instruction + 1:]
+            linear_loop = get_linear_loop(body, cell_values)
+            if exact and linear_loop is not None:
+                if any(op not in (ADD, MOVE, BLOCK) for op, _ in body):
+                    linear_loop = None
+                elif linear_loop[0] == CLEAR:
+                    _, _, _, effects = get_block(body, cell_values)  # only the counter changes
+                    linear_loop = (CLEAR, pow(-effects[0][2] % cell_values, -1, cell_values))
+            if len(body) == 1 and body[0][0] == MOVE and body[0][1] != 0:
+                loop = (SCAN, body[0][1])
+            elif is_infinite_loop(body, cell_values):
+                loop = (INFINITE_LOOP, lbrace_index)
+            else:
+                loop = linear_loop
+
+            if loop is not None:
+                # the whole loop is replaced by a single instruction
+                del bytecode[lbrace_instruction:]
+                del spans[lbrace_instruction:]
+                if loop[0] == CLEAR and not exact:
+                    # a clear is a block instruction, so it joins the runs before and after it
+                    joins = len(bytecode) > run_limit and bytecode[-1][0] in BLOCK_OPS
+                    run_start = len(bytecode) - 1 if joins else len(bytecode)
+                    bytecode.append(loop)
+                    spans.append((lbrace_index, index + 1))
+                    continue
+                bytecode.append(loop)
+                spans.append((lbrace_index, index + 1))
+                run_start = len(bytecode)
+                run_source = index + 1
+                continue
+
+            bytecode[lbrace_instruction] = (JUMP_IF_ZERO, len(bytecode))
+            bytecode.append((JUMP_IF_NOT_ZERO, lbrace_instruction))
+
+        spans.append((run_source, index + 1))  # with the commands of a run that cancelled out, if any
+        run_start = len(bytecode)
+        run_source = index + 1
+
+    end_run(len(program))
+
+    if len(lbraces) > 0:
+        raise SyntaxError("Brainfuck: mismatched parentheses (at indexes: %s)" % str([index for index, _ in lbraces]))
+    return bytecode
+
+
+def create_tape(bits, size):
+    # creates a tape of zero cells, using the smallest representation that fits the cell width
+    # 8-bit cells are stored in a bytearray, wider cells in an array.array of the matching typecode
+    if bits <= 8:
+        return bytearray(size)
+    for typecode in ('H', 'I', 'L', 'Q'):
+        if bits <= 8 * array.array(typecode).itemsize:
+            return array.array(typecode, bytes(size * array.array(typecode).itemsize))
+    raise ValueError("Brainfuck: cells of %s bits are not supported (at most 64)" % bits)
+
+
+def fit_tape(data, bits, pointer, negative_pointer, max_cells=None, exact=False):
+    # grows the tape on demand so that it contains the cell at the given pointer
+    # returns by how many cells the existing ones were shifted to the right (when the tape grows to the left)
+    # max_cells limits the size of the tape, see Limits
+    # the tape usually grows by at least its size, exact makes it grow only up to the pointer (see Stats)
+
+    if pointer >= len(data):
+        size = pointer + 1 - len(data) if exact else max(pointer + 1 - len(data), len(data))
+        if max_cells is not None and len(data) + size > max_cells:
+            if pointer >= max_cells:
+                raise ResourceLimitExceeded("cells", "the tape grew beyond %s cells" % max_cells)
+            size = max_cells - len(data)
+        data.extend(create_tape(bits, size))
+        return 0
+
+    if pointer < 0:
+        if negative_pointer != "grow":
+            raise IndexError("Brainfuck: data pointer moved to the left of the tape (to %s)" % pointer)
+        shift = -pointer if exact else max(-pointer, len(data))
+        if max_cells is not None and len(data) + shift > max_cells:
+            if len(data) - pointer > max_cells:
+                raise ResourceLimitExceeded("cells", "the tape grew beyond %s cells" % max_cells)
+            shift = max_cells - len(data)
+        data[0:0] = create_tape(bits, shift)
+        return shift
+
+    return 0
+
+
+def scan(data, data_pointer, stride):
+    # returns the first data pointer in data_pointer, data_pointer + stride, data_pointer + 2 * stride, ...
+    # that points to a zero cell. cells beyond the ends of the tape are considered to be zero
+    # the search itself is done by a single C-level call instead of one dispatch per visited cell
+
+    if stride == 1:
+        index = data.find(0, data_pointer) if isinstance(data, bytearray) else find_zero(data, data_pointer)
+        return len(data) if index == -1 else index
+    if stride == -1 and isinstance(data, bytearray):
+        return data.rfind(0, 0, data_pointer + 1)  # -1 if not found, which is the first cell left of the tape
+
+    cells = data[data_pointer::stride]
+    index = cells.find(0) if isinstance(cells, bytearray) else find_zero(cells, 0)
+    if index == -1:
+        index = len(cells)
+    return data_pointer + index * stride
+
+
+def find_zero(cells, start):
+    try:
+        return cells.index(0, start)
+    except ValueError:
+        return -1
+
+
+class OutputSink:
+    # collects the program's output and writes it to a binary stream in large chunks instead of byte by byte
+    # the interpreter appends to self.buffer directly and calls flush() when it is at least self.threshold bytes,
+    # before reading input, and when the program ends
+    # limit is the maximal amount of bytes to write, see Limits. self.threshold never lets the buffer
+    # grow past it unnoticed, so checking the limit costs nothing more than the flush check
+
+    def __init__(self, stream=None, limit=None):
+        if stream is None:
+            sys.stdout.flush()  # anything printed before the program started should come first
+            stream = sys.stdout.buffer
+        self.stream = stream
+        self.buffer = bytearray()
+        self.limit = limit
+        self.written = 0
+        self.threshold = OUTPUT_FLUSH_THRESHOLD if limit is None else min(OUTPUT_FLUSH_THRESHOLD, limit + 1)
+
+    def flush(self):
+        if self.buffer:
+            exceeded = self.limit is not None and self.written + len(self.buffer) > self.limit
+            if exceeded:
+                del self.buffer[self.limit - self.written:]
+            self.stream.write(self.buffer)
+            self.written += len(self.buffer)
+            self.buffer.clear()
+            if exceeded:
+                self.stream.flush()
+                raise ResourceLimitExceeded("output", "the output grew beyond %s bytes" % self.limit)
+            if self.limit is not None:
+                self.threshold = min(OUTPUT_FLUSH_THRESHOLD, self.limit - self.written + 1)
+        self.stream.flush()
+
+
+class InputSource:
+    # reads the program's input in large blocks from bytes or a binary stream (defaults to the standard input)
+    # eof is what reading past the end of the input gives: "unchanged" leaves the cell as it is, "0" or "255"
+
+    BLOCK_SIZE = 4096
+
+    def __init__(self, source=None, eof="0"):
+        if source is None:
+            source = sys.stdin.buffer
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.stream = None
+            self.buffer = bytes(source)
+        else:
+            self.stream = source
+            self.buffer = b""
+        self.position = 0  # in self.buffer
+        self.eof_value = {"unchanged": None, "0": 0, "255": 255}[eof]
+        self.consumed = 0  # input bytes read so far
+        self.waiting = False  # whether more input may be given with feed(), see VM.execute
+
+    def feed(self, data):
+        # adds input to read after the current one. b"" ends the input
+        if data:
+            self.buffer = self.buffer[self.position:] + bytes(data)
+            self.position = 0
+        else:
+            self.waiting = False
+
+    def read_all(self):
+        # returns the rest of the input at once (reading the stream to its end), for backends that run on a buffer
+        data = self.buffer[self.position:]
+        if self.stream is not None:
+            data += self.stream.read()
+        self.buffer = b""
+        self.position = 0
+        self.consumed += len(data)
+        return data
+
+    def read(self):
+        # returns the next input byte, or self.eof_value at the end of the input
+        # raises WaitingForInput at the end of the input when more of it may still be fed
+        if self.position == len(self.buffer):
+            if self.stream is None:
+                if self.waiting:
+                    raise WaitingForInput()
+                return self.eof_value
+            # read1 returns whatever is available instead of waiting for a whole block (e.g when reading a terminal)
+            read = getattr(self.stream, "read1", self.stream.read)
+            self.buffer = read(self.BLOCK_SIZE)
+            self.position = 0
+            if not self.buffer:
+                return self.eof_value
+
+        self.position += 1
+        self.consumed += 1
+        return self.buffer[self.position - 1]
+
+
+class ExecutionStopped(Exception):
+    # raised when a program is stopped before it ends, see ResourceLimitExceeded and InfiniteLoop
+    # the state of the machine when it was stopped is filled in by the backend (see set_state):
+    # tape (a copy of the cells), data_pointer and origin (indexes in tape, see fit_tape),
+    # instruction_pointer (index in the bytecode), steps (see Limits) and output_size (bytes written)
+    # the backends other than "interpreter" don't know the instruction pointer and the steps, and leave them None
+
+    def __init__(self, message):
+        Exception.__init__(self, "Brainfuck: " + message)
+        self.tape = None
+        self.data_pointer = None
+        self.origin = None
+        self.instruction_pointer = None
+        self.steps = None
+        self.output_size = None
+
+    def set_state(self, data, data_pointer, origin, output, instruction_pointer=None, steps=None):
+        self.tape = data[:]
+        self.data_pointer = data_pointer
+        self.origin = origin
+        self.output_size = output.written + len(output.buffer)
+        self.instruction_pointer = instruction_pointer
+        self.steps = steps
+
+
+class ResourceLimitExceeded(ExecutionStopped):
+    # raised when a program breaches one of its Limits
+    # limit is which one: "steps", "time", "cells" or "output"
+
+    def __init__(self, limit, message):
+        ExecutionStopped.__init__(self, message)
+        self.limit = limit
+
+
+class InfiniteLoop(ExecutionStopped):
+    # raised when a program enters a loop that never ends, see is_infinite_loop
+    # index is the loop's index in the program
+
+    def __init__(self, index):
+        ExecutionStopped.__init__(self, "program halted in infinite loop at index %s" % index)
+        self.index = index
+
+
+class Paused(ExecutionStopped):
+    # raised when a program's time slice ends, see TimeSlice
+
+    def __init__(self):
+        ExecutionStopped.__init__(self, "program paused")
+
+
+class WaitingForInput(ExecutionStopped):
+    # raised when a program reads input that wasn't given yet, see InputSource.feed
+
+    def __init__(self):
+        ExecutionStopped.__init__(self, "program is waiting for input")
+
+
+class Limits:
+    # resource limits for running untrusted programs, None means unlimited
+    # max_steps is the amount of bytecode instructions to execute. they are counted a whole loop body
+    # at a time when jumping back to the start of a loop, so code that isn't in a loop isn't counted
+    # (it runs at most once anyway). timeout is in seconds of wall-clock time
+    # max_cells is the size of the tape, and max_output is the amount of bytes to write
+    # steps and time are checked at loop back-edges only, cells when the tape grows, output when it's flushed
+
+    CLOCK_INTERVAL = 100000  # steps between two readings of the clock
+
+    def __init__(self, max_steps=None, timeout=None, max_cells=None, max_output=None):
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.max_cells = max_cells
+        self.max_output = max_output
+        self.deadline = None
+
+    def start(self):
+        # returns the amount of steps after which check() should be called
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+        return self.check(0)
+
+    def check(self, steps):
+        # raises ResourceLimitExceeded if a limit was breached after the given amount of steps
+        # returns the amount of steps after which check() should be called again
+        if self.max_steps is not None and steps > self.max_steps:
+            raise ResourceLimitExceeded("steps", "executed more than %s instructions" % self.max_steps)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ResourceLimitExceeded("time", "ran for more than %s seconds" % self.timeout)
+
+        next_check = float("inf")
+        if self.deadline is not None:
+            next_check = steps + self.CLOCK_INTERVAL
+        if self.max_steps is not None:
+            next_check = min(next_check, self.max_steps + 1)
+        return next_check
+
+
+class TimeSlice(Limits):
+    # the limits of one slice of a program that is paused and resumed (see VM.execute), checked like Limits
+    # the limits are of the whole run: steps_before steps were executed, and seconds_before seconds were spent
+    # running, in the earlier slices. the slice ends after slice_steps more steps (if given), raising Paused
+
+    def __init__(self, max_steps=None, timeout=None, max_cells=None, max_output=None, slice_steps=None,
+                 steps_before=0, seconds_before=0.0):
+        Limits.__init__(self, max_steps, timeout, max_cells, max_output)
+        self.slice_steps = slice_steps
+        self.steps_before = steps_before
+        self.seconds_before = seconds_before
+
+    def start(self):
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout - self.seconds_before
+        return self.check(0)
+
+    def check(self, steps):
+        next_check = Limits.check(self, self.steps_before + steps) - self.steps_before
+        if self.slice_steps is not None:
+            if steps >= self.slice_steps:
+                raise Paused()
+            next_check = min(next_check, self.slice_steps)
+        return next_check
+
+
+class Stats:
+    # execution statistics, collected by run_bytecode when it's given a Stats object
+    # during the run only loops are counted: how many times the body of each loop ran (in loop_runs, by the index
+    # of its JUMP_IF_NOT_ZERO), and the iterations of loops that were replaced by a single instruction.
+    # everything else is derived from them when the program ends, see get_results
+    #
+    # the program's own commands are counted exactly as if it wasn't optimized, with bytecode compiled for it
+    # (see compile_bytecode's exact and Program.get_exact_bytecode)
+    # the tape grows only as far as the program goes (see fit_tape), so its size tells the highest cell touched
+
+    def __init__(self, program, bytecode, spans):
+        self.program = program
+        self.bytecode = bytecode
+        self.spans = spans
+        self.commands = [sum(command in "+-<>.,[]" for command in program[start:end]) for start, end in spans]
+        self.loop_runs = [0] * len(bytecode)
+        self.folded_iterations = [0] * len(bytecode)  # by instruction, for loops replaced by a single instruction
+        self.start_time = time.perf_counter()
+
+    def count_folded_loop(self, instruction_pointer, iterations):
+        self.folded_iterations[instruction_pointer] += iterations
+
+    def get_executions(self):
+        # returns how many times each instruction was executed
+        executions = list()
+        runs = [1]  # how many times the body of each enclosing loop ran, the whole program runs once
+        for op, arg in self.bytecode:
+            if op == JUMP_IF_ZERO:
+                executions.append(runs[-1])
+                runs.append(self.loop_runs[arg])
+            elif op == JUMP_IF_NOT_ZERO:
+                executions.append(runs.pop())  # checked after each run of the body
+            else:
+                executions.append(runs[-1])
+        return executions
+
+    def get_command_executions(self, instruction_pointer, executions):
+        # returns how many times the first command the instruction was compiled from was executed,
+        # and how many times each of the others was
+        if self.bytecode[instruction_pointer][0] in (LINEAR, SCAN, INFINITE_LOOP, CLEAR):
+            # the [ is checked once per execution, the rest runs once per iteration
+            return executions, self.folded_iterations[instruction_pointer]
+        return executions, executions
+
+    def get_results(self, data, origin, input, output):
+        # returns a dictionary of the statistics of the run that just ended
+        seconds = time.perf_counter() - self.start_time
+        executions = self.get_executions()
+        commands = 0
+        for instruction_pointer, instruction_executions in enumerate(executions):
+            first, rest = self.get_command_executions(instruction_pointer, instruction_executions)
+            commands += first + rest * (self.commands[instruction_pointer] - 1)
+
+        return dict(commands=commands,
+                    instructions=sum(executions),
+                    loop_iterations=sum(self.loop_runs) + sum(self.folded_iterations),
+                    max_cell=len(data) - origin - 1,
+                    output_bytes=output.written,
+                    input_bytes=input.consumed,
+                    seconds=seconds,
+                    commands_per_second=commands / seconds if seconds > 0 else 0.0)
+
+    def get_profile(self, source_map):
+        # attributes the executed commands to the source lines they were compiled from
+        # source_map is a list of [start, end, function, line, call_sites] segments, see Compiler/SourceMap.py
+        # returns a dictionary of (function, line) -> commands, and a dictionary of function -> (commands in
+        # the function's own lines, commands including the functions it called). unmapped code is under None
+        starts = [segment[0] for segment in source_map]
+        segment_commands = [0] * len(source_map)
+        unmapped = 0
+        for instruction_pointer, executions in enumerate(self.get_executions()):
+            first, rest = self.get_command_executions(instruction_pointer, executions)
+            start, end = self.spans[instruction_pointer]
+            for position in range(start, end):
+                if self.program[position] not in "+-<>.,[]":
+                    continue
+                count = first if first is not None else rest
+                first = None
+                index = bisect.bisect_right(starts, position) - 1
+                if index >= 0 and position < source_map[index][1]:
+                    segment_commands[index] += count
+                else:
+                    unmapped += count
+
+        lines = dict()
+        functions = dict()
+        if unmapped:
+            lines[(None, None)] = unmapped
+            functions[None] = (unmapped, unmapped)
+        for (_, _, function, line, call_sites), commands in zip(source_map, segment_commands):
+            if not commands:
+                continue
+            lines[(function, line)] = lines.get((function, line), 0) + commands
+            own, total = functions.get(function, (0, 0))
+            functions[function] = (own + commands, total)
+            for caller in set([function] + [call_function for call_function, _ in call_sites]):
+                own, total = functions.get(caller, (0, 0))
+                functions[caller] = (own, total + commands)
+        return lines, functions
+
+
+class Sampler:
+    # a sampling profiler: records which instruction the program is executing every interval steps (see Limits),
+    # or every timer seconds of CPU time. the steps are counted at loop back-edges anyway, so sampling by steps
+    # costs one call per interval. sampling by time reads the instruction pointer of run_bytecode from a SIGPROF
+    # signal handler (POSIX only), and costs nothing between the samples
+    # the samples are aggregated by loop nest, see get_collapsed_stacks
+
+    def __init__(self, interval=10000, timer=None):
+        self.interval = interval
+        self.timer = timer
+        self.samples = dict()  # instruction pointer -> amount of samples
+        self.next_sample = interval
+        self.previous_handler = None
+        self.program = None
+        self.spans = None
+
+    def set_program(self, program, spans):
+        # the program being sampled, and the ranges of it each instruction was compiled from (see compile_bytecode)
+        self.program = program
+        self.spans = spans
+
+    def start(self):
+        # returns the amount of steps after which sample() should be called
+        if self.timer is None:
+            return self.next_sample
+        import signal
+        self.previous_handler = signal.signal(signal.SIGPROF, self.sample_frame)
+        signal.setitimer(signal.ITIMER_PROF, self.timer, self.timer)
+        return float("inf")
+
+    def stop(self):
+        if self.timer is not None:
+            import signal
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self.previous_handler)
+
+    def sample(self, steps, instruction_pointer):
+        # records a sample for every interval the steps have passed since the last sample
+        # returns the amount of steps after which sample() should be called again
+        if self.timer is not None:
+            return float("inf")
+        if steps >= self.next_sample:
+            samples = (steps - self.next_sample) // self.interval + 1
+            self.samples[instruction_pointer] = self.samples.get(instruction_pointer, 0) + samples
+            self.next_sample += samples * self.interval
+        return self.next_sample
+
+    def sample_frame(self, signal_number, frame):
+        # the SIGPROF handler. the signal interrupts run_bytecode or one of the functions it called
+        while frame is not None and frame.f_code is not run_bytecode.__code__:
+            frame = frame.f_back
+        if frame is not None:
+            instruction_pointer = frame.f_locals["instruction_pointer"]
+            self.samples[instruction_pointer] = self.samples.get(instruction_pointer, 0) + 1
+
+    def get_collapsed_stacks(self):
+        # returns the samples in the "collapsed stacks" format of flame graph tools: a line per loop nest with
+        # the frames separated by semicolons and the amount of samples. the frames are the program,
+        # and the loops that contain the sampled instruction (named by the index of their [ in the program)
+        jumps = create_jumps_dictionary(self.program)
+        stacks = dict()
+        for instruction_pointer, samples in self.samples.items():
+            position = self.spans[instruction_pointer][0] if instruction_pointer < len(self.spans) else len(self.program)
+            loops = sorted(index for index, match in jumps.items() if index <= position <= match and index < match)
+            stack = ";".join(["program"] + ["loop@%d" % index for index in loops])
+            stacks[stack] = stacks.get(stack, 0) + samples
+        return "".join("%s %d\n" % (stack, samples) for stack, samples in sorted(stacks.items()))
+
+
+class Hooks:
+    # instrumentation callbacks, called by run_bytecode_with_hooks as the program runs (see VM.run)
+    # each one is None (the default) or a function:
+    #   on_output(value) - after the program wrote a byte
+    #   on_input(value) - after the program read a byte. value is None past the end of the input when eof is "unchanged"
+    #   on_loop_enter(index) - when the body of a loop is entered from its [, index is the [ index in the program.
+    #       loops that were replaced by a single instruction (see compile_bytecode) call it once per entry,
+    #       their iterations aren't seen one by one. clear loops combined with the +-<> around them don't call it
+    #   on_step(steps) - when steps are counted (at loop back-edges, see Limits), with the amount of steps so far
+    #   on_tape_write(address) - after a cell was written, address is the cell's index counting from the first cell
+    #       of the tape (negative when it grew to the left). a run of +-<> calls it once per cell it changed
+    # when none is registered, programs run in run_bytecode, which doesn't look for hooks at all
+
+    NAMES = ("on_output", "on_input", "on_loop_enter", "on_step", "on_tape_write")
+
+    def __init__(self, on_output=None, on_input=None, on_loop_enter=None, on_step=None, on_tape_write=None):
+        self.on_output = on_output
+        self.on_input = on_input
+        self.on_loop_enter = on_loop_enter
+        self.on_step = on_step
+        self.on_tape_write = on_tape_write
+        self.loop_indexes = None
+
+    def register(self, name, callback):
+        # sets the named hook to callback (None unregisters it)
+        if name not in self.NAMES:
+            raise ValueError("Brainfuck: unknown hook '%s'" % name)
+        setattr(self, name, callback)
+
+    def is_empty(self):
+        return all(getattr(self, name) is None for name in self.NAMES)
+
+    def set_program(self, program, spans):
+        # the program being run, and the ranges of it each instruction was compiled from (see compile_bytecode)
+        # a loop's instruction may start with commands that were folded into it, so its [ is looked for
+        self.loop_indexes = [program.find("[", start, end) for start, end in spans]
+
+
+def run_bytecode(bytecode, bits, data, negative_pointer, input, output, limits=None, stats=None, sampler=None,
+                 start=None):
+    # executes the bytecode on the given tape, starting with the data pointer at its first cell
+    # or, to resume a stopped program (see Snapshot), from start: (data_pointer, origin, instruction_pointer)
+    # returns the final data pointer and the index of the (original) first cell, see fit_tape
+    # limits are checked per loop iteration and tape growth, see Limits
+    # stats (if given) counts the loops, see Stats. like the limits, it adds nothing to straight-line code
+    # sampler (if given) is called like the limits are checked, see Sampler
+
+    if limits is None:
+        limits = Limits()
+    max_cells = limits.max_cells
+    steps = 0
+    next_check = limits.start()
+    if sampler is not None:
+        next_check = min(next_check, sampler.start())
+
+    counting = stats is not None
+    loop_runs = stats.loop_runs if counting else None
+
+    mask = 2 ** bits - 1
+    data_pointer = 0
+    origin = 0  # the index of the first cell in data, changes when the tape grows to the left
+    instruction_pointer = 0
+    if start is not None:
+        data_pointer, origin, instruction_pointer = start
+
+    program_length = len(bytecode)
+    output_buffer = output.buffer
+
+    try:
+        while instruction_pointer < program_length:
+            op, arg = bytecode[instruction_pointer]
+
+            if op == BLOCK:
+                low, high, move, effects = arg
+                if data_pointer + low < 0 or data_pointer + high >= len(data):
+                    if data_pointer + low < 0:
+                        shift = fit_tape(data, bits, data_pointer + low, negative_pointer, max_cells, counting)
+                        data_pointer += shift
+                        origin += shift
+                    if data_pointer + high >= len(data):
+                        fit_tape(data, bits, data_pointer + high, negative_pointer, max_cells, counting)
+                for offset, is_set, value in effects:
+                    offset += data_pointer
+                    data[offset] = value if is_set else (data[offset] + value) & mask
+                data_pointer += move
+            elif op == ADD:
+                data[data_pointer] = (data[data_pointer] + arg) & mask
+            elif op == MOVE:
+                data_pointer += arg
+                if not 0 <= data_pointer < len(data):
+                    shift = fit_tape(data, bits, data_pointer, negative_pointer, max_cells, counting)
+                    data_pointer += shift
+                    origin += shift
+            elif op == CLEAR:
+                if counting:
+                    stats.count_folded_loop(instruction_pointer, data[data_pointer] * arg & mask)
+                data[data_pointer] = 0
+            elif op == SCAN:
+                scan_start = data_pointer
+                data_pointer = scan(data, data_pointer, arg)
+                if counting:
+                    stats.count_folded_loop(instruction_pointer, (data_pointer - scan_start) // arg)
+                if not 0 <= data_pointer < len(data):
+                    shift = fit_tape(data, bits, data_pointer, negative_pointer, max_cells, counting)
+                    data_pointer += shift
+                    origin += shift
+            elif op == LINEAR:
+                value = data[data_pointer]
+                if value != 0:
+                    multiplier, effects = arg
+                    if data_pointer + effects[0][0] < 0:
+                        shift = fit_tape(data, bits, data_pointer + effects[0][0], negative_pointer, max_cells, counting)
+                        data_pointer += shift
+                        origin += shift
+                    if data_pointer + effects[-1][0] >= len(data):
+                        fit_tape(data, bits, data_pointer + effects[-1][0], negative_pointer, max_cells, counting)
+                    iterations = 1 if multiplier is None else value * multiplier & mask
+                    if counting:
+                        stats.count_folded_loop(instruction_pointer, iterations)
+                    for offset, is_set, amount in effects:
+                        if is_set:
+                            data[data_pointer + offset] = amount
+                        else:
+                            data[data_pointer + offset] = (data[data_pointer + offset] + iterations * amount) & mask
+                    data[data_pointer] = 0
+            elif op == JUMP_IF_ZERO:
+                if data[data_pointer] == 0:
+                    instruction_pointer = arg
+                elif counting:
+                    loop_runs[arg] += 1
+            elif op == JUMP_IF_NOT_ZERO:
+                if data[data_pointer] != 0:
+                    if counting:
+                        loop_runs[instruction_pointer] += 1
+                    steps += instruction_pointer - arg
+                    instruction_pointer = arg
+                    if steps >= next_check:
+                        next_check = limits.check(steps)
+                        if sampler is not None:
+                            next_check = min(next_check, sampler.sample(steps, instruction_pointer))
+            elif op == OUTPUT:
+                if bits <= 8:
+                    output_buffer.append(data[data_pointer])
+                else:
+                    output_buffer += chr(data[data_pointer]).encode("utf8", "surrogatepass")
+                if len(output_buffer) >= output.threshold:
+                    output.flush()
+            elif op == INPUT:
+                output.flush()  # the program may be waiting for the user to answer a prompt
+                value = input.read()
+                if value is not None:
+                    data[data_pointer] = value
+            elif op == INFINITE_LOOP:
+                if data[data_pointer] != 0:
+                    raise InfiniteLoop(arg)
+            elif op == INTRINSIC and not counting:  # the statistics count the program's own commands
+                name, offset, end = arg
+                result = run_intrinsic(data, bits, data_pointer, name, offset)
+                if result is not None:
+                    data_pointer = result
+                    instruction_pointer = end
+
+            instruction_pointer += 1
+    except ExecutionStopped as error:
+        error.set_state(data, data_pointer, origin, output, instruction_pointer, steps)
+        raise
+    finally:
+        if sampler is not None:
+            sampler.stop()
+
+    return data_pointer, origin
+
+
+def run_bytecode_with_hooks(bytecode, bits, data, negative_pointer, input, output, hooks, limits=None, start=None):
+    # run_bytecode, calling the hooks (see Hooks) as it goes. kept apart so that runs without hooks don't pay for them
+    # the intrinsics (see run_intrinsic) aren't run, so that every write of their code is seen
+
+    if limits is None:
+        limits = Limits()
+    max_cells = limits.max_cells
+    steps = 0
+    next_check = limits.start()
+
+    on_output = hooks.on_output
+    on_input = hooks.on_input
+    on_loop_enter = hooks.on_loop_enter
+    on_step = hooks.on_step
+    on_tape_write = hooks.on_tape_write
+    loop_indexes = hooks.loop_indexes
+
+    mask = 2 ** bits - 1
+    data_pointer = 0
+    origin = 0
+    instruction_pointer = 0
+    if start is not None:
+        data_pointer, origin, instruction_pointer = start
+
+    program_length = len(bytecode)
+    output_buffer = output.buffer
+
+    try:
+        while instruction_pointer < program_length:
+            op, arg = bytecode[instruction_pointer]
+
+            if op == BLOCK:
+                low, high, move, effects = arg
+                if data_pointer + low < 0 or data_pointer + high >= len(data):
+                    if data_pointer + low < 0:
+                        shift = fit_tape(data, bits, data_pointer + low, negative_pointer, max_cells)
+                        data_pointer += shift
+                        origin += shift
+                    if data_pointer + high >= len(data):
+                        fit_tape(data, bits, data_pointer + high, negative_pointer, max_cells)
+                for offset, is_set, value in effects:
+                    offset += data_pointer
+                    old_value = data[offset]
+                    data[offset] = value if is_set else (old_value + value) & mask
+                    if on_tape_write is not None and (old_value != 0 or data[offset] != 0):  # not a skipped [-]
+                        on_tape_write(offset - origin)
+                data_pointer += move
+            elif op == ADD:
+                data[data_pointer] = (data[data_pointer] + arg) & mask
+                if on_tape_write is not None:
+                    on_tape_write(data_pointer - origin)
+            elif op == MOVE:
+                data_pointer += arg
+                if not 0 <= data_pointer < len(data):
+                    shift = fit_tape(data, bits, data_pointer, negative_pointer, max_cells)
+                    data_pointer += shift
+                    origin += shift
+            elif op == CLEAR:
+                if data[data_pointer] != 0:
+                    if on_loop_enter is not None:
+                        on_loop_enter(loop_indexes[instruction_pointer])
+                    data[data_pointer] = 0
+                    if on_tape_write is not None:
+                        on_tape_write(data_pointer - origin)
+            elif op == SCAN:
+                if data[data_pointer] != 0 and on_loop_enter is not None:
+                    on_loop_enter(loop_indexes[instruction_pointer])
+                data_pointer = scan(data, data_pointer, arg)
+                if not 0 <= data_pointer < len(data):
+                    shift = fit_tape(data, bits, data_pointer, negative_pointer, max_cells)
+                    data_pointer += shift
+                    origin += shift
+            elif op == LINEAR:
+                value = data[data_pointer]
+                if value != 0:
+                    if on_loop_enter is not None:
+                        on_loop_enter(loop_indexes[instruction_pointer])
+                    multiplier, effects = arg
+                    if data_pointer + effects[0][0] < 0:
+                        shift = fit_tape(data, bits, data_pointer + effects[0][0], negative_pointer, max_cells)
+                        data_pointer += shift
+                        origin += shift
+                    if data_pointer + effects[-1][0] >= len(data):
+                        fit_tape(data, bits, data_pointer + effects[-1][0], negative_pointer, max_cells)
+                    iterations = 1 if multiplier is None else value * multiplier & mask
+                    for offset, is_set, amount in effects:
+                        if is_set:
+                            data[data_pointer + offset] = amount
+                        else:
+                            data[data_pointer + offset] = (data[data_pointer + offset] + iterations * amount) & mask
+                        if on_tape_write is not None:
+                            on_tape_write(data_pointer + offset - origin)
+                    data[data_pointer] = 0
+                    if on_tape_write is not None:
+                        on_tape_write(data_pointer - origin)
+            elif op == JUMP_IF_ZERO:
+                if data[data_pointer] == 0:
+                    instruction_pointer = arg
+                elif on_loop_enter is not None:
+                    on_loop_enter(loop_indexes[instruction_pointer])
+            elif op == JUMP_IF_NOT_ZERO:
+                if data[data_pointer] != 0:
+                    steps += instruction_pointer - arg
+                    instruction_pointer = arg
+                    if on_step is not None:
+                        on_step(steps)
+                    if steps >= next_check:
+                        next_check = limits.check(steps)
+            elif op == OUTPUT:
+                if bits <= 8:
+                    output_buffer.append(data[data_pointer])
+                else:
+                    output_buffer += chr(data[data_pointer]).encode("utf8", "surrogatepass")
+                if len(output_buffer) >= output.threshold:
+                    output.flush()
+                if on_output is not None:
+                    on_output(data[data_pointer])
+            elif op == INPUT:
+                output.flush()
+                value = input.read()
+                if value is not None:
+                    data[data_pointer] = value
+                    if on_tape_write is not None:
+                        on_tape_write(data_pointer - origin)
+                if on_input is not None:
+                    on_input(value)
+            elif op == INFINITE_LOOP:
+                if data[data_pointer] != 0:
+                    if on_loop_enter is not None:
+                        on_loop_enter(loop_indexes[instruction_pointer])
+                    raise InfiniteLoop(arg)
+
+            instruction_pointer += 1
+    except ExecutionStopped as error:
+        error.set_state(data, data_pointer, origin, output, instruction_pointer, steps)
+        raise
+
+    return data_pointer, origin
+
+
+INTERPRETER_VERSION = 2  # in the disk cache's keys and in snapshots: change it when the bytecode or the backends change
+CACHE_MAX_SIZE = int(os.environ.get("BF_IT_CACHE_SIZE", 256 * 2 ** 20))  # bytes, see evict_cache
+CACHE_SUFFIXES = (".program", ".python", ".jit", ".so")  # of the cache's entries (other files are being written)
+CACHE_DIRECTORY = None  # see get_cache_directory
+
+
+def is_private_directory(directory):
+    # whether only the current user can write to the directory (on systems with owners and permission bits)
+    # the cache's entries are executed, so anyone who could plant one could run code as whoever runs BF-it
+    if not hasattr(os, "getuid"):
+        return True
+    status = os.stat(directory)
+    return status.st_uid == os.getuid() and status.st_mode & 0o022 == 0
+
+
+def get_cache_directory():
+    # the directory where prepared and compiled programs are kept between runs: $XDG_CACHE_HOME/BF-it
+    # (~/.cache/BF-it by default), created for the current user only. if it isn't private (see is_private_directory),
+    # the cache is bypassed: a new private temporary directory is used instead, and removed when the process exits
+    global CACHE_DIRECTORY
+    if CACHE_DIRECTORY is not None:
+        return CACHE_DIRECTORY
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    directory = os.path.join(base, "BF-it")
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        private = is_private_directory(directory)
+    except OSError:
+        private = False
+    if not private:
+        print("WARNING (interpreter) - the cache directory %s is not private to the current user, "
+              "so it is not used" % directory, file=sys.stderr)
+        import atexit
+        import shutil
+        import tempfile
+        directory = tempfile.mkdtemp(prefix="BF-it-")
+        atexit.register(shutil.rmtree, directory, True)
+    CACHE_DIRECTORY = directory
+    return directory
+
+
+def get_cache_path(program_hash, bits, suffix):
+    # returns the path of a cache entry of the program (by the hash of its text), for its cell width
+    return os.path.join(get_cache_directory(), "%s-%d-v%d%s" % (program_hash, bits, INTERPRETER_VERSION, suffix))
+
+
+def read_cache(path):
+    # returns the value stored in a cache entry by write_cache, or None if there's no such entry
+    # the entry is read with a single mmap, and marked as recently used
+    import mmap
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+            value = marshal.loads(memory)
+        os.utime(path)
+    except (OSError, ValueError, EOFError, TypeError):  # missing, empty (mmap fails) or corrupt
+        return None
+    return value
+
+
+def write_cache(path, value):
+    # stores the value (anything marshal supports) in a cache entry, see read_cache
+    temporary_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(temporary_path, 'wb') as f:
+        f.write(marshal.dumps(value))
+    os.replace(temporary_path, path)  # atomic, in case other processes write the same entry
+    evict_cache()
+
+
+def evict_cache():
+    # removes the least recently used cache entries until they take at most CACHE_MAX_SIZE bytes
+    # reading an entry updates its modification time, which is what "used" means here
+
+    entries = list()
+    with os.scandir(get_cache_directory()) as files:
+        for file in files:
+            if file.name.endswith(CACHE_SUFFIXES):
+                try:
+                    stat = file.stat()
+                except OSError:
+                    continue  # removed by another process
+                entries.append((stat.st_mtime, stat.st_size, file.path))
+    size = sum(entry_size for _, entry_size, _ in entries)
+    for _, entry_size, path in sorted(entries):
+        if size <= CACHE_MAX_SIZE:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        size -= entry_size
+
+
+PYTHON_BACKEND_CACHE = dict()  # (program hash, bits) -> code object, see get_python_code
+PYTHON_MAX_NESTING = 16  # loops nested deeper than this are moved to their own function (Python allows 20 blocks)
+
+
+def compile_to_python(bytecode, bits):
+    # translates the bytecode into the source code of a Python module with a main(tape, p) function,
+    # where tape is the program's tape and p is the data pointer. main returns the final data pointer
+    #
+    # blocks are translated into offset-addressed statements (tape[p + k] = ...), with a single bounds check
+    # and a single pointer adjustment per block, and loops become "while tape[p]:" blocks
+    # the module expects the following globals: mask, scan, reserve, read, flush, output_buffer, halt, intrinsic
+    # code marked with an intrinsic hint runs only if intrinsic(tape, p, name, offset) can't do it, see run_intrinsic
+    # reserve(tape, p, low, high) makes sure tape[p + low] and tape[p + high] exist and returns the new p
+    # halt(p, index) raises InfiniteLoop when the loop at index in the program, that can never end, is entered
+
+    functions = list()
+
+    def emit_reserve(lines, indent, low, high):
+        conditions = list()
+        if low < 0:
+            conditions.append("p - %d < 0" % -low)
+        if high > 0:
+            conditions.append("p + %d >= len(tape)" % high)
+        if conditions:
+            lines.append(indent + "if %s:" % " or ".join(conditions))
+            lines.append(indent + "    p = reserve(tape, p, %d, %d)" % (low, high))
+
+    def cell(offset):
+        if offset == 0:
+            return "tape[p]"
+        return "tape[p %s %d]" % ("+" if offset > 0 else "-", abs(offset))
+
+    def emit_block(lines, indent, instructions):
+        # a run of ADD/MOVE/CLEAR/BLOCK instructions, see get_block
+        low, high, move, effects = get_block(instructions, 2 ** bits)
+        emit_reserve(lines, indent, low, high)
+        for offset, is_set, value in effects:
+            if is_set:
+                lines.append(indent + "%s = %d" % (cell(offset), value))
+            else:
+                lines.append(indent + "%s = (%s + %d) & mask" % (cell(offset), cell(offset), value))
+        if move != 0:
+            lines.append(indent + "p %s= %d" % ("+" if move > 0 else "-", abs(move)))
+
+    def emit(lines, start, end, depth):
+        # emits the instructions in bytecode[start:end] at the given nesting depth
+        indent = "    " * depth
+        index = start
+        while index < end:
+            op, arg = bytecode[index]
+            if op in BLOCK_OPS:
+                block_end = index
+                while block_end < end and bytecode[block_end][0] in BLOCK_OPS:
+                    block_end += 1
+                emit_block(lines, indent, bytecode[index:block_end])
+                index = block_end
+                continue
+
+            if op == OUTPUT:
+                if bits <= 8:
+                    lines.append(indent + "output_buffer.append(tape[p])")
+                else:
+                    lines.append(indent + "output_buffer.extend(chr(tape[p]).encode('utf8', 'surrogatepass'))")
+                lines.append(indent + "if len(output_buffer) >= %d:" % OUTPUT_FLUSH_THRESHOLD)
+                lines.append(indent + "    flush()")
+            elif op == INPUT:
+                lines.append(indent + "flush()")
+                lines.append(indent + "value = read()")
+                lines.append(indent + "if value is not None:")
+                lines.append(indent + "    tape[p] = value")
+            elif op == INFINITE_LOOP:
+                lines.append(indent + "if tape[p]:")
+                lines.append(indent + "    halt(p, %d)" % arg)
+            elif op == SCAN:
+                lines.append(indent + "p = scan(tape, p, %d)" % arg)
+                lines.append(indent + "if not 0 <= p < len(tape):")
+                lines.append(indent + "    p = reserve(tape, p, 0, 0)")
+            elif op == LINEAR:
+                multiplier, effects = arg
+                lines.append(indent + "if tape[p]:")
+                emit_reserve(lines, indent + "    ", min(effects[0][0], 0), max(effects[-1][0], 0))
+                if multiplier is None:
+                    iterations = "1"
+                elif multiplier == 1:
+                    iterations = "tape[p]"
+                else:
+                    lines.append(indent + "    iterations = tape[p] * %d & mask" % multiplier)
+                    iterations = "iterations"
+                for offset, is_set, amount in effects:
+                    if is_set:
+                        lines.append(indent + "    %s = %d" % (cell(offset), amount))
+                    elif iterations == "1":
+                        lines.append(indent + "    %s = (%s + %d) & mask" % (cell(offset), cell(offset), amount))
+                    else:
+                        lines.append(indent + "    %s = (%s + %s * %d) & mask" % (cell(offset), cell(offset), iterations, amount))
+                lines.append(indent + "    tape[p] = 0")
+            elif op == JUMP_IF_ZERO:
+                if depth >= PYTHON_MAX_NESTING:
+                    lines.append(indent + "p = loop_%d(tape, p)" % index)
+                    functions.append(emit_function("loop_%d" % index, index, arg + 1))
+                else:
+                    lines.append(indent + "while tape[p]:")
+                    emit(lines, index + 1, arg, depth + 1)
+                index = arg + 1
+                continue
+            elif op == INTRINSIC:
+                name, offset, hint_end = arg
+                lines.append(indent + "result = intrinsic(tape, p, %r, %d)" % (name, offset))
+                lines.append(indent + "if result is not None:")
+                lines.append(indent + "    p = result")
+                lines.append(indent + "else:")
+                emit(lines, index + 1, hint_end + 1, depth + 1)
+                index = hint_end + 1
+                continue
+
+            index += 1
+
+        if start == end:
+            lines.append(indent + "pass")
+
+    def emit_function(name, start, end):
+        lines = ["def %s(tape, p):" % name]
+        emit(lines, start, end, 1)
+        lines.append("    return p")
+        return "\n".join(lines)
+
+    main = emit_function("main", 0, len(bytecode))
+    return "\n\n\n".join(functions + [main]) + "\n"
+
+
+def get_python_code(program, bytecode, bits, cache=False):
+    # returns the compiled Python module of the program, see compile_to_python
+    # cache keeps it on disk too (by the program's hash), for the next runs
+    key = (hashlib.sha256(program.encode("utf8")).hexdigest(), bits)
+    if key not in PYTHON_BACKEND_CACHE:
+        # code objects are specific to the Python version
+        path = get_cache_path(key[0], bits, ".%s.python" % sys.implementation.cache_tag)
+        code = read_cache(path) if cache else None
+        if code is None:
+            code = compile(compile_to_python(bytecode, bits), "<brainfuck>", "exec")
+            if cache:
+                write_cache(path, code)
+        PYTHON_BACKEND_CACHE[key] = code
+    return PYTHON_BACKEND_CACHE[key]
+
+
+def run_python(code, bits, data, negative_pointer, input, output):
+    # executes the program translated to Python (code is from get_python_code)
+    # returns the final data pointer and the index of the (original) first cell, like run_bytecode
+
+    origin = 0
+
+    def reserve(tape, pointer, low, high):
+        nonlocal origin
+        shift = 0
+        if pointer + low < 0:
+            shift = fit_tape(tape, bits, pointer + low, negative_pointer)
+            origin += shift
+        if pointer + shift + high >= len(tape):
+            fit_tape(tape, bits, pointer + shift + high, negative_pointer)
+        return pointer + shift
+
+    def halt(pointer, index):
+        error = InfiniteLoop(index)
+        error.set_state(data, pointer, origin, output)
+        raise error
+
+    def intrinsic(tape, pointer, name, offset):
+        return run_intrinsic(tape, bits, pointer, name, offset)
+
+    module = dict(mask=2 ** bits - 1, scan=scan, reserve=reserve, read=input.read, flush=output.flush,
+                  output_buffer=output.buffer, halt=halt, intrinsic=intrinsic)
+    exec(code, module)
+    data_pointer = module["main"](data, 0)
+    return data_pointer, origin
+
+
+C_BACKEND_CACHE = dict()  # (program hash, bits) -> loaded shared object, see get_c_library
+C_CELL_TYPES = ((8, "uint8_t", "c_uint8"), (16, "uint16_t", "c_uint16"),  # (bits, C type, ctypes type)
+                (32, "uint32_t", "c_uint32"), (64, "uint64_t", "c_uint64"))
+C_MAX_FUNCTION_SIZE = 150  # instructions per generated C function, C compilers are slow on huge functions
+
+C_PRELUDE = """#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+typedef %(cell_type)s cell;
+#define MASK ((uint64_t) %(mask)dULL)
+#define OUTPUT_SIZE %(output_size)d
+
+typedef int (*read_function)(void);
+typedef int (*write_function)(const cell *, size_t);
+
+enum { DONE = 0, NEGATIVE_POINTER = 1, OUT_OF_MEMORY = 2, ABORTED = 3, HALTED = 4 };  // HALTED + index of an infinite loop
+
+struct state {
+    cell *tape;
+    long long size;
+    long long origin;
+    int grow_left;
+    read_function read;
+    write_function write;
+    size_t output_length;
+    cell output[OUTPUT_SIZE];
+};
+
+static int reserve(struct state *s, long long *p, long long low, long long high) {
+    // makes sure s->tape[*p + low] and s->tape[*p + high] exist, like fit_tape in Engine.py
+    if (*p + low < 0) {
+        if (!s->grow_left) {
+            *p += low;
+            return NEGATIVE_POINTER;
+        }
+        long long shift = -(*p + low) > s->size ? -(*p + low) : s->size;
+        cell *grown = realloc(s->tape, (s->size + shift) * sizeof(cell));
+        if (!grown) {
+            return OUT_OF_MEMORY;
+        }
+        memmove(grown + shift, grown, s->size * sizeof(cell));
+        memset(grown, 0, shift * sizeof(cell));
+        s->tape = grown;
+        s->size += shift;
+        s->origin += shift;
+        *p += shift;
+    }
+    if (*p + high >= s->size) {
+        long long grow = *p + high + 1 - s->size > s->size ? *p + high + 1 - s->size : s->size;
+        cell *grown = realloc(s->tape, (s->size + grow) * sizeof(cell));
+        if (!grown) {
+            return OUT_OF_MEMORY;
+        }
+        memset(grown + s->size, 0, grow * sizeof(cell));
+        s->tape = grown;
+        s->size += grow;
+    }
+    return DONE;
+}
+
+static int flush(struct state *s) {
+    if (s->output_length && s->write(s->output, s->output_length)) {
+        return ABORTED;
+    }
+    s->output_length = 0;
+    return DONE;
+}
+
+// the generated functions keep the tape and the data pointer in locals, and give them back to the state
+// (or get them from it) around anything that may reallocate the tape
+#define CHECK(call) do { \\
+        status = (call); \\
+        tape = s->tape; \\
+        if (status != DONE) { \\
+            *pointer = p; \\
+            return status; \\
+        } \\
+    } while (0)
+
+#define RESERVE(low, high) CHECK(reserve(s, &p, low, high))
+
+"""
+
+C_MAIN = """
+void bf_free(cell *tape) {
+    free(tape);
+}
+
+int bf_run(const cell *initial_tape, long long initial_size, cell **out_tape, long long *out_size,
+           long long *out_p, long long *out_origin, int grow_left, read_function read, write_function write) {
+    long long p = 0;
+    int result;
+    struct state *s = malloc(sizeof(struct state));
+    if (!s) {
+        return OUT_OF_MEMORY;
+    }
+    s->tape = malloc(initial_size * sizeof(cell));
+    if (!s->tape) {
+        free(s);
+        return OUT_OF_MEMORY;
+    }
+    memcpy(s->tape, initial_tape, initial_size * sizeof(cell));
+    s->size = initial_size;
+    s->origin = 0;
+    s->grow_left = grow_left;
+    s->read = read;
+    s->write = write;
+    s->output_length = 0;
+
+    result = f%(main)d(s, &p);
+    if (flush(s) != DONE && result == DONE) {
+        result = ABORTED;
+    }
+
+    *out_tape = s->tape;
+    *out_size = s->size;
+    *out_p = p;
+    *out_origin = s->origin;
+    free(s);
+    return result;
+}
+"""
+
+
+def compile_to_c(bytecode, bits):
+    # translates the bytecode into the source code of a C library with a bf_run function, see C_PRELUDE
+    # the translation is straight-line code: blocks become offset-addressed statements with a single bounds check
+    # and a single pointer adjustment per block, and loops become "while (tape[p])" blocks
+    # the code is split into functions of at most about C_MAX_FUNCTION_SIZE instructions
+
+    cell_type = next(name for cell_bits, name, _ in C_CELL_TYPES if bits <= cell_bits)
+    mask = 2 ** bits - 1
+    functions = list()
+
+    def cell(offset):
+        if offset == 0:
+            return "tape[p]"
+        return "tape[p %s %d]" % ("+" if offset > 0 else "-", abs(offset))
+
+    def emit_reserve(lines, indent, low, high):
+        conditions = list()
+        if low < 0:
+            conditions.append("p - %d < 0" % -low)
+        if high > 0:
+            conditions.append("p + %d >= s->size" % high)
+        if conditions:
+            lines.append(indent + "if (%s) RESERVE(%d, %d);" % (" || ".join(conditions), low, high))
+
+    def get_items(start, end):
+        # splits bytecode[start:end] into (start, end) ranges of single instructions, block runs, and loops
+        items = list()
+        index = start
+        while index < end:
+            op, arg = bytecode[index]
+            if op == JUMP_IF_ZERO:
+                item_end = arg + 1
+            elif op in BLOCK_OPS:
+                item_end = index + 1
+                while item_end < end and bytecode[item_end][0] in BLOCK_OPS:
+                    item_end += 1
+            else:
+                item_end = index + 1
+            items.append((index, item_end))
+            index = item_end
+        return items
+
+    def emit_call(lines, indent, start, end):
+        lines.append(indent + "CHECK(f%d(s, &p));" % emit_function(start, end))
+
+    def emit_sequence(lines, indent, start, end):
+        for item_start, item_end in get_items(start, end):
+            emit_item(lines, indent, item_start, item_end)
+
+    def emit_item(lines, indent, start, end):
+        op, arg = bytecode[start]
+        if op in BLOCK_OPS:
+            low, high, move, effects = get_block(bytecode[start:end], 2 ** bits)
+            emit_reserve(lines, indent, low, high)
+            for offset, is_set, value in effects:
+                if is_set:
+                    lines.append(indent + "%s = %d;" % (cell(offset), value))
+                else:
+                    lines.append(indent + "%s = (cell) ((%s + %dULL) & MASK);" % (cell(offset), cell(offset), value))
+            if move != 0:
+                lines.append(indent + "p += %d;" % move)
+        elif op == OUTPUT:
+            lines.append(indent + "s->output[s->output_length++] = tape[p];")
+            lines.append(indent + "if (s->output_length == OUTPUT_SIZE) CHECK(flush(s));")
+        elif op == INPUT:
+            lines.append(indent + "CHECK(flush(s));")
+            lines.append(indent + "value = s->read();")
+            lines.append(indent + "if (value == -2) CHECK(ABORTED);")
+            lines.append(indent + "if (value >= 0) tape[p] = (cell) value;")
+        elif op == INFINITE_LOOP:
+            lines.append(indent + "if (tape[p]) CHECK(HALTED + %d);" % arg)
+        elif op == SCAN:
+            if arg == 1 and bits <= 8:
+                lines.append(indent + "{ cell *zero = memchr(tape + p, 0, s->size - p); p = zero ? zero - tape : s->size; }")
+            elif arg > 0:
+                lines.append(indent + "while (p < s->size && tape[p]) p += %d;" % arg)
+            else:
+                lines.append(indent + "while (p >= 0 && tape[p]) p -= %d;" % -arg)
+            lines.append(indent + "if (p < 0 || p >= s->size) RESERVE(0, 0);")
+        elif op == LINEAR:
+            multiplier, effects = arg
+            lines.append(indent + "if (tape[p]) {")
+            emit_reserve(lines, indent + "    ", min(effects[0][0], 0), max(effects[-1][0], 0))
+            if multiplier is None:
+                lines.append(indent + "    iterations = 1;")
+            else:
+                lines.append(indent + "    iterations = (uint64_t) tape[p] * %dULL & MASK;" % multiplier)
+            for offset, is_set, amount in effects:
+                if is_set:
+                    lines.append(indent + "    %s = %d;" % (cell(offset), amount))
+                else:
+                    lines.append(indent + "    %s = (cell) ((%s + iterations * %dULL) & MASK);" % (cell(offset), cell(offset), amount))
+            lines.append(indent + "    tape[p] = 0;")
+            lines.append(indent + "}")
+        elif op == JUMP_IF_ZERO:
+            lines.append(indent + "while (tape[p]) {")
+            if end - start > C_MAX_FUNCTION_SIZE:
+                emit_call(lines, indent + "    ", start + 1, end - 1)
+            else:
+                emit_sequence(lines, indent + "    ", start + 1, end - 1)
+            lines.append(indent + "}")
+
+    def emit_function(start, end):
+        # emits a function that executes bytecode[start:end] and returns its number
+        chunks = [[]]
+        chunk_size = 0
+        for item_start, item_end in get_items(start, end):
+            item_size = 1 if item_end - item_start > C_MAX_FUNCTION_SIZE else item_end - item_start
+            if chunks[-1] and chunk_size + item_size > C_MAX_FUNCTION_SIZE:
+                chunks.append(list())
+                chunk_size = 0
+            chunks[-1].append((item_start, item_end))
+            chunk_size += item_size
+
+        number = len(functions)
+        functions.append(None)  # reserves the number, the function is complete only after its callees
+        lines = list()
+        if len(chunks) == 1:
+            for item_start, item_end in chunks[0]:
+                emit_item(lines, "    ", item_start, item_end)
+        else:
+            for chunk in chunks:
+                emit_call(lines, "    ", chunk[0][0], chunk[-1][1])
+
+        functions[number] = "\n".join([
+            "static int f%d(struct state *s, long long *pointer) {" % number,
+            "    cell *tape = s->tape;",
+            "    long long p = *pointer;",
+            "    int status, value;",
+            "    uint64_t iterations;",
+            "    (void) tape, (void) status, (void) value, (void) iterations;",
+        ] + lines + [
+            "    *pointer = p;",
+            "    return DONE;",
+            "}",
+        ])
+        return number
+
+    main = emit_function(0, len(bytecode))
+    prototypes = ["static int f%d(struct state *s, long long *pointer);" % number for number in range(len(functions))]
+    prelude = C_PRELUDE % dict(cell_type=cell_type, mask=mask, output_size=OUTPUT_FLUSH_THRESHOLD)
+    return prelude + "\n".join(prototypes) + "\n\n" + "\n\n".join(functions) + "\n" + C_MAIN % dict(main=main)
+
+
+def get_c_library(program, bytecode, bits):
+    # returns the program compiled to a shared object by the system C compiler and loaded with ctypes
+    # the shared object is cached on disk by the program's hash, so the C compiler runs once per program
+    import ctypes
+    import shutil
+    import subprocess
+
+    key = (hashlib.sha256(program.encode("utf8")).hexdigest(), bits)
+    if key in C_BACKEND_CACHE:
+        return C_BACKEND_CACHE[key]
+
+    library_path = get_cache_path(key[0], bits, ".so")
+    if os.path.exists(library_path):
+        os.utime(library_path)  # recently used, see evict_cache
+    else:
+        compiler = os.environ.get("CC", "cc")
+        if shutil.which(compiler) is None:
+            raise RuntimeError("Brainfuck: the C backend needs a C compiler, but '%s' was not found (set CC)" % compiler)
+
+        source_path = library_path[:-len(".so")] + "-%d.c" % os.getpid()
+        with open(source_path, "wt") as f:
+            f.write(compile_to_c(bytecode, bits))
+        temporary_path = source_path[:-len(".c")] + ".so.tmp"
+        try:
+            subprocess.run([compiler, "-O1", "-shared", "-fPIC", "-o", temporary_path, source_path],
+                           check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            os.replace(temporary_path, library_path)  # atomic, in case other processes compile the same program
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError("Brainfuck: the C compiler failed:\n%s" % e.stdout.decode("utf8", "replace"))
+        finally:
+            os.remove(source_path)
+        evict_cache()
+
+    cell_ctype = getattr(ctypes, next(ctype for cell_bits, _, ctype in C_CELL_TYPES if bits <= cell_bits))
+    library = ctypes.CDLL(library_path)
+    library.bf_run.restype = ctypes.c_int
+    library.bf_run.argtypes = [ctypes.POINTER(cell_ctype), ctypes.c_longlong, ctypes.POINTER(ctypes.POINTER(cell_ctype)),
+                               ctypes.POINTER(ctypes.c_longlong), ctypes.POINTER(ctypes.c_longlong),
+                               ctypes.POINTER(ctypes.c_longlong), ctypes.c_int,
+                               ctypes.CFUNCTYPE(ctypes.c_int),
+                               ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(cell_ctype), ctypes.c_size_t)]
+    library.bf_free.argtypes = [ctypes.POINTER(cell_ctype)]
+    C_BACKEND_CACHE[key] = library
+    return library
+
+
+def run_c(library, bits, data, negative_pointer, input, output):
+    # executes the program translated to C and compiled (library is from get_c_library)
+    # returns the final data pointer and the index of the (original) first cell, like run_bytecode
+    import ctypes
+    import signal
+    import threading
+
+    read_type, write_type = library.bf_run.argtypes[-2:]
+    cell_ctype = library.bf_free.argtypes[0]._type_
+    errors = list()  # exceptions can't propagate through C, so the callbacks keep them here and abort the run
+
+    def read():
+        try:
+            output.flush()
+            value = input.read()
+            return -1 if value is None else value
+        except BaseException as e:
+            errors.append(e)
+            return -2
+
+    def write(cells, length):
+        try:
+            if bits <= 8:
+                output.buffer += ctypes.string_at(cells, length)
+            else:
+                for index in range(length):
+                    output.buffer += chr(cells[index]).encode("utf8", "surrogatepass")
+            if len(output.buffer) >= OUTPUT_FLUSH_THRESHOLD:
+                output.flush()
+            return 0
+        except BaseException as e:
+            errors.append(e)
+            return 1
+
+    initial_tape = (cell_ctype * len(data)).from_buffer(data)
+    tape = ctypes.POINTER(cell_ctype)()
+    size, data_pointer, origin = ctypes.c_longlong(), ctypes.c_longlong(), ctypes.c_longlong()
+    # Python can't handle ctrl+C while the compiled code runs, so let it kill the process instead of being ignored
+    interrupt_handler = None
+    if threading.current_thread() is threading.main_thread():
+        interrupt_handler = signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        result = library.bf_run(initial_tape, len(data), ctypes.byref(tape), ctypes.byref(size), ctypes.byref(data_pointer),
+                                ctypes.byref(origin), negative_pointer == "grow", read_type(read), write_type(write))
+    finally:
+        if interrupt_handler is not None:
+            signal.signal(signal.SIGINT, interrupt_handler)
+    del initial_tape  # releases the export of data's buffer, so it can be resized
+    try:
+        if errors:
+            raise errors[0]
+        if result == 1:
+            raise IndexError("Brainfuck: data pointer moved to the left of the tape (to %s)" % data_pointer.value)
+        if result == 2:
+            raise MemoryError("Brainfuck: out of memory for the tape")
+        data[:] = type(data)(ctypes.string_at(tape, size.value * ctypes.sizeof(cell_ctype))) if bits <= 8 else \
+            array.array(data.typecode, ctypes.string_at(tape, size.value * ctypes.sizeof(cell_ctype)))
+    finally:
+        library.bf_free(tape)
+    if result >= 4:
+        error = InfiniteLoop(result - 4)
+        error.set_state(data, data_pointer.value, origin.value, output)
+        raise error
+    return data_pointer.value, origin.value
+
+
+JIT_CACHE = dict()  # (program hash, bits) -> (executable memory, function), see get_jit_function
+JIT_STATE = None  # the JITState structure, see get_jit_state
+
+
+def get_jit_state():
+    # returns the JITState structure: shared between the machine code and the Python callbacks
+    # the offsets of its fields are used by compile_to_x86_64
+    # it's created on first use, so that only the runs that use the JIT import ctypes
+    global JIT_STATE
+    if JIT_STATE is not None:
+        return JIT_STATE
+
+    import ctypes
+
+    class JITState(ctypes.Structure):
+        reserve_type = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_int64, ctypes.c_int64)
+        read_type = ctypes.CFUNCTYPE(ctypes.c_int)
+        write_type = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_int)
+        _fields_ = [("base", ctypes.c_void_p),    # 0: address of the first cell
+                    ("end", ctypes.c_void_p),     # 8: address right after the last cell
+                    ("pointer", ctypes.c_int64),  # 16: the data pointer, valid whenever a callback is called
+                    ("reserve", reserve_type),    # 24: reserve(low, high) grows the tape, like reserve in run_python
+                    ("read", read_type),          # 32: read() returns the input byte, -1 for "unchanged", -2 to abort
+                    ("write", write_type)]        # 40: write(value) returns 0, or 1 to abort
+
+    JIT_STATE = JITState
+    return JITState
+
+
+def jit_supported(bits):
+    # the JIT emits x86-64 machine code for the System V calling convention with 8-bit cells
+    import platform
+    return bits == 8 and os.name == "posix" and platform.machine().lower() in ("x86_64", "amd64")
+
+
+def compile_to_x86_64(bytecode):
+    # translates the bytecode into the machine code of a function int run(JITState *state)
+    # that returns 0 when the program ends, 1 when a callback asked to abort,
+    # or 2 + index when it entered the infinite loop at that index of the program
+    #
+    # registers: r12 = address of the current cell, r13 = state->base, r14 = state->end, r15 = state
+    # blocks become offset-addressed instructions on [r12 + k], with a single bounds check and a single
+    # pointer adjustment per block. loops, linear loops and scan loops are translated directly
+
+    code = bytearray()
+    exits = list()  # positions of rel32 jumps to the end of the function
+    aborts = list()  # positions of rel32 jumps to the abort path
+
+    def int32(value):
+        return struct.pack("<i", value)
+
+    def jump(opcode, targets=None):
+        # emits a jump with a rel32 to be patched, returns its position
+        code.extend(opcode + b"\0\0\0\0")
+        if targets is not None:
+            targets.append(len(code) - 4)
+        return len(code) - 4
+
+    def patch(position, target=None):
+        target = len(code) if target is None else target
+        code[position:position + 4] = int32(target - (position + 4))
+
+    def call(offset):
+        # calls a callback of the state, after storing the data pointer in it
+        code.extend(b"\x4c\x89\xe0" b"\x4c\x29\xe8" b"\x49\x89\x87" + int32(16))  # state->pointer = r12 - r13
+        code.extend(b"\x41\xff\x97" + int32(offset))  # call [r15 + offset]
+
+    def reserve(low, high):
+        # makes sure [r12 + low] and [r12 + high] are in the tape
+        if low == 0 and high == 0:
+            return
+        call_position = None
+        if low < 0:
+            code.extend(b"\x49\x8d\x84\x24" + int32(low))  # lea rax, [r12 + low]
+            code.extend(b"\x4c\x39\xe8")  # cmp rax, r13
+            call_position = jump(b"\x0f\x82")  # jb call
+        if high > 0:
+            code.extend(b"\x49\x8d\x84\x24" + int32(high))  # lea rax, [r12 + high]
+            code.extend(b"\x4c\x39\xf0")  # cmp rax, r14
+            done = jump(b"\x0f\x82")  # jb done
+        else:
+            done = jump(b"\xe9")  # jmp done
+        if call_position is not None:
+            patch(call_position)
+        code.extend(b"\x48\xc7\xc7" + int32(low) + b"\x48\xc7\xc6" + int32(high))  # rdi = low, rsi = high
+        call(24)
+        code.extend(b"\x85\xc0")  # test eax, eax
+        jump(b"\x0f\x85", aborts)  # jnz abort
+        code.extend(b"\x4d\x8b\xaf" + int32(0) + b"\x4d\x8b\xb7" + int32(8))  # r13 = state->base, r14 = state->end
+        code.extend(b"\x4d\x8b\xa7" + int32(16) + b"\x4d\x01\xec")  # r12 = state->pointer + r13
+        patch(done)
+
+    # prologue: 5 pushes keep the stack 16-byte aligned for the calls
+    code.extend(b"\x53\x41\x54\x41\x55\x41\x56\x41\x57")  # push rbx, r12, r13, r14, r15
+    code.extend(b"\x49\x89\xff")  # mov r15, rdi
+    code.extend(b"\x4d\x8b\xaf" + int32(0) + b"\x4d\x8b\xb7" + int32(8))  # r13 = state->base, r14 = state->end
+    code.extend(b"\x4d\x8b\xa7" + int32(16) + b"\x4d\x01\xec")  # r12 = state->pointer + r13
+
+    loops = list()
+    index = 0
+    while index < len(bytecode):
+        op, arg = bytecode[index]
+        if op in BLOCK_OPS:
+            block_end = index
+            while block_end < len(bytecode) and bytecode[block_end][0] in BLOCK_OPS:
+                block_end += 1
+            low, high, move, effects = get_block(bytecode[index:block_end], 256)
+            reserve(low, high)
+            for cell_offset, is_set, value in effects:
+                if is_set:
+                    code.extend(b"\x41\xc6\x84\x24" + int32(cell_offset) + bytes([value]))  # mov byte [r12 + k], n
+                else:
+                    code.extend(b"\x41\x80\x84\x24" + int32(cell_offset) + bytes([value]))  # add byte [r12 + k], n
+            if move != 0:
+                code.extend(b"\x49\x81\xc4" + int32(move))  # add r12, move
+            index = block_end
+            continue
+
+        if op == OUTPUT:
+            code.extend(b"\x41\x0f\xb6\x3c\x24")  # movzx edi, byte [r12]
+            call(40)
+            code.extend(b"\x85\xc0")  # test eax, eax
+            jump(b"\x0f\x85", aborts)  # jnz abort
+        elif op == INPUT:
+            call(32)
+            code.extend(b"\x83\xf8\xfe")  # cmp eax, -2
+            jump(b"\x0f\x84", aborts)  # je abort
+            code.extend(b"\x83\xf8\xff")  # cmp eax, -1
+            unchanged = jump(b"\x0f\x84")  # je unchanged
+            code.extend(b"\x41\x88\x04\x24")  # mov [r12], al
+            patch(unchanged)
+        elif op == SCAN:
+            top = len(code)
+            code.extend(b"\x4d\x39\xec" if arg < 0 else b"\x4d\x39\xf4")  # cmp r12, r13 / cmp r12, r14
+            outside = jump(b"\x0f\x82" if arg < 0 else b"\x0f\x83")  # jb outside / jae outside
+            code.extend(b"\x41\x80\x3c\x24\x00")  # cmp byte [r12], 0
+            done = jump(b"\x0f\x84")  # je done
+            code.extend(b"\x49\x81\xc4" + int32(arg))  # add r12, stride
+            patch(jump(b"\xe9"), top)  # jmp top
+            patch(outside)
+            # the tape grows with zero cells, so the scan stops right at the cell it moved to
+            code.extend(b"\x48\xc7\xc7" + int32(0) + b"\x48\xc7\xc6" + int32(0))  # rdi = 0, rsi = 0
+            call(24)
+            code.extend(b"\x85\xc0")  # test eax, eax
+            jump(b"\x0f\x85", aborts)  # jnz abort
+            code.extend(b"\x4d\x8b\xaf" + int32(0) + b"\x4d\x8b\xb7" + int32(8))  # r13 = state->base, r14 = state->end
+            code.extend(b"\x4d\x8b\xa7" + int32(16) + b"\x4d\x01\xec")  # r12 = state->pointer + r13
+            patch(done)
+        elif op == LINEAR:
+            multiplier, effects = arg
+            code.extend(b"\x41\x80\x3c\x24\x00")  # cmp byte [r12], 0
+            skip = jump(b"\x0f\x84")  # je skip
+            reserve(min(effects[0][0], 0), max(effects[-1][0], 0))
+            if multiplier is None:
+                code.extend(b"\xb8" + int32(1))  # mov eax, 1
+            else:
+                code.extend(b"\x41\x0f\xb6\x04\x24")  # movzx eax, byte [r12]
+                if multiplier != 1:
+                    code.extend(b"\x69\xc0" + int32(multiplier))  # imul eax, eax, multiplier
+            for cell_offset, is_set, amount in effects:
+                if is_set:
+                    code.extend(b"\x41\xc6\x84\x24" + int32(cell_offset) + bytes([amount]))  # mov byte [r12 + k], n
+                else:
+                    code.extend(b"\x69\xc8" + int32(amount))  # imul ecx, eax, amount
+                    code.extend(b"\x41\x00\x8c\x24" + int32(cell_offset))  # add byte [r12 + k], cl
+            code.extend(b"\x41\xc6\x04\x24\x00")  # mov byte [r12], 0
+            patch(skip)
+        elif op == INFINITE_LOOP:
+            code.extend(b"\x41\x80\x3c\x24\x00")  # cmp byte [r12], 0
+            skip = jump(b"\x0f\x84")  # je skip
+            code.extend(b"\xb8" + int32(2 + arg))  # mov eax, 2 + index
+            jump(b"\xe9", exits)
+            patch(skip)
+        elif op == JUMP_IF_ZERO:
+            code.extend(b"\x41\x80\x3c\x24\x00")  # cmp byte [r12], 0
+            loops.append((jump(b"\x0f\x84"), len(code)))  # je end of loop
+        elif op == JUMP_IF_NOT_ZERO:
+            loop_start, body = loops.pop()
+            code.extend(b"\x41\x80\x3c\x24\x00")  # cmp byte [r12], 0
+            patch(jump(b"\x0f\x85"), body)  # jne body
+            patch(loop_start)
+        index += 1
+
+    code.extend(b"\x31\xc0")  # xor eax, eax
+    jump(b"\xe9", exits)
+    for position in aborts:
+        patch(position)
+    code.extend(b"\xb8" + int32(1))  # mov eax, 1
+    for position in exits:
+        patch(position)
+    code.extend(b"\x4c\x89\xe1" b"\x4c\x29\xe9" b"\x49\x89\x8f" + int32(16))  # state->pointer = r12 - r13
+    code.extend(b"\x41\x5f\x41\x5e\x41\x5d\x41\x5c\x5b\xc3")  # pop r15, r14, r13, r12, rbx; ret
+    return bytes(code)
+
+
+def get_jit_function(program, bytecode, bits, cache=False):
+    # returns the program's machine code (see compile_to_x86_64) loaded into executable memory, as a ctypes function
+    # cache keeps the machine code on disk too (by the program's hash), for the next runs
+    import ctypes
+    import mmap
+
+    key = (hashlib.sha256(program.encode("utf8")).hexdigest(), bits)
+    if key not in JIT_CACHE:
+        path = get_cache_path(key[0], bits, ".jit")
+        code = read_cache(path) if cache else None
+        if code is None:
+            code = compile_to_x86_64(bytecode)
+            if cache:
+                write_cache(path, code)
+        memory = mmap.mmap(-1, len(code), prot=mmap.PROT_READ | mmap.PROT_WRITE)
+        memory.write(code)
+        address = ctypes.addressof(ctypes.c_char.from_buffer(memory))
+        # the memory is written while it's not executable, and becomes executable only once it's not writable
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.mprotect.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+        if libc.mprotect(address, len(code), mmap.PROT_READ | mmap.PROT_EXEC) != 0:
+            raise OSError(ctypes.get_errno(), "Brainfuck: can't make the JIT code executable")
+        function = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(get_jit_state()))(address)
+        JIT_CACHE[key] = (memory, function)  # the memory has to stay alive as long as the function
+    return JIT_CACHE[key][1]
+
+
+def run_jit(function, bits, data, negative_pointer, input, output):
+    # executes the program as x86-64 machine code (function is from get_jit_function)
+    # returns the final data pointer and the index of the (original) first cell, like run_bytecode
+    import ctypes
+
+    state = get_jit_state()()
+    origin = 0
+    errors = list()  # exceptions can't propagate through the machine code, so the callbacks keep them here and abort
+    tape = None
+
+    def export_tape():
+        # the machine code works on data's buffer directly. it has to be released before data can be resized
+        nonlocal tape
+        tape = (ctypes.c_uint8 * len(data)).from_buffer(data)
+        state.base = ctypes.addressof(tape)
+        state.end = state.base + len(data)
+
+    def reserve(low, high):
+        nonlocal tape, origin
+        try:
+            tape = None
+            shift = 0
+            if state.pointer + low < 0:
+                shift = fit_tape(data, bits, state.pointer + low, negative_pointer)
+                origin += shift
+            if state.pointer + shift + high >= len(data):
+                fit_tape(data, bits, state.pointer + shift + high, negative_pointer)
+            state.pointer += shift
+            export_tape()
+            return 0
+        except BaseException as e:
+            errors.append(e)
+            return 1
+
+    def read():
+        try:
+            output.flush()
+            value = input.read()
+            return -1 if value is None else value
+        except BaseException as e:
+            errors.append(e)
+            return -2
+
+    def write(value):
+        try:
+            output.buffer.append(value)
+            if len(output.buffer) >= OUTPUT_FLUSH_THRESHOLD:
+                output.flush()
+            return 0
+        except BaseException as e:
+            errors.append(e)
+            return 1
+
+    export_tape()
+    state.pointer = 0
+    state.reserve = state.reserve_type(reserve)
+    state.read = state.read_type(read)
+    state.write = state.write_type(write)
+    try:
+        result = function(ctypes.byref(state))
+    finally:
+        tape = None
+    if errors:
+        raise errors[0]
+    if result >= 2:
+        error = InfiniteLoop(result - 2)
+        error.set_state(data, state.pointer, origin, output)
+        raise error
+    return state.pointer, origin
+
+
+CPP_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interpreter")
+CPP_SOURCES = ("library.cpp", "interpreter.cpp", "command.cpp")  # the C++ interpreter's files in the shared object,
+CPP_HEADERS = ("interpreter.h", "command.h")  # see get_cpp_library
+CPP_LIBRARY = None  # the C++ interpreter, loaded with ctypes, see get_cpp_library
+
+
+def cpp_supported(bits):
+    # the C++ interpreter has 8-bit cells
+    return bits == 8
+
+
+def get_cpp_library():
+    # returns the C++ interpreter (interpreter/) built as a shared object by the system C++ compiler and loaded
+    # with ctypes. it's built into the cache directory (see get_cache_directory), by the hash of its sources,
+    # so it's built once per version of them, and never in interpreter/ (which may be read-only)
+    global CPP_LIBRARY
+    if CPP_LIBRARY is not None:
+        return CPP_LIBRARY
+    import ctypes
+    import shutil
+    import subprocess
+
+    sources_hash = hashlib.sha256()
+    for name in CPP_SOURCES + CPP_HEADERS:
+        with open(os.path.join(CPP_DIRECTORY, name), "rb") as f:
+            sources_hash.update(f.read())
+    library_path = get_cache_path("cpp-" + sources_hash.hexdigest(), 8, ".so")
+    if os.path.exists(library_path):
+        os.utime(library_path)  # recently used, see evict_cache
+    else:
+        compiler = os.environ.get("CXX", "g++")
+        if shutil.which(compiler) is None:
+            raise RuntimeError("Brainfuck: the cpp backend needs a C++ compiler, but '%s' was not found (set CXX)"
+                               % compiler)
+        temporary_path = "%s.%d.tmp" % (library_path, os.getpid())
+        try:
+            subprocess.run([compiler, "-shared", "-fPIC", "-std=c++11", "-O2", "-s", "-o", temporary_path] +
+                           [os.path.join(CPP_DIRECTORY, name) for name in CPP_SOURCES],
+                           check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            os.replace(temporary_path, library_path)  # atomic, in case other processes build it at the same time
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError("Brainfuck: building the C++ interpreter failed:\n%s" % e.stdout.decode("utf8", "replace"))
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        evict_cache()
+    library = ctypes.CDLL(library_path)
+
+    class CppResult(ctypes.Structure):
+        # struct bf_result of interpreter/library.cpp, released with bf_free
+        _fields_ = [("output", ctypes.POINTER(ctypes.c_uint8)),
+                    ("output_size", ctypes.c_size_t),
+                    ("input_position", ctypes.c_size_t),  # how many input bytes the program read
+                    ("tape", ctypes.POINTER(ctypes.c_uint8)),
+                    ("tape_size", ctypes.c_size_t),
+                    ("tape_index", ctypes.c_size_t),
+                    ("error", ctypes.c_char_p),
+                    ("loop_index", ctypes.c_size_t),  # of the infinite loop the program halted in
+                    ("origin", ctypes.c_size_t)]  # how many cells the tape grew to the left
+
+    library.bf_run.restype = ctypes.c_int
+    library.bf_run.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.c_char_p, ctypes.c_size_t, ctypes.c_int,
+                               ctypes.c_int, ctypes.POINTER(ctypes.c_size_t), ctypes.c_size_t, ctypes.POINTER(ctypes.c_int),
+                               ctypes.POINTER(CppResult)]
+    library.bf_free.argtypes = [ctypes.POINTER(CppResult)]
+    CPP_LIBRARY = library
+    return library
+
+
+def run_cpp(library, program, bytecode, bits, data, negative_pointer, input, output):
+    # executes the program (its source) with the C++ interpreter (library is from get_cpp_library)
+    # returns the final data pointer and the index of the (original) first cell, like run_bytecode
+    # the C++ interpreter runs on a buffer: the whole input is read before the program starts,
+    # and the output is written when it ends
+    # the loops that never end are found in the bytecode (see is_infinite_loop), and the interpreter halts in them
+    # it runs in another thread, so that ctrl+C (KeyboardInterrupt) stops it
+    import ctypes
+    import threading
+
+    assert cpp_supported(bits)
+    source = program.encode("utf8")
+    loops = [arg for op, arg in bytecode if op == INFINITE_LOOP]
+    # the C++ interpreter counts bytes, not characters
+    loop_positions = dict((len(program[:index].encode("utf8")), index) for index in loops)
+    infinite_loops = (ctypes.c_size_t * len(loops))(*loop_positions)
+    input_data = input.read_all()
+    eof = -1 if input.eof_value is None else input.eof_value
+    stop = ctypes.c_int(0)
+    result = library.bf_free.argtypes[0]._type_()  # CppResult, see get_cpp_library
+    statuses = list()
+    thread = threading.Thread(target=lambda: statuses.append(library.bf_run(
+        source, len(source), input_data, len(input_data), eof, negative_pointer == "grow", infinite_loops, len(loops),
+        ctypes.byref(stop), ctypes.byref(result))))
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(0.1)
+    except BaseException:  # KeyboardInterrupt. the C++ interpreter stops before its next command
+        stop.value = 1
+        thread.join()
+        library.bf_free(ctypes.byref(result))
+        raise
+    status = statuses[0]
+    try:
+        input.consumed += result.input_position - len(input_data)  # read_all counted all of it
+        output.buffer += ctypes.string_at(result.output, result.output_size)
+        output.flush()
+        if status == 2:
+            raise RuntimeError("Brainfuck: the C++ interpreter failed: %s" % result.error.decode("utf8", "replace"))
+        data[:] = ctypes.string_at(result.tape, result.tape_size)
+        data_pointer = result.tape_index
+        origin = result.origin
+        loop_index = loop_positions.get(result.loop_index)
+    finally:
+        library.bf_free(ctypes.byref(result))
+    if status == 1:
+        raise IndexError("Brainfuck: data pointer moved to the left of the tape")
+    if status == 3:
+        error = InfiniteLoop(loop_index)
+        error.set_state(data, data_pointer, origin, output)
+        raise error
+    return data_pointer, origin
+
+
+WARNINGS = set()  # the warnings printed so far, see warn
+
+
+def warn(message):
+    # prints a warning to the standard error, once per process (e.g. for all the runs of a batch worker)
+    if message not in WARNINGS:
+        WARNINGS.add(message)
+        print("WARNING (interpreter) - %s" % message, file=sys.stderr)
+
+
+class Program:
+    # a program prepared for running any amount of times (see VM): compiled to bytecode, and translated for its backend
+    # backend is how the program is executed: "interpreter" runs the bytecode, "python" translates it to Python,
+    # "c" translates it to C and runs it compiled by the system C compiler,
+    # "jit" runs it as x86-64 machine code (falling back to "interpreter" where that's not supported),
+    # "cpp" runs it with the C++ interpreter in interpreter/ (falling back to "interpreter" for cells wider than 8 bits),
+    # for compatibility with it: it runs the source without the bytecode's optimizations or the intrinsic hints,
+    # so it's about as slow as "interpreter" (use "c" or "jit" for speed)
+    # cache keeps the prepared program on disk (see read_cache), so the next runs of the same program load it
+    # instead of preparing it again. the C backend's compiled programs are always kept there
+
+    def __init__(self, source, bits=8, backend="interpreter", cache=False):
+        self.source = source
+        self.bits = bits
+        self.hash = hashlib.sha256(source.encode("utf8")).hexdigest()
+        prepared = read_cache(get_cache_path(self.hash, bits, ".program")) if cache else None
+        if prepared is None:
+            self.spans = list()  # the range of the source each instruction was compiled from, see compile_bytecode
+            self.bytecode = compile_bytecode(source, bits, self.spans)
+            if cache:
+                write_cache(get_cache_path(self.hash, bits, ".program"), (self.bytecode, self.spans))
+        else:
+            self.bytecode, self.spans = prepared
+        self.exact = None  # see get_exact_bytecode
+        if (backend == "jit" and not jit_supported(bits)) or (backend == "cpp" and not cpp_supported(bits)):
+            backend = "interpreter"
+        self.backend = backend
+
+        if backend == "python":
+            self.compiled = get_python_code(source, self.bytecode, bits, cache)
+        elif backend == "c":
+            self.compiled = get_c_library(source, self.bytecode, bits)
+        elif backend == "jit":
+            self.compiled = get_jit_function(source, self.bytecode, bits, cache)
+        elif backend == "cpp":
+            self.compiled = get_cpp_library()
+        else:
+            self.compiled = None
+
+    def get_exact_bytecode(self):
+        # returns the program's bytecode and spans compiled for counting its commands exactly (see Stats)
+        if self.exact is None:
+            spans = list()
+            self.exact = (compile_bytecode(self.source, self.bits, spans, exact=True), spans)
+        return self.exact
+
+
+class VM:
+    # runs Programs, each run on a new tape. the state of the last run is kept: self.tape, with the final
+    # data_pointer and origin (see fit_tape), instruction_pointer (index in the bytecode), input_offset
+    # (input bytes read) and output_size (bytes written), and its statistics in self.stats (when asked for, see run)
+    # the state is kept also when the run is stopped (see ExecutionStopped), and snapshot() saves it to resume later
+    # negative_pointer is what happens when the data pointer moves to the left of the first cell:
+    # "grow" extends the tape to the left (like the tape had no start), "error" raises an IndexError
+    # "error" is checked on the bytecode, so moving to the left of the first cell and back without changing the
+    # cells there (like in <> or <+->, which are folded away) isn't an error. only the "cpp" backend, which runs
+    # the source command by command, raises it for those
+    # eof is what reading past the end of the input gives, see InputSource
+    # max_steps, timeout, max_cells and max_output limit the resources a run may use, see Limits.
+    # breaching one raises ResourceLimitExceeded. only the "interpreter" backend checks them,
+    # so the programs of the other backends are interpreted when a limit is given (with a warning, see warn)
+
+    def __init__(self, negative_pointer="grow", eof="0", max_steps=None, timeout=None, max_cells=None, max_output=None):
+        self.negative_pointer = negative_pointer
+        self.eof = eof
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.max_cells = max_cells
+        self.max_output = max_output
+        self.program = None
+        self.tape = None
+        self.data_pointer = None
+        self.origin = None
+        self.instruction_pointer = None
+        self.input_offset = None
+        self.output_size = None
+        self.waiting_for_input = False
+        self.steps = None
+        self.seconds = None
+        self.stats = None
+        self.counted = False  # whether the last run collected stats (see run)
+
+    def run(self, program, input=b"", output=None, stats=False, source_map=None, sampler=None, snapshot=None,
+            hooks=None):
+        # runs the program with the given input (bytes, or a binary file-like object)
+        # returns the output as bytes, or writes it to output (a binary file-like object) and returns None
+        # stats makes self.stats a dictionary of execution statistics, see Stats. it needs the "interpreter" backend,
+        # and a run with stats can't be resumed from a snapshot, or saved to one
+        # source_map (see load_source_map) makes the statistics also have the commands executed per source line
+        # ("lines") and per function ("functions"), see Stats.get_profile
+        # sampler is a Sampler that records where the program spends its time (see Sampler.get_collapsed_stacks),
+        # it also needs the "interpreter"
+        # snapshot (see Snapshot) resumes the program from where it was saved instead of running it from the start,
+        # with the "interpreter". input is then what it reads from that point on
+        # hooks (see Hooks) are called as the program runs, with the "interpreter". they can't be combined with stats
+        # or a sampler. a run without any hook registered doesn't pay for them
+
+        bits = program.bits
+        stats = stats or source_map is not None
+        if hooks is not None and hooks.is_empty():
+            hooks = None
+        if hooks is not None and (stats or sampler is not None):
+            raise ValueError("Brainfuck: hooks can't be combined with stats or a sampler")
+        if stats and snapshot is not None:
+            raise ValueError("Brainfuck: stats can't be collected when resuming from a snapshot")
+        limits = Limits(self.max_steps, self.timeout, self.max_cells, self.max_output)
+        backend = program.backend
+        unsupported = [feature for feature, used in [
+            ("limits", (self.max_steps, self.timeout, self.max_cells, self.max_output) != (None, None, None, None)),
+            ("stats", stats), ("a sampler", sampler is not None), ("snapshots", snapshot is not None),
+            ("hooks", hooks is not None)] if used]
+        if backend != "interpreter" and unsupported:
+            warn("the %s backend doesn't support %s, so the program runs on the interpreter backend instead" %
+                 (backend, " or ".join(unsupported)))
+            backend = "interpreter"
+
+        # stats count the commands with bytecode compiled for it, that has other instruction pointers
+        bytecode, spans = program.get_exact_bytecode() if stats else (program.bytecode, program.spans)
+        if sampler is not None:
+            sampler.set_program(program.source, spans)
+        if hooks is not None:
+            hooks.set_program(program.source, program.spans)
+        if snapshot is not None:
+            if (snapshot.program_hash, snapshot.bits) != (program.hash, bits):
+                raise ValueError("Brainfuck: the snapshot was taken of another program")
+            data = snapshot.get_tape(1 if stats else 1024 if self.max_cells is None else min(1024, self.max_cells))
+            start = (snapshot.data_pointer, snapshot.origin, snapshot.instruction_pointer)
+        elif stats:
+            data = create_tape(bits, 1)
+            start = None
+        else:
+            data = create_tape(bits, 1024 if self.max_cells is None else min(1024, self.max_cells))
+            start = None
+        stats = Stats(program.source, bytecode, spans) if stats else None
+        self.counted = stats is not None
+        self.program = program
+        self.tape = data
+        self.data_pointer = self.origin = self.instruction_pointer = self.input_offset = self.output_size = None
+        self.stats = None
+
+        collected = io.BytesIO() if output is None else None
+        input = InputSource(input, self.eof)
+        output = OutputSink(output if collected is None else collected, self.max_output)
+        if snapshot is not None:
+            input.consumed = snapshot.input_offset
+            output.written = snapshot.output_size
+        try:
+            if backend == "python":
+                data_pointer, origin = run_python(program.compiled, bits, data, self.negative_pointer, input, output)
+            elif backend == "c":
+                data_pointer, origin = run_c(program.compiled, bits, data, self.negative_pointer, input, output)
+            elif backend == "jit":
+                data_pointer, origin = run_jit(program.compiled, bits, data, self.negative_pointer, input, output)
+            elif backend == "cpp":
+                data_pointer, origin = run_cpp(program.compiled, program.source, program.bytecode, bits, data,
+                                               self.negative_pointer, input, output)
+            elif hooks is not None:
+                data_pointer, origin = run_bytecode_with_hooks(program.bytecode, bits, data, self.negative_pointer,
+                                                               input, output, hooks, limits, start)
+            else:
+                data_pointer, origin = run_bytecode(bytecode, bits, data, self.negative_pointer, input, output,
+                                                    limits, stats, sampler, start)
+        except ExecutionStopped as error:
+            self.tape = error.tape
+            self.data_pointer = error.data_pointer
+            self.origin = error.origin
+            self.instruction_pointer = error.instruction_pointer
+            self.input_offset = input.consumed
+            self.output_size = error.output_size
+            raise
+        finally:
+            output.flush()
+        self.data_pointer = data_pointer
+        self.origin = origin
+        self.instruction_pointer = len(bytecode)
+        self.input_offset = input.consumed
+        self.output_size = output.written
+
+        if stats is not None:
+            self.stats = stats.get_results(data, origin, input, output)
+            if source_map is not None:
+                self.stats["lines"], self.stats["functions"] = stats.get_profile(source_map)
+        if collected is not None:
+            return collected.getvalue()
+
+    def execute(self, program, input=b"", slice_steps=None, snapshot=None, steps=0, seconds=0.0):
+        # runs the program a part at a time: a generator of the program's output, that pauses the program when it
+        # yields. it yields the output written since the last time (possibly nothing) when the program reads input
+        # it wasn't given yet (self.waiting_for_input is then True), every slice_steps instructions if given
+        # (counted like the steps of Limits), and when the program ends (if it wrote something since)
+        # send(input) gives the program more input (next() gives nothing), and send(b"") ends the input
+        # closing the generator stops the program. until then, the state of the program is kept like when run stops
+        # it, so snapshot() can save it. an ExecutionStopped error is raised after yielding the output before it
+        # the limits are of the whole run, the timeout counting the time the program ran (not while paused).
+        # self.steps and self.seconds are how much of them it used so far
+        # snapshot resumes the program from it, like in run. steps and seconds are then how much of the limits
+        # the program used before it was saved
+        # it uses the "interpreter" backend, and input is bytes
+
+        bits = program.bits
+        size = 1024 if self.max_cells is None else min(1024, self.max_cells)
+        if snapshot is not None:
+            if (snapshot.program_hash, snapshot.bits) != (program.hash, bits):
+                raise ValueError("Brainfuck: the snapshot was taken of another program")
+            data = snapshot.get_tape(size)
+            start = (snapshot.data_pointer, snapshot.origin, snapshot.instruction_pointer)
+        else:
+            data = create_tape(bits, size)
+            start = None
+        self.program = program
+        self.tape = data
+        self.data_pointer = self.origin = self.instruction_pointer = self.input_offset = self.output_size = None
+        self.stats = None
+        self.counted = False
+        self.waiting_for_input = False
+        self.steps = steps
+        self.seconds = seconds
+
+        collected = io.BytesIO()
+        input = InputSource(input, self.eof)
+        input.waiting = True
+        output = OutputSink(collected, self.max_output)
+        if snapshot is not None:
+            input.consumed = snapshot.input_offset
+            output.written = snapshot.output_size
+        while True:
+            limits = TimeSlice(self.max_steps, self.timeout, self.max_cells, self.max_output, slice_steps, steps,
+                               seconds)
+            started = time.monotonic()
+            stopped = None
+            try:
+                data_pointer, origin = run_bytecode(program.bytecode, bits, data, self.negative_pointer, input,
+                                                    output, limits, start=start)
+                output.flush()
+            except ExecutionStopped as error:
+                stopped = error
+                try:
+                    output.flush()
+                except ExecutionStopped:
+                    pass  # output that breached the limit, the program is stopped anyway
+            seconds += time.monotonic() - started
+            self.seconds = seconds
+            self.input_offset = input.consumed
+            self.output_size = output.written
+
+            chunk = collected.getvalue()
+            collected.seek(0)
+            collected.truncate()
+            if stopped is None:
+                self.data_pointer = data_pointer
+                self.origin = origin
+                self.instruction_pointer = len(program.bytecode)
+                self.waiting_for_input = False
+                if chunk:
+                    yield chunk
+                return
+
+            self.data_pointer = stopped.data_pointer
+            self.origin = stopped.origin
+            self.instruction_pointer = stopped.instruction_pointer
+            self.waiting_for_input = isinstance(stopped, WaitingForInput)
+            if not isinstance(stopped, (Paused, WaitingForInput)):
+                if chunk:
+                    yield chunk
+                raise stopped
+            start = (stopped.data_pointer, stopped.origin, stopped.instruction_pointer)
+            steps += stopped.steps
+            self.steps = steps
+
+            received = yield chunk
+            if received is not None:
+                input.feed(received)
+
+    def snapshot(self):
+        # returns a Snapshot of the state of the last run, to resume it later with run
+        # a run stopped by the steps or time limit (see Limits) resumes exactly where it stopped,
+        # as they are checked between loop iterations. the other limits stop the program in the middle of an instruction
+        if self.program is None:
+            raise ValueError("Brainfuck: there is no run to take a snapshot of")
+        if self.instruction_pointer is None:
+            raise ValueError("Brainfuck: the %s backend can't take snapshots" % self.program.backend)
+        if self.counted:
+            raise ValueError("Brainfuck: runs with stats can't take snapshots")
+        return Snapshot(self.program.hash, self.program.bits, self.tape[:], self.data_pointer, self.origin,
+                        self.instruction_pointer, self.input_offset, self.output_size)
+
+
+class Snapshot:
+    # the state of a stopped program, to resume it later (possibly in another process), see VM.snapshot and VM.run
+    # it is saved as a header (see HEADER) followed by the tape, without its trailing zero cells, compressed with zlib
+    # the cells are saved in little-endian order, tape_size is how many cells the tape had
+    # instruction_pointer is an index in the bytecode, which other versions of the interpreter compile differently,
+    # so the header has the INTERPRETER_VERSION the snapshot was taken with, and only that version loads it
+
+    MAGIC = b"BFSNAP2\n"
+    HEADER = struct.Struct("<8sI64sBqqqqqq")  # magic, interpreter version, program hash, bits, tape_size,
+    #                                           data_pointer, origin, instruction_pointer, input_offset, output_size
+
+    def __init__(self, program_hash, bits, tape, data_pointer, origin, instruction_pointer, input_offset, output_size):
+        self.program_hash = program_hash
+        self.bits = bits
+        self.tape = tape
+        self.data_pointer = data_pointer
+        self.origin = origin
+        self.instruction_pointer = instruction_pointer
+        self.input_offset = input_offset
+        self.output_size = output_size
+
+    def get_tape(self, size=1):
+        # returns a copy of the tape to run on, of at least the given size (and large enough for the data pointer)
+        data = create_tape(self.bits, max(size, len(self.tape), self.data_pointer + 1))
+        data[:len(self.tape)] = self.tape
+        return data
+
+    def to_bytes(self):
+        import zlib
+        length = len(self.tape)
+        while length > 0 and self.tape[length - 1] == 0:
+            length -= 1
+        cells = self.tape[:length]
+        if isinstance(cells, array.array) and sys.byteorder == "big":
+            cells.byteswap()
+        header = self.HEADER.pack(self.MAGIC, INTERPRETER_VERSION, self.program_hash.encode(), self.bits,
+                                  len(self.tape), self.data_pointer, self.origin, self.instruction_pointer,
+                                  self.input_offset, self.output_size)
+        return header + zlib.compress(bytes(cells))
+
+    @staticmethod
+    def from_bytes(data):
+        import zlib
+        if data[:len(Snapshot.MAGIC)] != Snapshot.MAGIC:
+            if data[:len(b"BFSNAP")] == b"BFSNAP":
+                raise ValueError("Brainfuck: the snapshot was taken by another version of the interpreter")
+            raise ValueError("Brainfuck: not a snapshot")
+        magic, version, program_hash, bits, tape_size, data_pointer, origin, instruction_pointer, input_offset, \
+            output_size = Snapshot.HEADER.unpack_from(data)
+        if version != INTERPRETER_VERSION:
+            raise ValueError("Brainfuck: the snapshot was taken by another version of the interpreter (%s, this is %s)"
+                             % (version, INTERPRETER_VERSION))
+        cells = create_tape(bits, 0)
+        if isinstance(cells, array.array):
+            cells.frombytes(zlib.decompress(data[Snapshot.HEADER.size:]))
+            if sys.byteorder == "big":
+                cells.byteswap()
+        else:
+            cells.extend(zlib.decompress(data[Snapshot.HEADER.size:]))
+        cells.extend(create_tape(bits, tape_size - len(cells)))
+        return Snapshot(program_hash.decode(), bits, cells, data_pointer, origin, instruction_pointer, input_offset,
+                        output_size)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return Snapshot.from_bytes(f.read())
+
+
+def brainfuck(program, bits=8, negative_pointer="grow", output=None, input=None, eof="0", backend="interpreter",
+              max_steps=None, timeout=None, max_cells=None, max_output=None, stats=False, source_map=None,
+              sampler=None, cache=False, hooks=None):
+    # runs the program once, see Program and VM for the arguments
+    # output is a binary file-like object the program writes to (defaults to the standard output)
+    # input is bytes or a binary file-like object the program reads from (defaults to the standard input)
+    # returns the statistics of the run when asked for them with stats or source_map
+
+    if output is None:
+        sys.stdout.flush()  # anything printed before the program started should come first
+        output = sys.stdout.buffer
+    vm = VM(negative_pointer, eof, max_steps, timeout, max_cells, max_output)
+    vm.run(Program(program, bits, backend, cache), input, output, stats, source_map, sampler, hooks=hooks)
+
+    if vm.data_pointer != vm.origin:
+        print("WARNING (interpreter) - at the end of the execution the data pointer is %s instead of 0 (possibly a compiler issue)" % str(vm.data_pointer - vm.origin))
+
+    return vm.stats
+
+
+def load_program(path, bits=8, backend="interpreter", cache=False):
+    # returns the Program in the given file: Brainfuck code, or C-like code (a .code file) that is compiled first
+    # the other arguments are like Program's
+
+    with open(path, 'r') as f:
+        code = f.read()
+    if path.endswith(".code"):
+        import contextlib
+        from Compiler import Compiler
+        with contextlib.redirect_stdout(sys.stderr):  # the compiler's warnings aren't the program's output
+            code = Compiler.compile(code)
+    return Program(code, bits, backend, cache)
+
+
+def get_error_message(error):
+    # returns a description of the error that stopped a program, for reporting it in results (see Batch.py and Server.py)
+    if isinstance(error, ExecutionStopped) and error.data_pointer is not None:
+        return "%s (after %s steps, at instruction %s, data pointer %s)" % \
+               (error, error.steps, error.instruction_pointer, error.data_pointer - error.origin)
+    if isinstance(error, ExecutionStopped):
+        return str(error)
+    return "%s: %s" % (type(error).__name__, error)
+
+
+def load_source_map(path):
+    # returns the source map written by BF-it.py --source-map
+    import json
+    with open(path, 'r') as f:
+        return json.load(f)["segments"]
+
+
+def print_profile(results, top=20):
+    # prints where the commands were executed, see Stats.get_profile
+    commands = max(results["commands"], 1)
+
+    def name(function):
+        return "(global code)" if function is None else function
+
+    print("\nFunctions (own lines / including the functions they call):", file=sys.stderr)
+    for function, (own, total) in sorted(results["functions"].items(), key=lambda item: -item[1][1]):
+        print("%14d %5.1f%% %14d %5.1f%%  %s" % (own, 100.0 * own / commands, total, 100.0 * total / commands,
+                                                  name(function)), file=sys.stderr)
+
+    print("\nLines:", file=sys.stderr)
+    lines = sorted(results["lines"].items(), key=lambda item: -item[1])
+    for (function, line), line_commands in lines[:top]:
+        print("%14d %5.1f%%  %s line %s" % (line_commands, 100.0 * line_commands / commands, name(function), line),
+              file=sys.stderr)
+
+
+def add_execution_arguments(parser, backend=True):
+    # adds the command line arguments of how to execute programs, shared by running one program, batch and serve
+    # backend is whether to add --backend (programs that are paused and resumed are always interpreted)
+    parser.add_argument("--bits", "-b", "--interpreter-bits", type=int, default=8, help="Amount of bits each cell uses")
+    parser.add_argument("--negative-pointer", choices=["grow", "error"], default="grow",
+                        help="What to do when the data pointer moves to the left of the first cell: "
+                             "extend the tape there, or stop with an error")
+    parser.add_argument("--eof", choices=["unchanged", "0", "255"], default="0",
+                        help="The value a cell gets when reading past the end of the input")
+    if backend:
+        parser.add_argument("--backend", choices=["interpreter", "python", "c", "jit", "cpp"], default="interpreter",
+                            help="How to execute the program: interpret it, translate it to Python or C first, "
+                                 "compile it to x86-64 machine code, or run it with the C++ interpreter (interpreter/, "
+                                 "for compatibility: it isn't faster than interpreting)")
+    parser.add_argument("--max-steps", type=int, help="Stop the program after executing this many instructions")
+    parser.add_argument("--timeout", type=float, help="Stop the program after running for this many seconds")
+    parser.add_argument("--max-cells", type=int, help="Stop the program if it uses more tape cells than this")
+    parser.add_argument("--max-output", type=int, help="Stop the program if it writes more bytes than this")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Prepare the programs again instead of loading them from the disk cache, "
+                             "and don't store them there")
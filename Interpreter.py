@@ -1,78 +1,73 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 import argparse
 
+from Engine import *  # the interpreter's API, for the programs that use it through this file (like BF-it.py)
+from Engine import ResourceLimitExceeded, InfiniteLoop, Sampler, brainfuck, load_source_map, print_profile, \
+    add_execution_arguments
 
-def create_jumps_dictionary(program):
-    lbraces = list()
-    res = dict()
-
-    for index, command in enumerate(program):
-        if command == '[':
-            lbraces.append(index)
-        elif command == ']':
-            if len(lbraces) == 0:
-                raise SyntaxError("Brainfuck: mismatched parentheses (at index: %s)" % index)
-
-            lbrace_index = lbraces.pop()
-            res[lbrace_index] = index
-            res[index] = lbrace_index
-
-    if len(lbraces) > 0:
-        raise SyntaxError("Brainfuck: mismatched parentheses (at indexes: %s)" % str(lbraces))
-    return res
-
-
-def brainfuck(program, bits=8):
-
-    jumps = create_jumps_dictionary(program)
-    data = dict()
-    data_pointer = 0
-
-    instruction_pointer = 0
-
-    while instruction_pointer < len(program):
-        command = program[instruction_pointer]
-
-        if command == '>':
-            data_pointer += 1
-        elif command == '<':
-            data_pointer -= 1
-        elif command == '+':
-            data[data_pointer] = (data.get(data_pointer, 0) + 1)
-            if data[data_pointer] == 2 ** bits:
-                data[data_pointer] = 0
-        elif command == '-':
-            data[data_pointer] = (data.get(data_pointer, 0) - 1)
-            if data[data_pointer] == -1:
-                data[data_pointer] = 2 ** bits - 1
-        elif command == ',':
-            data[data_pointer] = ord(sys.stdin.read(1)) % 256
-        elif command == '.':
-            print(chr(data.get(data_pointer, 0)), end='', flush=True)
-        elif command == '[':
-            if data.get(data_pointer, 0) == 0:
-                instruction_pointer = jumps[instruction_pointer]
-        elif command == ']':
-            if data.get(data_pointer, 0) != 0:
-                instruction_pointer = jumps[instruction_pointer]
-        else:  # everything else is comment
-            pass
-
-        instruction_pointer += 1
-
-    if data_pointer != 0:
-        print("WARNING (interpreter) - at the end of the execution the data pointer is %s instead of 0 (possibly a compiler issue)" % str(data_pointer))
+"""
+This file runs Brainfuck programs from the command line (see --help), with the interpreter in Engine.py
+the interpreter is imported rather than written here, so that Python byte-compiles it once
+instead of every time this file is run
+"""
 
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser()
+    if sys.argv[1:2] == ["batch"]:
+        import Batch
+        sys.exit(Batch.batch_main(sys.argv[2:], "%s batch" % os.path.basename(sys.argv[0])))
+    if sys.argv[1:2] == ["serve"]:
+        import Server
+        sys.exit(Server.serve_main(sys.argv[2:], "%s serve" % os.path.basename(sys.argv[0])))
+
+    parser = argparse.ArgumentParser(epilog="Run '%(prog)s batch --help' to run many programs and inputs at once, "
+                                            "or '%(prog)s serve --help' to host many interactive programs")
     parser.add_argument("filepath")
-    parser.add_argument("--bits", "-b", "--interpreter-bits", type=int, default=8, help="Amount of bits each cell uses")
+    add_execution_arguments(parser)
+    parser.add_argument("--stats", action="store_true", help="Print execution statistics when the program ends")
+    parser.add_argument("--flamegraph", metavar="FILE",
+                        help="Sample where the program spends its time, and write the samples per loop nest "
+                             "to FILE in the collapsed stacks format of flame graph tools")
+    parser.add_argument("--sample-interval", type=int, default=10000,
+                        help="Take a sample every this many instructions (with --flamegraph)")
+    parser.add_argument("--sample-timer", type=float,
+                        help="Take a sample every this many seconds of CPU time instead (with --flamegraph)")
+    parser.add_argument("--profile", metavar="SOURCE_MAP",
+                        help="Print the commands executed per source line and function, "
+                             "using the source map written by BF-it.py --source-map")
 
     args = parser.parse_args()
     with open(args.filepath, 'r') as f:
         code = f.read()
 
-    brainfuck(code, args.bits)
+    sampler = Sampler(args.sample_interval, args.sample_timer) if args.flamegraph else None
+    try:
+        results = brainfuck(code, args.bits, args.negative_pointer, eof=args.eof, backend=args.backend,
+                            max_steps=args.max_steps, timeout=args.timeout, max_cells=args.max_cells,
+                            max_output=args.max_output, stats=args.stats,
+                            source_map=load_source_map(args.profile) if args.profile else None, sampler=sampler,
+                            cache=not args.no_cache)
+    except ResourceLimitExceeded as error:
+        print("\n%s (after %s steps, at instruction %s, data pointer %s)" %
+              (error, error.steps, error.instruction_pointer, error.data_pointer - error.origin), file=sys.stderr)
+        sys.exit(1)
+    except (InfiniteLoop, IndexError) as error:  # IndexError: the data pointer moved to the left of the tape
+        print("\n%s" % error, file=sys.stderr)
+        sys.exit(1)
+
+    if args.stats or args.profile:
+        print("\nBrainfuck commands executed: %d" % results["commands"], file=sys.stderr)
+        print("Instructions executed (after folding): %d" % results["instructions"], file=sys.stderr)
+        print("Loop iterations: %d" % results["loop_iterations"], file=sys.stderr)
+        print("Highest tape cell touched: %d" % results["max_cell"], file=sys.stderr)
+        print("Output bytes: %d, input bytes: %d" % (results["output_bytes"], results["input_bytes"]), file=sys.stderr)
+        print("Time: %.3f seconds (%.0f commands per second)" % (results["seconds"], results["commands_per_second"]),
+              file=sys.stderr)
+    if args.profile:
+        print_profile(results)
+    if sampler is not None:
+        with open(args.flamegraph, 'w') as f:
+            f.write(sampler.get_collapsed_stacks())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+import heapq
+
+from Engine import ADD, MOVE, OUTPUT, INPUT, JUMP_IF_ZERO, JUMP_IF_NOT_ZERO, CLEAR, LINEAR, SCAN, BLOCK, \
+    INFINITE_LOOP, ResourceLimitExceeded, InfiniteLoop, get_error_message
+
+"""
+This file implements the lockstep VM: a program run with many inputs at once, with NumPy (see LockstepVM)
+it's used by the batch command's --lockstep option (see Batch.py). NumPy is imported only when a LockstepVM is created
+"""
+
+
+class LockstepVM:
+    # runs a Program with many inputs at once, using NumPy: the tapes of all the runs ("lanes") are the rows of one
+    # 2-D array, and each instruction is executed together for all the lanes that reach it, with vectorized operations
+    # when the lanes' control flow diverges (e.g. a loop runs more times in some of them), they are split into groups
+    # by instruction pointer. the group with the lowest one runs first, so the others wait for it after the loop
+    # and join it again. lanes that end or fail are retired
+    # the interpreter's cost per instruction is then paid once per group instead of once per input, which pays off
+    # with many inputs that take similar paths through the program (e.g. the inputs of regression tests)
+    # negative_pointer and eof are like VM's, max_steps limits each lane (counted like in Limits)
+    # the program's bytecode is run, whatever its backend
+
+    CELL_TYPES = ((8, "uint8"), (16, "uint16"), (32, "uint32"), (64, "uint64"))
+
+    def __init__(self, negative_pointer="grow", eof="0", max_steps=None):
+        try:
+            import numpy  # an optional dependency, and slow to import, so only imported when needed
+        except ImportError:
+            raise ImportError("Brainfuck: LockstepVM needs NumPy (pip install numpy)")
+        self.numpy = numpy
+        self.negative_pointer = negative_pointer
+        self.eof = eof
+        self.max_steps = max_steps
+        self.tape = None  # lane, cell -> value
+        self.data_pointers = None  # lane -> index in its row of self.tape
+        self.origin = None  # the index of the first cell in the rows of self.tape, see fit_tape
+        self.alive = None  # lane -> whether it wasn't retired because of an error
+        self.errors = None  # lane -> the error message it was retired with, or None
+
+    def retire(self, lanes, error):
+        # retires the lanes (an array of them), that failed with the given error
+        self.alive[lanes] = False
+        for lane in lanes.tolist():
+            self.errors[lane] = get_error_message(error)
+
+    def fit(self, lanes, low, high):
+        # grows the tapes so that the given lanes have the cells at their data pointer + low ... + high, like fit_tape
+        # returns the lanes that are still alive (a lane moving to the left of its tape fails, unless it may grow)
+
+        numpy = self.numpy
+        pointers = self.data_pointers[lanes]
+        if (pointers + low).min() < 0:
+            if self.negative_pointer != "grow":
+                failed = pointers + low < 0
+                for lane, pointer in zip(lanes[failed].tolist(), (pointers + low)[failed].tolist()):
+                    self.retire(numpy.array([lane]),
+                                IndexError("Brainfuck: data pointer moved to the left of the tape (to %s)" % pointer))
+                lanes = lanes[~failed]
+                pointers = pointers[~failed]
+                if len(lanes) == 0:
+                    return lanes
+            else:
+                shift = max(-(pointers + low).min(), self.tape.shape[1])
+                tape = numpy.zeros((self.tape.shape[0], self.tape.shape[1] + shift), self.tape.dtype)
+                tape[:, shift:] = self.tape
+                self.tape = tape
+                self.data_pointers += shift
+                self.origin += shift
+                pointers = pointers + shift
+        if (pointers + high).max() >= self.tape.shape[1]:
+            size = max((pointers + high).max() + 1, 2 * self.tape.shape[1])
+            tape = numpy.zeros((self.tape.shape[0], size), self.tape.dtype)
+            tape[:, :self.tape.shape[1]] = self.tape
+            self.tape = tape
+        return lanes
+
+    def run(self, program, inputs):
+        # runs the program with each of the inputs (bytes)
+        # returns the output of each run (bytes), and self.errors has the error of each run (None if it didn't fail)
+
+        numpy = self.numpy
+        bits = program.bits
+        bytecode = program.bytecode
+        mask = 2 ** bits - 1
+        lanes = len(inputs)
+        cell_type = next(cell_type for width, cell_type in self.CELL_TYPES if bits <= width)
+        self.tape = numpy.zeros((lanes, 1024), cell_type)
+        self.data_pointers = data_pointers = numpy.zeros(lanes, numpy.int64)
+        self.origin = 0
+        self.alive = alive = numpy.ones(lanes, bool)
+        self.errors = [None] * lanes
+        steps = numpy.zeros(lanes, numpy.int64)
+        outputs = [bytearray() for _ in range(lanes)]
+
+        input_data = numpy.zeros((lanes, max(map(len, inputs), default=0) + 1), numpy.uint8)
+        for lane, input in enumerate(inputs):
+            input_data[lane, :len(input)] = numpy.frombuffer(bytes(input), numpy.uint8)
+        input_lengths = numpy.array([len(input) for input in inputs], numpy.int64)
+        input_positions = numpy.zeros(lanes, numpy.int64)
+        eof_value = {"unchanged": None, "0": 0, "255": 255}[self.eof]
+
+        group = numpy.arange(lanes)  # the lanes being run, all at instruction_pointer
+        instruction_pointer = 0
+        waiting = dict()  # instruction pointer -> the lanes that wait there for their turn
+        turns = list()  # a heap of the instruction pointers in waiting (and of ones that joined the group since)
+
+        def wait(lanes, instruction_pointer):
+            if instruction_pointer in waiting:
+                waiting[instruction_pointer] = numpy.concatenate((waiting[instruction_pointer], lanes))
+            else:
+                waiting[instruction_pointer] = lanes
+                heapq.heappush(turns, instruction_pointer)
+
+        while True:
+            if len(group) == 0 or instruction_pointer >= len(bytecode):
+                while turns and turns[0] not in waiting:
+                    heapq.heappop(turns)
+                if not turns:
+                    break
+                instruction_pointer = heapq.heappop(turns)
+                group = waiting.pop(instruction_pointer)
+                continue
+            if instruction_pointer in waiting:
+                group = numpy.concatenate((group, waiting.pop(instruction_pointer)))
+
+            op, arg = bytecode[instruction_pointer]
+            tape = self.tape
+            if op == BLOCK:
+                low, high, move, effects = arg
+                group = self.fit(group, low, high)
+                tape = self.tape
+                pointers = data_pointers[group]
+                for offset, is_set, value in effects:
+                    cells = pointers + offset
+                    if is_set:
+                        tape[group, cells] = value
+                    else:
+                        tape[group, cells] = (tape[group, cells] + (value & mask)) & mask
+                data_pointers[group] = pointers + move
+            elif op == ADD:
+                pointers = data_pointers[group]
+                tape[group, pointers] = (tape[group, pointers] + (arg & mask)) & mask
+            elif op == MOVE:
+                data_pointers[group] += arg
+                group = self.fit(group, 0, 0)
+            elif op == CLEAR:
+                tape[group, data_pointers[group]] = 0
+            elif op == SCAN:
+                scanning = group
+                while len(scanning):
+                    scanning = scanning[self.tape[scanning, data_pointers[scanning]] != 0]
+                    data_pointers[scanning] += arg
+                    scanning = self.fit(scanning, 0, 0) if len(scanning) else scanning
+                group = group[alive[group]]
+            elif op == LINEAR:
+                multiplier, effects = arg
+                looping = group[tape[group, data_pointers[group]] != 0]
+                if len(looping):
+                    looping = self.fit(looping, effects[0][0], effects[-1][0])
+                    tape = self.tape
+                    pointers = data_pointers[looping]
+                    iterations = 1 if multiplier is None else tape[looping, pointers] * (multiplier & mask) & mask
+                    for offset, is_set, amount in effects:
+                        cells = pointers + offset
+                        if is_set:
+                            tape[looping, cells] = amount
+                        else:
+                            tape[looping, cells] = (tape[looping, cells] + iterations * (amount & mask)) & mask
+                    tape[looping, pointers] = 0
+                    group = group[alive[group]]
+            elif op == JUMP_IF_ZERO:
+                skipping = tape[group, data_pointers[group]] == 0
+                if skipping.any():
+                    wait(group[skipping], arg + 1)
+                    group = group[~skipping]
+            elif op == JUMP_IF_NOT_ZERO:
+                looping = tape[group, data_pointers[group]] != 0
+                if looping.any():
+                    if not looping.all():
+                        wait(group[~looping], instruction_pointer + 1)
+                        group = group[looping]
+                    steps[group] += instruction_pointer - arg
+                    if self.max_steps is not None:
+                        exceeded = steps[group] > self.max_steps
+                        if exceeded.any():
+                            self.retire(group[exceeded], ResourceLimitExceeded(
+                                "steps", "executed more than %s instructions" % self.max_steps))
+                            group = group[~exceeded]
+                    instruction_pointer = arg
+            elif op == OUTPUT:
+                for lane, value in zip(group.tolist(), tape[group, data_pointers[group]].tolist()):
+                    if bits <= 8:
+                        outputs[lane].append(value)
+                        continue
+                    try:
+                        outputs[lane] += chr(value).encode("utf8", "surrogatepass")
+                    except (ValueError, OverflowError) as error:  # not a character
+                        self.retire(numpy.array([lane]), error)
+                group = group[alive[group]]
+            elif op == INPUT:
+                positions = input_positions[group]
+                available = positions < input_lengths[group]
+                reading = group[available]
+                tape[reading, data_pointers[reading]] = input_data[reading, positions[available]]
+                input_positions[reading] += 1
+                if eof_value is not None:
+                    ended = group[~available]
+                    tape[ended, data_pointers[ended]] = eof_value
+            elif op == INFINITE_LOOP:
+                stuck = tape[group, data_pointers[group]] != 0
+                if stuck.any():
+                    self.retire(group[stuck], InfiniteLoop(arg))
+                    group = group[~stuck]
+
+            instruction_pointer += 1
+
+        return [bytes(output) for output in outputs]
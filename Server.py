@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+import threading
+import concurrent.futures
+
+from Engine import Program, VM, Snapshot, load_program, get_error_message, add_execution_arguments
+
+"""
+This file implements the server: many interactive programs hosted at once for clients, each in its own session
+(see Server). it's also the serve command, Interpreter.py serve (or this file run directly)
+"""
+
+WORKER_PROGRAMS = dict()  # the programs a worker process prepared, see run_session_slice
+
+
+def run_session_slice(source, bits, options, snapshot, input, input_ended, slice_steps, steps, seconds):
+    # runs one slice of a Server's session in a worker process: the program from the given snapshot (bytes, or None
+    # to start it), with the given input and the limits left (see VM.execute), until it pauses again
+    # returns (output, snapshot, input, waiting_for_input, ended, steps, seconds, error): snapshot is None once it
+    # ended, input is what the program didn't read yet, and error is its error message if it failed
+
+    key = (hashlib.sha256(source.encode("utf8")).hexdigest(), bits)
+    if key not in WORKER_PROGRAMS:
+        WORKER_PROGRAMS[key] = Program(source, bits)
+    program = WORKER_PROGRAMS[key]
+    snapshot = snapshot and Snapshot.from_bytes(snapshot)
+    vm = VM(**options)
+    output = bytearray()
+    try:
+        generator = vm.execute(program, input, slice_steps, snapshot, steps, seconds)
+        output += next(generator)
+        if vm.waiting_for_input and input_ended:
+            output += generator.send(b"")
+    except StopIteration:
+        pass
+    except Exception as error:
+        return bytes(output), None, b"", False, True, vm.steps, vm.seconds, get_error_message(error)
+    if vm.instruction_pointer == len(program.bytecode):
+        return bytes(output), None, b"", False, True, vm.steps, vm.seconds, None
+    input = input[vm.input_offset - (snapshot.input_offset if snapshot else 0):]
+    return bytes(output), vm.snapshot().to_bytes(), input, vm.waiting_for_input, False, vm.steps, vm.seconds, None
+
+
+class Session:
+    # a program that a Server runs a slice at a time, on its own VM, with the input its client sends
+
+    def __init__(self, server, program):
+        self.server = server
+        self.program = program
+        self.vm = VM(**server.options)
+        self.generator = None  # the program's VM.execute, when it runs in the server's process
+        self.snapshot = None  # the program's state between slices when it runs in worker processes,
+        self.steps = 0  # with how much of the limits it used
+        self.seconds = 0.0
+        self.input = bytearray()  # input received since the last slice
+        self.input_ended = False
+        self.input_received = asyncio.Event()
+        self.task = None
+
+    def feed(self, data):
+        # adds input for the program, b"" ends it
+        if data:
+            self.input += data
+        else:
+            self.input_ended = True
+        self.input_received.set()
+
+    async def run_slice(self):
+        # runs the program until it pauses
+        # returns (output, waiting_for_input, ended, error), error is its error message if it failed
+
+        input = bytes(self.input)
+        self.input.clear()
+        self.input_received.clear()
+        if self.server.executor is not None:
+            output, self.snapshot, unread, waiting, ended, self.steps, self.seconds, error = \
+                await asyncio.get_running_loop().run_in_executor(
+                    self.server.executor, run_session_slice, self.program.source, self.program.bits,
+                    self.server.options, self.snapshot, input, self.input_ended, self.server.slice_steps,
+                    self.steps, self.seconds)
+            self.input[0:0] = unread
+            return output, waiting, ended, error
+
+        output = bytearray()
+        try:
+            if self.generator is None:
+                self.generator = self.vm.execute(self.program, input, self.server.slice_steps)
+                output += next(self.generator)
+            else:
+                output += self.generator.send(input or None)
+            if self.vm.waiting_for_input and self.input_ended:
+                output += self.generator.send(b"")
+        except StopIteration:
+            pass
+        except Exception as error:
+            return bytes(output), False, True, get_error_message(error)
+        ended = self.vm.instruction_pointer == len(self.program.bytecode)
+        return bytes(output), self.vm.waiting_for_input and not ended, ended, None
+
+
+class Server:
+    # hosts many programs at once, each in its own session (see Session), for clients connected to a Unix socket
+    # or to the standard input and output. the protocol is JSON lines, see handle_connection
+    # sessions take turns running slice_steps instructions at a time (see VM.execute), and a session stops running
+    # while its client doesn't read its output (backpressure)
+    # workers runs the slices in that many worker processes instead of in the server's, for programs that compute
+    # a lot. the program's state is then handed from slice to slice as a Snapshot
+    # bits is the cell width of the programs (a client may ask for another), cache is like Program's,
+    # and the other arguments are like VM's and apply to each session
+
+    LINE_LIMIT = 2 ** 24  # the longest request, in bytes (a request may have a whole program)
+
+    def __init__(self, slice_steps=100000, workers=0, bits=8, negative_pointer="grow", eof="0", max_steps=None,
+                 timeout=None, max_cells=None, max_output=None, cache=False):
+        self.slice_steps = slice_steps
+        self.bits = bits
+        self.cache = cache
+        self.options = {"negative_pointer": negative_pointer, "eof": eof, "max_steps": max_steps, "timeout": timeout,
+                        "max_cells": max_cells, "max_output": max_output}
+        self.executor = concurrent.futures.ProcessPoolExecutor(workers) if workers else None
+        self.programs = dict()  # (file path or program hash, bits) -> Program, prepared once for all the sessions
+
+    def get_program(self, request):
+        # returns the Program an "open" request asks for
+        bits = request.get("bits", self.bits)
+        if "file" in request:
+            key = (request["file"], bits)
+            if key not in self.programs:
+                self.programs[key] = load_program(request["file"], bits, cache=self.cache)
+        else:
+            key = (hashlib.sha256(request["source"].encode("utf8")).hexdigest(), bits)
+            if key not in self.programs:
+                self.programs[key] = Program(request["source"], bits, cache=self.cache)
+        return self.programs[key]
+
+    async def handle_connection(self, reader, writer, finish=False):
+        # serves a client. it sends requests, a JSON object per line:
+        #   {"op": "open", "session": ID, "file": PATH} runs the program in the file (Brainfuck, or a .code file)
+        #       in a new session. "source": CODE instead of "file" runs the given Brainfuck code, "bits" sets the
+        #       cell width. ID is any name the client chooses for the session
+        #   {"op": "input", "session": ID, "data": TEXT} gives the program input, "" ends it
+        #   {"op": "close", "session": ID} stops the program
+        # and gets events, a JSON object per line:
+        #   {"session": ID, "output": TEXT} the program wrote something
+        #   {"session": ID, "waiting": true} the program waits for input
+        #   {"session": ID, "exit_status": 0 or 1, "error": MESSAGE or null} the program ended, 1 if it failed
+        #   {"error": MESSAGE} a request failed
+        # input and output bytes are sent as the code points of TEXT (the bytes decoded as latin-1), like in Batch.py
+        # when the client stops sending requests, it's gone: its sessions are stopped (to wait for a program to end,
+        # the client ends its input and reads until it gets its exit_status)
+        # finish is for a client that may still read the events after it stops sending requests (on the standard
+        # input and output): the input of its sessions then ends, and they run until they end
+
+        sessions = dict()
+
+        def forget(session_id, session):
+            if sessions.get(session_id) is session:
+                del sessions[session_id]
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op = request["op"]
+                    session_id = request["session"]
+                    if op == "open":
+                        if session_id in sessions and not sessions[session_id].task.done():
+                            raise ValueError("session %s is already open" % json.dumps(session_id))
+                        session = Session(self, self.get_program(request))
+                        session.task = asyncio.ensure_future(self.run_session(session_id, session, writer))
+                        session.task.add_done_callback(lambda task, session_id=session_id, session=session:
+                                                       forget(session_id, session))
+                        sessions[session_id] = session
+                    elif op == "input":
+                        sessions[session_id].feed(request["data"].encode("latin-1"))
+                    elif op == "close":
+                        sessions[session_id].task.cancel()
+                    else:
+                        raise ValueError("unknown op %s" % json.dumps(op))
+                except Exception as error:
+                    writer.write((json.dumps({"error": "%s: %s" % (type(error).__name__, error)}) + "\n").encode())
+
+            if finish:
+                for session in sessions.values():
+                    session.feed(b"")
+                await asyncio.gather(*[session.task for session in sessions.values()], return_exceptions=True)
+        finally:
+            for session in list(sessions.values()):
+                session.task.cancel()
+            writer.close()
+
+    async def run_session(self, session_id, session, writer):
+        # runs the session's program slice by slice, sending its events to the client (see handle_connection)
+
+        def send(**event):
+            writer.write((json.dumps(dict(session=session_id, **event)) + "\n").encode())
+
+        try:
+            while True:
+                output, waiting, ended, error = await session.run_slice()
+                if output:
+                    send(output=output.decode("latin-1"))
+                if ended:
+                    send(exit_status=0 if error is None else 1, error=error)
+                    await writer.drain()
+                    return
+                if waiting:
+                    send(waiting=True)
+                await writer.drain()  # the backpressure: waits while the client is behind on reading
+                if waiting:
+                    await session.input_received.wait()
+                else:
+                    await asyncio.sleep(0)  # lets the other sessions run their slices
+        except ConnectionError:
+            pass  # the client is gone
+        finally:
+            if session.generator is not None:
+                session.generator.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def serve_unix(self, path):
+        server = await asyncio.start_unix_server(self.handle_connection, path, limit=self.LINE_LIMIT)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self):
+        stream = StdioStream(asyncio.get_running_loop())
+        await self.handle_connection(stream, stream, finish=True)
+
+
+class StdioStream:
+    # the standard input and output as a client's connection (see Server.handle_connection), with the methods of
+    # asyncio's StreamReader and StreamWriter that it uses. they may be files, pipes or a terminal:
+    # the input is read by a thread, and writing the output blocks (there's only one client to wait for anyway)
+
+    def __init__(self, loop):
+        self.lines = asyncio.Queue()
+        threading.Thread(target=self.read_lines, args=(loop,), daemon=True).start()
+
+    def read_lines(self, loop):
+        for line in sys.stdin.buffer:
+            loop.call_soon_threadsafe(self.lines.put_nowait, line)
+        loop.call_soon_threadsafe(self.lines.put_nowait, b"")
+
+    async def readline(self):
+        return await self.lines.get()
+
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+
+    async def drain(self):
+        sys.stdout.buffer.flush()
+
+    def close(self):
+        sys.stdout.buffer.flush()
+
+
+def serve_main(arguments, prog=None):
+    # the serve command: hosts sessions of programs for clients, see Server
+    # prog is the command's name in the usage message (defaults to this file's)
+
+    parser = argparse.ArgumentParser(prog=prog,
+                                     description="Host many programs at once, for clients that send requests and get "
+                                                 "events as lines of JSON, on a Unix socket or the standard input "
+                                                 "and output")
+    parser.add_argument("--socket", metavar="PATH", help="Listen on a Unix socket (instead of the standard input)")
+    parser.add_argument("--slice-steps", type=int, default=100000,
+                        help="Amount of instructions a program runs before letting the others run")
+    parser.add_argument("--workers", "-j", type=int, default=0,
+                        help="Run the programs in this many worker processes (instead of in the server's process)")
+    add_execution_arguments(parser, backend=False)
+    args = parser.parse_args(arguments)
+
+    server = Server(args.slice_steps, args.workers, args.bits, args.negative_pointer, args.eof, args.max_steps,
+                    args.timeout, args.max_cells, args.max_output, not args.no_cache)
+    try:
+        asyncio.run(server.serve_unix(args.socket) if args.socket else server.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    sys.exit(serve_main(sys.argv[1:]))
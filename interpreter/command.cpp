@@ -6,13 +6,21 @@ using namespace std;
 
 TapeCommand::TapeCommand(vector<unsigned char>& tape, vector<unsigned char>::iterator& tape_iter) : Command(), tape(tape), tape_iterator(tape_iter) {}
 
-MoveCommand::MoveCommand(vector<unsigned char>& tape, vector<unsigned char>::iterator& tape_iter, int move_count) : TapeCommand(tape, tape_iter), count(move_count) {}
+MoveCommand::MoveCommand(vector<unsigned char>& tape, vector<unsigned char>::iterator& tape_iter, int move_count, size_t* origin) : TapeCommand(tape, tape_iter), count(move_count), origin(origin) {}
 
 AddCommand::AddCommand(vector<unsigned char>& tape, vector<unsigned char>::iterator& tape_iter, int add) : TapeCommand(tape, tape_iter), count(add) {}
 
-InputCommand::InputCommand(vector<unsigned char>& tape, vector<unsigned char>::iterator& tape_iter) : TapeCommand(tape, tape_iter) {}
+InputCommand::InputCommand(vector<unsigned char>& tape, vector<unsigned char>::iterator& tape_iter, IO& io) : TapeCommand(tape, tape_iter), io(io) {}
 
-OutputCommand::OutputCommand(vector<unsigned char>& tape, vector<unsigned char>::iterator& tape_iter) : TapeCommand(tape, tape_iter) {}
+OutputCommand::OutputCommand(vector<unsigned char>& tape, vector<unsigned char>::iterator& tape_iter, IO& io) : TapeCommand(tape, tape_iter), io(io) {}
+
+int StandardIO::get() {
+	return (unsigned char) getchar();
+}
+
+void StandardIO::put(unsigned char value) {
+	putchar(value);
+}
 
 
 void MoveCommand::operator()() {
@@ -21,7 +29,16 @@ void MoveCommand::operator()() {
 	auto dist_to_start = distance(tape_iterator, tape.begin());
 
 	if (dist_to_start > count) {
-		throw TapeLeftBound();
+		if (origin == nullptr) {
+			throw TapeLeftBound();
+		}
+
+		// grow the tape to the left, the existing cells move to the right
+		size_t missing = dist_to_start - count;
+		tape.insert(tape.begin(), missing, 0);
+		*origin += missing;
+		tape_iterator = tape.begin();
+		return;
 	}
 
 	if (dist_to_end <= count) {
@@ -39,11 +56,14 @@ void AddCommand::operator()() {
 }
 
 void InputCommand::operator()() {
-	*tape_iterator = (unsigned char) getchar();
+	int value = io.get();
+	if (value >= 0) {
+		*tape_iterator = (unsigned char) value;
+	}
 }
 
 void OutputCommand::operator()() {
-	putchar(*tape_iterator);
+	io.put(*tape_iterator);
 }
 
 JmpCommand::JmpCommand(vector<unsigned char>::iterator& tape_iter, vector<pair<Command*, bool>>::iterator& command_iter) : tape_iterator(tape_iter), command_iterator(command_iter), offset(0) {}
@@ -62,3 +82,12 @@ void JmpCommand::operator()() {
 		command_iterator += offset;
 	}
 }
+
+HaltCommand::HaltCommand(vector<unsigned char>::iterator& tape_iter, vector<pair<Command*, bool>>::iterator& command_iter, size_t index) : JmpCommand(tape_iter, command_iter), index(index) {}
+
+void HaltCommand::operator()() {
+	if (*tape_iterator) {
+		throw EndlessLoop(index);
+	}
+	command_iterator += offset;
+}
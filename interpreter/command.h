@@ -1,4 +1,5 @@
 #pragma once
+#include <cstddef>
 #include <vector>
 
 class TapeLeftBound : public std::exception {
@@ -7,6 +8,30 @@ class TapeLeftBound : public std::exception {
 	}
 };
 
+class EndlessLoop : public std::exception {
+public:
+	const size_t index;  // of the loop's [ in the code
+	EndlessLoop(size_t index) : index(index) {}
+	virtual const char* what() const throw() {
+		return "Program halted in infinite loop";
+	}
+};
+
+class IO {
+public:
+	// get returns the next input byte, or a negative value to leave the cell unchanged
+	virtual int get() = 0;
+	virtual void put(unsigned char value) = 0;
+	virtual ~IO() {}
+};
+
+class StandardIO : public IO {
+public:
+	virtual int get();
+	virtual void put(unsigned char value);
+	virtual ~StandardIO() {}
+};
+
 class Command {
 public:
 	virtual void operator()() = 0;
@@ -25,8 +50,11 @@ public:
 
 class MoveCommand : public TapeCommand {
 	int count;
+	size_t* origin;  // cells added to the left of the tape, or nullptr when it can't grow to the left
 public:
-	MoveCommand(std::vector<unsigned char>& tape, std::vector<unsigned char>::iterator& tape_iter, int move_count);
+	MoveCommand(std::vector<unsigned char>& tape, std::vector<unsigned char>::iterator& tape_iter, int move_count, size_t* origin);
+	MoveCommand(const MoveCommand&) = delete;
+	MoveCommand& operator=(const MoveCommand&) = delete;
 	virtual void operator()();
 	virtual ~MoveCommand() {}
 };
@@ -40,15 +68,17 @@ public:
 };
 
 class InputCommand : public TapeCommand {
+	IO& io;
 public:
-	InputCommand(std::vector<unsigned char>& tape, std::vector<unsigned char>::iterator& tape_iter);
+	InputCommand(std::vector<unsigned char>& tape, std::vector<unsigned char>::iterator& tape_iter, IO& io);
 	virtual void operator()();
 	virtual ~InputCommand() {}
 };
 
 class OutputCommand : public TapeCommand {
+	IO& io;
 public:
-	OutputCommand(std::vector<unsigned char>& tape, std::vector<unsigned char>::iterator& tape_iter);
+	OutputCommand(std::vector<unsigned char>& tape, std::vector<unsigned char>::iterator& tape_iter, IO& io);
 	virtual void operator()();
 	virtual ~OutputCommand() {}
 };
@@ -64,3 +94,12 @@ public:
 	virtual void operator()();
 	virtual ~JmpCommand() {}
 };
+
+// the forward jump of a loop that never ends once entered
+class HaltCommand : public JmpCommand {
+	size_t index;
+public:
+	HaltCommand(std::vector<unsigned char>::iterator& tape_iter, std::vector<std::pair<Command*, bool>>::iterator& command_iter, size_t index);
+	virtual void operator()();
+	virtual ~HaltCommand() {}
+};
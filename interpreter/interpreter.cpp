@@ -1,155 +1,15 @@
-#include <iostream>
 #include <string>
 #include <cstdio>
-#include <algorithm>
 #include <fstream>
 #include <stack>
-#include <csignal>
+#include <algorithm>
+#include <stdexcept>
 #include "interpreter.h"
 
 using namespace std;
 
-void show_interactive_help() {
-    cout << "Brainfuck Interpreter/Debugger\n" <<
-        "Commands:\n" << 
-        "h/help         -   Show this help message\n" << 
-        "q/quit         -   Quits\n" << 
-        "debug [0/1]    -   Enable or disable debug mode - enables breakpoints\n" << 
-        "run            -   Runs until code completion or breakpoint if debug mode is enabled\n" << 
-        "run <num>      -   Runs for specified number of steps or breakpoint if debug mode is enabled\n" << 
-        "br <cmd-idx>   -   Create breakpoint at the specified command index\n" << 
-        "unbr <cmd-idx> -   Removes breakpoint from the specified command index\n" <<  
-        "read           -   Print the content of the tape at the current index" <<
-        endl;
-}
-
-void interactive_mode() {
-    string command;
-    Interpreter* bf = nullptr;
-    
-
-    cout << "Interactive Mode" << endl;
-
-    while (bf == nullptr) {
-        cout << "Input bf code path to begin or q to exit\n>>" << flush;
-        getline(cin, command);
-
-        if ((command == "q") || (command == "quit")) {
-            return;
-        }
-
-        try {
-            bf = new Interpreter(command);
-        }
-        catch (const exception& e) {
-            cout << "Exception encountered\n" << e.what() << endl;
-        }
-    }
-
-    cout << "Code parsed successfully" << endl;
-    cout << "Input command or help for list of commands" << endl;
-
-    while ((command != "q") && (command != "quit") && !bf->is_finished()) {
-        cout << ">>" << flush;
-        getline(cin, command);
-
-        if (command == "") {
-            continue;
-        }
-
-        // single word commands parsed first
-        if ((command == "h") || (command == "help")) {
-            show_interactive_help();
-        }
-        else if (command == "run") {
-            bf->run();
-        }
-        else if (command == "read") {
-            bf->output();
-            cout << endl;
-        }
-        else {
-            // 2 part commands
-            // all commands have the second part as an integer
-
-            // find seperator
-            auto pos = command.find(" ");
-
-            if (pos != string::npos) {
-                string sub_num = command.substr(pos+1, command.length());
-                if (!all_of(sub_num.begin(), sub_num.end(), ::isdigit)) {
-                    std::cout << "Unknown command" << endl;
-                    continue;
-                }
-                
-                unsigned int num = stoi(sub_num);
-                command = command.substr(0, pos);
-
-                if (command == "run") {
-                    bf->execute(num);
-                }
-                else if (command == "debug") {
-                    bf->set_debug_mode((bool)num);
-                }
-                else if (command == "br") {
-                    bf->new_br(num);
-                }
-                else if (command == "unbr") {
-                    bf->remove_br(num);
-                }
-                else {
-                    std::cout << "Unknown command" << endl;
-                }
-            }
-            else {
-                std::cout << "Unknown command" << endl;
-            }
-        }
-    }
-
-    if (bf->is_finished()) {
-        std::cout << "Program finished" << endl;
-    }
-
-    delete bf;
-}
-
-void exit_sig_handler(int) noexcept {
-    cout << "Caught termination signal exiting" << endl;
-    exit(1);
-}
-
-int main(int argc, char* argv[]) {
-    if (argc > 2) {
-        cout << "Usage: '" << argv[0] << "' <brainfuck code path>\nOr '" << argv[0] << "' for interactive mode'";
-    }
-
-    int exit_code = 0;
-
-    // register signal handlers for terminating infinite programs gracefully on ctrl+C
-    signal(SIGINT, exit_sig_handler);
-
-    if (argc == 1) {
-        // if not arguement given use interactive mode
-        interactive_mode();
-        return 0;
-    }
-
-    try {
-        // file path given in command line
-        // run bf code to completion (or error)
-        Interpreter bf(argv[1]);
-        bf.run();
-    }
-    catch (const exception& e) {
-        cout << e.what() << endl;
-        exit_code = 1;
-    }
-
-    system("pause");
-
-    return exit_code;
-}
+// programs read from a file use the standard input and output
+static StandardIO standard_io;
 
 void Interpreter::input() {
     // read input from user into pointed cell
@@ -171,16 +31,28 @@ bool Interpreter::step() {
     return ((command_iterator != commands.end()) && (*command_iterator).second);
 }
 
-Interpreter::Interpreter(const string& bf_path) : bf_path(bf_path), debug_mode(false), commands(0), tape(10, 0), command_iterator(commands.begin()), tape_iterator(tape.begin()) {
-    char next, peeked;
+Interpreter::Interpreter(const string& bf_path) : bf_path(bf_path), io(standard_io), debug_mode(false), commands(0), tape(10, 0), command_iterator(commands.begin()), tape_iterator(tape.begin()), stop(nullptr), grow(false), origin(0) {
     ifstream file(this->bf_path, fstream::in);
     // check file is valid
     if (!file) {
         throw runtime_error("Could not open file " + this->bf_path);
     }
 
+    parse(file, vector<size_t>());
+    file.close();
+}
+
+Interpreter::Interpreter(istream& code, IO& io, const vector<size_t>& infinite_loops, const volatile int* stop, bool grow) : bf_path(), io(io), debug_mode(false), commands(0), tape(10, 0), command_iterator(commands.begin()), tape_iterator(tape.begin()), stop(stop), grow(grow), origin(0) {
+    parse(code, infinite_loops);
+}
+
+void Interpreter::parse(istream& file, const vector<size_t>& infinite_loops) {
+    char next, peeked;
     Command* cmd;
 
+    // index in the code of the next character to read
+    size_t position = 0;
+
     // used to count consecutive character that can be merged
     int count = 0;
 
@@ -191,6 +63,7 @@ Interpreter::Interpreter(const string& bf_path) : bf_path(bf_path), debug_mode(f
 
     // read the input file and parse tokens
     while (file.get(next)) {
+        ++position;
         switch (next) {
         case ('+'):
         case ('-'):
@@ -198,6 +71,7 @@ Interpreter::Interpreter(const string& bf_path) : bf_path(bf_path), debug_mode(f
             peeked = file.peek();
             while ((peeked == '+' || peeked == '-')) {
                 file.get(next);     // will always read either + or -
+                ++position;
                 count += (next == '+') ? 1 : -1;
                 peeked = file.peek();
             }
@@ -210,23 +84,29 @@ Interpreter::Interpreter(const string& bf_path) : bf_path(bf_path), debug_mode(f
             peeked = file.peek();
             while ((peeked == '<' || peeked == '>')) {
                 file.get(next);     // will always read either < or >
+                ++position;
                 count += (next == '>') ? 1 : -1;
                 peeked = file.peek();
             }
-            cmd = new MoveCommand(tape, tape_iterator, count);
+            cmd = new MoveCommand(tape, tape_iterator, count, grow ? &origin : nullptr);
             commands.push_back(pair<Command*, bool>(cmd, 0));
             break;
         case ('.'):
-            cmd = new OutputCommand(tape, tape_iterator);
+            cmd = new OutputCommand(tape, tape_iterator, io);
             commands.push_back(pair<Command*, bool>(cmd, 0));
             break;
         case (','):
-            cmd = new InputCommand(tape, tape_iterator);
+            cmd = new InputCommand(tape, tape_iterator, io);
             commands.push_back(pair<Command*, bool>(cmd, 0));
             break;
         case ('['):
             branch_stack.push(commands.size());
-            cmd = new JmpCommand(tape_iterator, command_iterator);
+            if (find(infinite_loops.begin(), infinite_loops.end(), position - 1) != infinite_loops.end()) {
+                cmd = new HaltCommand(tape_iterator, command_iterator, position - 1);
+            }
+            else {
+                cmd = new JmpCommand(tape_iterator, command_iterator);
+            }
             commands.push_back(pair<Command*, bool>(cmd, 0));
             break;
         case (']'):
@@ -257,8 +137,6 @@ Interpreter::Interpreter(const string& bf_path) : bf_path(bf_path), debug_mode(f
         throw UnbalancedBracket();
     }
 
-    file.close();
-
     // get a new valid iterator for commands
     command_iterator = commands.begin();
 }
@@ -278,23 +156,20 @@ Interpreter & Interpreter::execute(unsigned int count) {
         }
     }
 
-    if (command_iterator == commands.end()) {
-        cout << "\nProgram finished successfully" << endl;
-    }
-
     return *this;
 }
 
 Interpreter & Interpreter::run() {
     while (!this->is_finished()) {
+        if (stop != nullptr && *stop) {
+            throw Interrupted();
+        }
         bool is_br = step();
         if (debug_mode && is_br) {
             return *this;
         }
     }
 
-    cout << "\nProgram finished successfully" << endl;
-
     return *this;
 }
 
@@ -315,3 +190,15 @@ bool Interpreter::is_finished() const {
 void Interpreter::set_debug_mode(bool mode) {
     debug_mode = mode;
 }
+
+const vector<unsigned char>& Interpreter::get_tape() const {
+    return tape;
+}
+
+size_t Interpreter::get_tape_index() const {
+    return tape_iterator - tape.begin();
+}
+
+size_t Interpreter::get_origin() const {
+    return origin;
+}
@@ -1,5 +1,7 @@
 #pragma once
 #include <exception>
+#include <istream>
+#include <string>
 #include <vector>
 #include "command.h"
 
@@ -9,18 +11,35 @@ class UnbalancedBracket : public std::exception {
     }
 };
 
+class Interrupted : public std::exception {
+public:
+    virtual const char* what() const throw() {
+        return "Program interrupted";
+    }
+};
+
 class Interpreter {
 private:
     const std::string bf_path;
+    IO& io;
     bool debug_mode;
     std::vector<std::pair<Command*, bool>> commands;
     std::vector<unsigned char> tape;
     std::vector<std::pair<Command*, bool>>::iterator command_iterator;
     std::vector<unsigned char>::iterator tape_iterator;
+    const volatile int* stop;
+    bool grow;
+    size_t origin;
 
     bool step();
+    void parse(std::istream& code, const std::vector<size_t>& infinite_loops);
 public:
     Interpreter(const std::string& bf_path);
+    // infinite_loops are the indexes in the code of the [ of loops that never end once entered,
+    // run() stops when *stop becomes non-zero (if given), and grow lets the tape grow to the left
+    Interpreter(std::istream& code, IO& io, const std::vector<size_t>& infinite_loops, const volatile int* stop, bool grow);
+    Interpreter(const Interpreter&) = delete;
+    Interpreter& operator=(const Interpreter&) = delete;
     ~Interpreter();
     Interpreter& execute(unsigned int count);
     Interpreter& run();
@@ -30,4 +49,8 @@ public:
     void set_debug_mode(bool mode);
     void input();
     void output() const;
+    const std::vector<unsigned char>& get_tape() const;
+    size_t get_tape_index() const;
+    // how many cells the tape grew to the left
+    size_t get_origin() const;
 };
\ No newline at end of file
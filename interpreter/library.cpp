@@ -0,0 +1,120 @@
+#include <cstdlib>
+#include <cstring>
+#include <sstream>
+#include <string>
+#include <vector>
+#include "interpreter.h"
+
+using namespace std;
+
+// a C interface to the interpreter, for running programs from other languages (Interpreter.py loads it with ctypes)
+// the program runs to completion on an input buffer, and its output and final tape are returned in buffers
+
+class BufferIO : public IO {
+    const unsigned char* input;
+    size_t input_size;
+    int eof;
+public:
+    size_t input_position;
+    string output;
+
+    BufferIO(const unsigned char* input, size_t input_size, int eof) : input(input), input_size(input_size), eof(eof), input_position(0), output() {}
+    BufferIO(const BufferIO&) = delete;
+    BufferIO& operator=(const BufferIO&) = delete;
+
+    virtual int get() {
+        // past the end of the input gives eof (which leaves the cell unchanged when it's negative)
+        if (input_position == input_size) {
+            return eof;
+        }
+        return input[input_position++];
+    }
+
+    virtual void put(unsigned char value) {
+        output.push_back((char) value);
+    }
+
+    virtual ~BufferIO() {}
+};
+
+extern "C" {
+
+struct bf_result {
+    unsigned char* output;
+    size_t output_size;
+    size_t input_position;  // how many input bytes the program read
+    unsigned char* tape;
+    size_t tape_size;
+    size_t tape_index;  // where the tape pointer ended
+    char* error;  // the error message when bf_run fails
+    size_t loop_index;  // the index of the infinite loop the program halted in
+    size_t origin;  // how many cells the tape grew to the left
+};
+
+static unsigned char* copy_buffer(const void* data, size_t size) {
+    unsigned char* copy = (unsigned char*) malloc(size ? size : 1);
+    if (copy != nullptr) {
+        memcpy(copy, data, size);
+    }
+    return copy;
+}
+
+// runs the program on the input, eof is what reading past its end gives (a negative value leaves the cell unchanged)
+// grow lets the tape grow to the left (otherwise moving to the left of the first cell is an error)
+// infinite_loops are the indexes in the program of the [ of loops that never end once entered,
+// and the program is stopped when *stop becomes non-zero (another thread may set it while bf_run runs)
+// returns 0 when the program finished, 1 when the tape pointer left the tape, 2 on other errors,
+// 3 when the program entered one of the infinite loops, and 4 when it was stopped.
+// the result's buffers are allocated either way, and have to be released with bf_free
+int bf_run(const char* program, size_t program_size, const unsigned char* input, size_t input_size, int eof, int grow,
+           const size_t* infinite_loops, size_t infinite_loops_count, const volatile int* stop,
+           struct bf_result* result) {
+    BufferIO io(input, input_size, eof);
+    istringstream code(string(program, program_size));
+    int status = 0;
+    string error;
+
+    memset(result, 0, sizeof(*result));
+    try {
+        Interpreter bf(code, io, vector<size_t>(infinite_loops, infinite_loops + infinite_loops_count), stop, grow != 0);
+        try {
+            bf.run();
+        }
+        catch (const EndlessLoop& e) {
+            status = 3;
+            error = e.what();
+            result->loop_index = e.index;
+        }
+        catch (const Interrupted& e) {
+            status = 4;
+            error = e.what();
+        }
+        catch (const exception& e) {
+            status = (dynamic_cast<const TapeLeftBound*>(&e) != nullptr) ? 1 : 2;
+            error = e.what();
+        }
+        result->tape = copy_buffer(bf.get_tape().data(), bf.get_tape().size());
+        result->tape_size = bf.get_tape().size();
+        result->tape_index = bf.get_tape_index();
+        result->origin = bf.get_origin();
+    }
+    catch (const exception& e) {
+        status = 2;
+        error = e.what();
+    }
+
+    result->output = copy_buffer(io.output.data(), io.output.size());
+    result->output_size = io.output.size();
+    result->input_position = io.input_position;
+    result->error = (char*) copy_buffer(error.c_str(), error.size() + 1);
+    return status;
+}
+
+void bf_free(struct bf_result* result) {
+    free(result->output);
+    free(result->tape);
+    free(result->error);
+    memset(result, 0, sizeof(*result));
+}
+
+}
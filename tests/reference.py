@@ -0,0 +1,118 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import Engine
+
+"""
+A reference interpreter for the tests: it runs Brainfuck one command at a time, without any of the interpreter's
+optimizations, so that every way of running a program can be compared with it
+"""
+
+EXAMPLES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+EXAMPLE_INPUTS = {"calc.bf": b"12\n+\n30\n", "chars.bf": b"a\nb\nz\n", "do_while_loops.bf": b"y\n5\n3\n",
+                  "if_else.bf": b"5\n7\n"}
+WAITING_EXAMPLES = ("calc.bf", "chars.bf")  # their loops wait for more input forever
+
+
+class TooManyCommands(Exception):
+    pass
+
+
+def run_reference(program, input=b"", bits=8, eof="0", negative_pointer="grow", max_commands=10 ** 6, counts=None,
+                  entries=None):
+    # runs the program one command at a time, on a tape that grows to both sides as the data pointer moves
+    # returns the output and the final state: the non-zero cells as a dictionary of index -> value and the data
+    # pointer, both counting from the first cell (see get_state)
+    # raises IndexError when the data pointer moves to the left of the first cell and negative_pointer is "error",
+    # and TooManyCommands when the program doesn't end after max_commands commands
+    # counts, if given, is a list (as long as the program) that gets how many times each command was executed
+    # entries, if given, is a list that gets the index of a loop's [ each time its body is entered from it
+    jumps = Engine.create_jumps_dictionary(program)
+    mask = 2 ** bits - 1
+    tape = dict()
+    data_pointer = 0
+    instruction_pointer = 0
+    input_position = 0
+    output = bytearray()
+    commands = 0
+    while instruction_pointer < len(program):
+        command = program[instruction_pointer]
+        if command in "+-<>.,[]":
+            commands += 1
+            if commands > max_commands:
+                raise TooManyCommands()
+            if counts is not None:
+                counts[instruction_pointer] += 1
+        if command == "+":
+            tape[data_pointer] = (tape.get(data_pointer, 0) + 1) & mask
+        elif command == "-":
+            tape[data_pointer] = (tape.get(data_pointer, 0) - 1) & mask
+        elif command == ">":
+            data_pointer += 1
+        elif command == "<":
+            data_pointer -= 1
+            if data_pointer < 0 and negative_pointer == "error":
+                raise IndexError("the data pointer moved to the left of the tape")
+        elif command == ".":
+            value = tape.get(data_pointer, 0)
+            output += bytes([value]) if bits <= 8 else chr(value).encode("utf8", "surrogatepass")
+        elif command == ",":
+            if input_position < len(input):
+                tape[data_pointer] = input[input_position]
+                input_position += 1
+            elif eof != "unchanged":
+                tape[data_pointer] = int(eof) & mask
+        elif command == "[":
+            if tape.get(data_pointer, 0) == 0:
+                instruction_pointer = jumps[instruction_pointer]
+            elif entries is not None:
+                entries.append(instruction_pointer)
+        elif command == "]":
+            if tape.get(data_pointer, 0) != 0:
+                instruction_pointer = jumps[instruction_pointer]
+        instruction_pointer += 1
+    return bytes(output), ({index: value for index, value in tape.items() if value != 0}, data_pointer)
+
+
+def get_state(tape, data_pointer, origin):
+    # returns the state of a run of the interpreter like run_reference does
+    return {index - origin: value for index, value in enumerate(tape) if value != 0}, data_pointer - origin
+
+
+def get_vm_state(vm):
+    return get_state(vm.tape, vm.data_pointer, vm.origin)
+
+
+def get_random_program(generator, length, commands="+-<>,.[]+-><[-]"):
+    # returns a random program with balanced loops
+    program = ""
+    depth = 0
+    for _ in range(length):
+        command = generator.choice(commands)
+        if command == "]":
+            if depth == 0:
+                continue
+            depth -= 1
+        elif command == "[":
+            depth += 1
+        program += command
+    return program + "]" * depth
+
+
+def get_examples(extension=".bf"):
+    # returns (name, program, input) of the compiled examples that end, or of their sources (with extension ".code")
+    examples = list()
+    for name in sorted(os.listdir(EXAMPLES_DIRECTORY)):
+        if not name.endswith(extension) or name[:-len(extension)] + ".bf" in WAITING_EXAMPLES:
+            continue
+        with open(os.path.join(EXAMPLES_DIRECTORY, name), "rt") as f:
+            examples.append((name, f.read(), EXAMPLE_INPUTS.get(name[:-len(extension)] + ".bf", b"")))
+    return examples
+
+
+def run_engine(program, input=b"", bits=8, eof="0", negative_pointer="grow", backend="interpreter"):
+    # runs the program with the interpreter, returns the output and the final state like run_reference
+    vm = Engine.VM(negative_pointer, eof)
+    output = vm.run(Engine.Program(program, bits, backend), input)
+    return output, get_vm_state(vm)
@@ -0,0 +1,143 @@
+import io
+import os
+import random
+import sys
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+
+from reference import TooManyCommands, run_reference, get_vm_state, get_random_program, get_examples
+import Engine
+from Engine import VM, Program
+
+
+def setUpModule():
+    # the backends keep what they compile in the disk cache, see get_cache_directory
+    Engine.CACHE_DIRECTORY = tempfile.mkdtemp(prefix="BF-it-test-")
+
+
+def tearDownModule():
+    shutil.rmtree(Engine.CACHE_DIRECTORY, True)
+    Engine.CACHE_DIRECTORY = None
+
+
+class BackendTest:
+    # compares a backend with the reference interpreter, for each backend's own test case
+    backend = None
+    random_programs = 300  # compiling is slow for some backends
+    bits = (8, 16)  # the cell widths the backend supports
+
+    def check_program(self, program, input=b"", bits=8, eof="0", max_commands=10 ** 6):
+        try:
+            expected = run_reference(program, input, bits, eof, max_commands=max_commands)
+        except TooManyCommands:
+            return False
+        with self.subTest(program=program, input=input, bits=bits, eof=eof):
+            prepared = Program(program, bits, self.backend)
+            self.assertEqual(prepared.backend, self.backend)
+            vm = VM(eof=eof)
+            output = vm.run(prepared, input)
+            self.assertEqual((output, get_vm_state(vm)), expected)
+        return True
+
+    def test_examples(self):
+        for name, program, input in get_examples():
+            self.assertTrue(self.check_program(program, input), name)
+
+    def test_random_programs(self):
+        generator = random.Random(7)
+        for _ in range(self.random_programs):
+            program = get_random_program(generator, generator.randint(1, 60), "+-<>,.[]+-><[-]<<<>>>+++---")
+            input = bytes(generator.randrange(256) for _ in range(generator.randint(0, 5)))
+            self.check_program(program, input, generator.choice(self.bits), generator.choice(["0", "255", "unchanged"]),
+                               10000)
+
+    def test_large_output(self):
+        self.assertTrue(self.check_program("++++++++[>++++++++++++++++<-]>[>" + "+" * 200 + "[.-]<-]"))
+
+    def test_negative_pointer(self):
+        vm = VM()
+        self.assertEqual(vm.run(Program("+<<++[>+++<-]>>.<.", 8, self.backend)), b"\x01\x06")
+        self.assertEqual(vm.data_pointer - vm.origin, -1)
+        with self.assertRaises(IndexError):
+            VM("error").run(Program("+<<++[>+++<-]>>.<.", 8, self.backend))
+
+
+class PythonBackendTest(BackendTest, unittest.TestCase):
+    backend = "python"
+
+    def test_code_cache(self):
+        program = Program("+++[>+++<-]>.", 8, "python")
+        self.assertIs(Program("+++[>+++<-]>.", 8, "python").compiled, program.compiled)
+        self.assertIsNot(Program("+++[>+++<-]>.", 16, "python").compiled, program.compiled)
+        self.assertEqual(VM().run(program), b"\x09")
+
+    def test_deep_nesting(self):
+        # Python allows only 20 nested blocks in a function
+        self.assertTrue(self.check_program("+" * 3 + "[>+" * 40 + "[-]" + "<-]" * 40 + ">" * 40 + "+."))
+
+
+@unittest.skipIf(shutil.which(os.environ.get("CC", "cc")) is None, "no C compiler")
+class CBackendTest(BackendTest, unittest.TestCase):
+    backend = "c"
+    random_programs = 40
+
+    def test_compiled_once(self):
+        program = Program("++++++[>+++++++<-]>.", 8, "c")
+        self.assertIs(Program("++++++[>+++++++<-]>.", 8, "c").compiled, program.compiled)
+        self.assertTrue(os.path.exists(Engine.get_cache_path(program.hash, 8, ".so")))
+        self.assertEqual(VM().run(program), b"*")
+
+    def test_long_program(self):
+        # split into many C functions, see C_MAX_FUNCTION_SIZE
+        generator = random.Random(8)
+        program = "".join(generator.choice(["+", "-", ">", "<", ".", "[-]", ">[<+>-]<"]) for _ in range(2000))
+        self.assertTrue(self.check_program(program))
+
+
+@unittest.skipUnless(Engine.jit_supported(8), "the JIT needs x86-64")
+class JitBackendTest(BackendTest, unittest.TestCase):
+    backend = "jit"
+    bits = (8,)
+
+    def test_fallback(self):
+        self.assertEqual(Program("+.", 16, "jit").backend, "interpreter")
+
+
+@unittest.skipIf(shutil.which(os.environ.get("CXX", "g++")) is None, "no C++ compiler")
+class CppBackendTest(BackendTest, unittest.TestCase):
+    backend = "cpp"
+    bits = (8,)
+
+    def test_fallback(self):
+        self.assertEqual(Program("+.", 16, "cpp").backend, "interpreter")
+
+    def test_library(self):
+        # built once into the cache directory
+        with mock.patch.object(Engine, "CPP_LIBRARY", None):
+            library = Engine.get_cpp_library()
+            self.assertIs(Engine.get_cpp_library(), library)
+        self.assertEqual([name for name in os.listdir(Engine.CACHE_DIRECTORY) if name.startswith("cpp-")],
+                         [os.path.basename(library._name)])
+
+    def test_input_stream(self):
+        # the whole input is read before the program starts
+        input = io.BytesIO(b"abc\x00def")
+        vm = VM()
+        self.assertEqual(vm.run(Program(",[.,]", 8, "cpp"), input), b"abc")
+        self.assertEqual((vm.input_offset, input.tell()), (4, 7))
+
+
+class ImportTest(unittest.TestCase):
+    def test_lazy_imports(self):
+        # the modules of the backends are imported only when they're used
+        code = "import sys, Interpreter; print(sorted({'ctypes', 'subprocess', 'mmap'} & set(sys.modules)))"
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(Engine.__file__)),
+                                stdout=subprocess.PIPE, check=True)
+        self.assertEqual(result.stdout.strip(), b"[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import random
+import tempfile
+import subprocess
+import unittest
+
+from reference import EXAMPLES_DIRECTORY, TooManyCommands, run_reference, get_random_program
+import Batch
+
+REPOSITORY_DIRECTORY = os.path.dirname(EXAMPLES_DIRECTORY)
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_programs(self, programs):
+        paths = list()
+        for index, program in enumerate(programs):
+            paths.append(os.path.join(self.directory.name, "program%d.bf" % index))
+            with open(paths[-1], "wt") as f:
+                f.write(program)
+        return paths
+
+    def test_batch(self):
+        generator = random.Random(13)
+        programs = list()
+        while len(programs) < 10:
+            program = get_random_program(generator, generator.randint(1, 40))
+            try:
+                run_reference(program, b"\x09\x08\x07", max_commands=10000)
+                programs.append(program)
+            except TooManyCommands:
+                pass
+        paths = self.write_programs(programs)
+        inputs = [b"", b"\x01", b"\x09\x08\x07", b"\xff\x80"]
+        results = list(Batch.batch(paths, inputs, workers=2))
+        self.assertEqual(sorted((result["file"], result["input"]) for result in results),
+                         sorted((path, index) for path in paths for index in range(len(inputs))))
+        for result in results:
+            with self.subTest(file=result["file"], input=result["input"]):
+                program = programs[paths.index(result["file"])]
+                output, _ = run_reference(program, inputs[result["input"]])
+                self.assertEqual(result["output"].encode("latin-1"), output)
+                self.assertEqual((result["exit_status"], result["error"], result["stats"]), (0, None, None))
+
+    def test_errors(self):
+        paths = self.write_programs(["+[.+]", "[", "+[>+<]", "<+.", "+."])
+        results = {os.path.basename(result["file"]): result
+                   for result in Batch.batch(paths, workers=1, max_output=10, negative_pointer="error")}
+        self.assertEqual(results["program0.bf"]["output"], "".join(chr(value) for value in range(1, 11)))
+        self.assertIn("the output grew beyond 10 bytes", results["program0.bf"]["error"])
+        self.assertIn("SyntaxError", results["program1.bf"]["error"])
+        self.assertIn("infinite loop at index 1", results["program2.bf"]["error"])
+        self.assertIn("IndexError", results["program3.bf"]["error"])
+        for name in ["program0.bf", "program1.bf", "program2.bf", "program3.bf"]:
+            self.assertEqual(results[name]["exit_status"], 1)
+        self.assertEqual((results["program4.bf"]["exit_status"], results["program4.bf"]["output"]), (0, "\x01"))
+
+    def test_stats(self):
+        path = os.path.join(EXAMPLES_DIRECTORY, "pow.code")  # compiled first
+        [result] = Batch.batch([path], workers=1, stats=True)
+        with open(os.path.join(EXAMPLES_DIRECTORY, "pow.bf"), "rt") as f:
+            self.assertEqual(result["output"].encode("latin-1"), run_reference(f.read())[0])
+        self.assertGreater(result["stats"]["commands"], 0)
+
+    def test_worker_programs(self):
+        # a worker prepares each program once
+        [path] = self.write_programs([",[.,]"])
+        options = {"bits": 8, "negative_pointer": "grow", "eof": "0", "backend": "interpreter", "max_steps": None,
+                   "timeout": None, "max_cells": None, "max_output": None, "stats": False, "cache": False}
+        self.assertEqual(Batch.run_batch_job(path, 0, b"ab", options)["output"], "ab")
+        program = Batch.WORKER_PROGRAMS[(path, 8, "interpreter", False)]
+        self.assertEqual(Batch.run_batch_job(path, 1, b"cd", options)["output"], "cd")
+        self.assertIs(Batch.WORKER_PROGRAMS[(path, 8, "interpreter", False)], program)
+
+    def test_command_line(self):
+        paths = self.write_programs([",[.,]", "+[]"])
+        result = subprocess.run([sys.executable, os.path.join(REPOSITORY_DIRECTORY, "Interpreter.py"), "batch"] + paths
+                                + ["-i", "ab", "-i", "c", "-j", "2", "--no-cache"], stdout=subprocess.PIPE, check=False)
+        self.assertEqual(result.returncode, 1)
+        lines = [json.loads(line) for line in result.stdout.decode().splitlines()]
+        self.assertEqual(sorted((line["file"], line["input"], line["output"], line["exit_status"]) for line in lines),
+                         [(paths[0], 0, "ab", 0), (paths[0], 1, "c", 0), (paths[1], 0, "", 1), (paths[1], 1, "", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import random
+import unittest
+
+from reference import TooManyCommands, run_reference, run_engine, get_random_program, get_examples
+from Engine import compile_bytecode, create_tape, scan, ADD, MOVE, OUTPUT, INPUT, JUMP_IF_ZERO, JUMP_IF_NOT_ZERO, \
+    CLEAR, LINEAR, SCAN, BLOCK
+
+
+def get_random_linear_loop(generator):
+    # returns a loop that moves back to its counter cell, and may hold other linear loops
+    body = ""
+    offset = 0
+    for _ in range(generator.randint(1, 8)):
+        choice = generator.random()
+        if choice < 0.1 and offset != 0:
+            body += get_random_linear_loop(generator)
+        elif choice < 0.2:
+            body += "[-]"
+        elif choice < 0.6:
+            body += generator.choice("+-") * generator.randint(1, 3)
+        else:
+            move = generator.randint(-2, 2)
+            body += ">" * move + "<" * -move
+            offset += move
+    body += ">" * -offset + "<" * offset
+    return "[" + generator.choice(["-", "+", "---", "+++", ""]) + body + "]"
+
+
+class BytecodeTest(unittest.TestCase):
+    def check_program(self, program, input=b"", bits=8, max_commands=10 ** 6):
+        # compares running the program with the reference interpreter, unless it runs for too long
+        try:
+            expected = run_reference(program, input, bits, max_commands=max_commands)
+        except TooManyCommands:
+            return False
+        with self.subTest(program=program, bits=bits):
+            self.assertEqual(run_engine(program, input, bits), expected)
+        return True
+
+    def test_folding(self):
+        self.assertEqual(compile_bytecode("+++"), [(ADD, 3)])
+        self.assertEqual(compile_bytecode("--"), [(ADD, 254)])
+        self.assertEqual(compile_bytecode(">>>"), [(MOVE, 3)])
+        self.assertEqual(compile_bytecode("<<"), [(MOVE, -2)])
+        self.assertEqual(compile_bytecode("+-><"), [])
+        self.assertEqual(compile_bytecode("+ a comment +\n+."), [(ADD, 3), (OUTPUT, 0)])
+
+    def test_jumps(self):
+        bytecode = compile_bytecode(",[.,]")
+        self.assertEqual(bytecode, [(INPUT, 0), (JUMP_IF_ZERO, 4), (OUTPUT, 0), (INPUT, 0), (JUMP_IF_NOT_ZERO, 1)])
+        bytecode = compile_bytecode(",[.[,.]+++]")
+        for index, (op, arg) in enumerate(bytecode):
+            if op == JUMP_IF_ZERO:
+                self.assertEqual(bytecode[arg], (JUMP_IF_NOT_ZERO, index))
+
+    def test_spans(self):
+        program = "+++ comment\n>>.[-<,.>]"
+        spans = list()
+        bytecode = compile_bytecode(program, 8, spans)
+        self.assertEqual(len(spans), len(bytecode))
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], len(program))
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            self.assertLessEqual(end, start)
+
+    def test_mismatched_loops(self):
+        for program in ["[", "]", "+[[-]", "+[-]]", "][", "[[]"]:
+            with self.subTest(program):
+                with self.assertRaises(SyntaxError):
+                    compile_bytecode(program)
+
+    def test_examples(self):
+        for name, program, input in get_examples():
+            self.assertTrue(self.check_program(program, input), name)
+
+    def test_random_programs(self):
+        generator = random.Random(1)
+        for _ in range(500):
+            program = get_random_program(generator, generator.randint(1, 40), "+-<>,.[]+-><+++---#x")
+            self.check_program(program, b"\x03\x05\x07", max_commands=10000)
+
+    def test_wide_cells(self):
+        generator = random.Random(2)
+        for _ in range(200):
+            program = get_random_program(generator, generator.randint(1, 40), "+-<>,.[]-----<>")
+            self.check_program(program, b"\x03\x05\x07", 16, 10000)
+
+    def test_linear_loops(self):
+        self.assertEqual(compile_bytecode("[-]"), [(CLEAR, 0)])
+        self.assertEqual(compile_bytecode("[+]"), [(CLEAR, 0)])
+        self.assertEqual(compile_bytecode("[->+>---<<]"), [(LINEAR, (1, ((1, False, 1), (2, False, 253))))])
+        self.assertEqual(compile_bytecode("[--->+<]"), [(LINEAR, (171, ((1, False, 1),)))])  # 3 * 171 = 1 (mod 256)
+        self.assertEqual(compile_bytecode("[>[-]+<[-]]"), [(LINEAR, (None, ((1, True, 1),)))])
+        for program in ["[-->+<]", "[->+<<]", "[->.<]", "[->,<]", "[->[>]<]", "[-]+[->+<+]"]:
+            with self.subTest(program):
+                self.assertNotIn(LINEAR, [op for op, _ in compile_bytecode(program)])
+
+    def test_random_linear_loops(self):
+        generator = random.Random(3)
+        for _ in range(300):
+            bits = generator.choice([8, 8, 16])
+            program = ""
+            for _ in range(generator.randint(1, 4)):
+                program += ">" * generator.randint(0, 3) + "+" * generator.randint(0, 300) + "<" * generator.randint(0, 3)
+                program += get_random_linear_loop(generator)
+            self.check_program(program + ">>>>[.>]", b"", bits, 10 ** 5)
+
+    def test_scan(self):
+        self.assertEqual(compile_bytecode("[>]"), [(SCAN, 1)])
+        self.assertEqual(compile_bytecode("[<<<]"), [(SCAN, -3)])
+        self.assertEqual(compile_bytecode("[><<]"), [(SCAN, -1)])
+        for bits in [8, 16, 32]:
+            data = create_tape(bits, 10)
+            data[2:5] = create_tape(bits, 3)
+            for index in [0, 1, 3, 5, 6, 7, 9]:
+                data[index] = 7
+            with self.subTest(bits=bits):
+                self.assertEqual(scan(data, 0, 1), 2)
+                self.assertEqual(scan(data, 5, 1), 8)
+                self.assertEqual(scan(data, 9, 1), 10)  # the cells beyond the tape are zero
+                self.assertEqual(scan(data, 0, 2), 2)
+                self.assertEqual(scan(data, 1, 2), 11)
+                self.assertEqual(scan(data, 1, 4), 9 + 4)
+                self.assertEqual(scan(data, 7, -1), 4)
+                self.assertEqual(scan(data, 1, -1), -1)
+                self.assertEqual(scan(data, 9, -2), 9 - 2 * 5)
+                self.assertEqual(scan(data, 6, -3), -3)
+
+    def test_random_scans(self):
+        generator = random.Random(4)
+        for _ in range(300):
+            program = ""
+            for _ in range(generator.randint(1, 20)):
+                program += generator.choice(["+", "+", "-", ">", "<", "[-]", ">>>", "<<<"])
+            for _ in range(generator.randint(1, 3)):
+                stride = generator.choice([1, 1, 2, 3, 5])
+                program += "[" + generator.choice([">", "<"]) * stride + "]" + generator.choice(["+", "-", "+>", "<+"])
+            self.check_program(program + "[.<]", b"", generator.choice([8, 16]), 10 ** 5)
+
+    def test_blocks(self):
+        self.assertEqual(compile_bytecode(">+>++<<-"),
+                         [(BLOCK, (0, 2, 0, ((0, False, 255), (1, False, 1), (2, False, 2))))])
+        self.assertEqual(compile_bytecode("<<+>[-]+>>"), [(BLOCK, (-2, 1, 1, ((-2, False, 1), (-1, True, 1))))])
+        self.assertEqual(compile_bytecode("+>[-]<+"), [(BLOCK, (0, 1, 0, ((0, False, 2), (1, True, 0))))])
+        self.assertEqual(compile_bytecode(">+<-+>-<"), [])  # everything cancels out
+        self.assertEqual(compile_bytecode(">+<>-"), [(MOVE, 1)])
+        self.assertEqual(compile_bytecode("[-]+++"), [(BLOCK, (0, 0, 0, ((0, True, 3),)))])
+        self.assertEqual(compile_bytecode("+++[-]"), [(CLEAR, 0)])
+        self.assertEqual(compile_bytecode(">+<.>+<"), [(BLOCK, (0, 1, 0, ((1, False, 1),))), (OUTPUT, 0),
+                                                      (BLOCK, (0, 1, 0, ((1, False, 1),)))])
+
+    def test_random_blocks(self):
+        generator = random.Random(9)
+        for _ in range(300):
+            program = ""
+            for _ in range(generator.randint(1, 5)):
+                program += "".join(generator.choice(["+", "-", ">", "<", ">>>", "<<<", "[-]", "+++++"])
+                                   for _ in range(generator.randint(1, 30)))
+                program += generator.choice([".", ",", "[-<+>]", "[>]", "[<]", "[.-]"])
+            self.check_program(program, b"\x03\x05", generator.choice([8, 16]), 10 ** 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import io
+import os
+import shutil
+import tempfile
+import contextlib
+import unittest
+from unittest import mock
+
+from reference import run_reference
+import Engine
+from Engine import VM, Program
+
+PROGRAM = "++++++++[>++++[>++>+++>+++>+<<<<-]>+>+>->>+[<]<-]>>.>---.+++++++..+++."
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="BF-it-test-")
+        Engine.CACHE_DIRECTORY = self.directory
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, True)
+        Engine.CACHE_DIRECTORY = None
+
+    def get_entries(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(Engine.CACHE_SUFFIXES))
+
+    def test_hit_and_miss(self):
+        program = Program(PROGRAM, cache=True)  # a miss: prepared and stored
+        path = Engine.get_cache_path(program.hash, 8, ".program")
+        self.assertEqual(self.get_entries(), [os.path.basename(path)])
+        self.assertIn("-8-v%d.program" % Engine.INTERPRETER_VERSION, path)
+        with mock.patch.object(Engine, "compile_bytecode", side_effect=AssertionError("not from the cache")):
+            cached = Program(PROGRAM, cache=True)  # a hit
+            with self.assertRaises(AssertionError):
+                Program(PROGRAM, 16, cache=True)  # another entry
+            with self.assertRaises(AssertionError):
+                Program(PROGRAM)  # the cache isn't used
+        self.assertEqual((cached.bytecode, cached.spans), (program.bytecode, program.spans))
+        self.assertEqual(VM().run(cached), run_reference(PROGRAM)[0])
+
+    def test_corrupt_entry(self):
+        path = Engine.get_cache_path(Program(PROGRAM).hash, 8, ".program")
+        for content in [b"", b"\x00garbage"]:
+            with open(path, "wb") as f:
+                f.write(content)
+            with self.subTest(content=content):
+                self.assertEqual(VM().run(Program(PROGRAM, cache=True)), run_reference(PROGRAM)[0])
+                self.assertEqual(Engine.read_cache(path), (Program(PROGRAM).bytecode, Program(PROGRAM).spans))
+
+    def test_python_backend(self):
+        program = Program(PROGRAM, 8, "python", cache=True)
+        self.assertEqual(len(self.get_entries()), 2)
+        Engine.PYTHON_BACKEND_CACHE.clear()
+        with mock.patch.object(Engine, "compile_to_python", side_effect=AssertionError("not from the cache")):
+            cached = Program(PROGRAM, 8, "python", cache=True)
+        self.assertEqual(cached.compiled, program.compiled)
+        self.assertEqual(VM().run(cached), run_reference(PROGRAM)[0])
+
+    def test_eviction(self):
+        for index in range(5):
+            Engine.write_cache(os.path.join(self.directory, "entry%d.program" % index), b"x" * 1000)
+            os.utime(os.path.join(self.directory, "entry%d.program" % index), (1000 + index, 1000 + index))
+        with open(os.path.join(self.directory, "entry.program.1.tmp"), "wb") as f:
+            f.write(b"x" * 10000)  # being written by another process
+        self.assertEqual(Engine.read_cache(os.path.join(self.directory, "entry0.program")), b"x" * 1000)  # used
+        with mock.patch.object(Engine, "CACHE_MAX_SIZE", 3 * 1100):
+            Engine.evict_cache()
+        self.assertEqual(self.get_entries(), ["entry0.program", "entry3.program", "entry4.program"])
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "entry.program.1.tmp")))
+        with mock.patch.object(Engine, "CACHE_MAX_SIZE", 0):
+            Engine.write_cache(os.path.join(self.directory, "entry5.program"), b"")
+        self.assertEqual(self.get_entries(), [])
+
+    def test_directory(self):
+        Engine.CACHE_DIRECTORY = None
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.directory}):
+            directory = Engine.get_cache_directory()
+            self.assertEqual(directory, os.path.join(self.directory, "BF-it"))
+            self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+            self.assertIs(Engine.get_cache_directory(), directory)
+
+            if hasattr(os, "getuid"):
+                # a directory others can write to isn't used
+                Engine.CACHE_DIRECTORY = None
+                os.chmod(directory, 0o777)
+                errors = io.StringIO()
+                with contextlib.redirect_stderr(errors):
+                    temporary_directory = Engine.get_cache_directory()
+                self.assertNotEqual(temporary_directory, directory)
+                self.assertTrue(Engine.is_private_directory(temporary_directory))
+                self.assertIn("is not private", errors.getvalue())
+                shutil.rmtree(temporary_directory)
+        Engine.CACHE_DIRECTORY = self.directory
+
+
+if __name__ == "__main__":
+    unittest.main()
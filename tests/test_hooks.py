@@ -0,0 +1,97 @@
+import io
+import random
+import contextlib
+import unittest
+from unittest import mock
+
+from reference import TooManyCommands, run_reference, get_vm_state, get_random_program
+import Engine
+from Engine import VM, Program, Hooks, Sampler, compile_bytecode, create_jumps_dictionary, CLEAR
+
+
+class HooksTest(unittest.TestCase):
+    def run_hooked(self, program, input=b"", bits=8, eof="0", backend="interpreter"):
+        # runs the program with all the hooks registered, returns the output and what each hook was called with
+        calls = dict((name, list()) for name in Hooks.NAMES)
+        hooks = Hooks()
+        for name in Hooks.NAMES:
+            hooks.register(name, calls[name].append)
+        vm = VM(eof=eof)
+        output = vm.run(Program(program, bits, backend), input, hooks=hooks)
+        return output, get_vm_state(vm), calls
+
+    def test_random_programs(self):
+        # a hooked run is the same as the reference's, and the hooks see what the reference does
+        generator = random.Random(25)
+        for _ in range(500):
+            program = get_random_program(generator, generator.randint(1, 50))
+            input = bytes(generator.randrange(256) for _ in range(generator.randint(0, 4)))
+            eof = generator.choice(["0", "255", "unchanged"])
+            counts = [0] * len(program)
+            entries = list()
+            try:
+                expected = run_reference(program, input, 8, eof, max_commands=10000, counts=counts, entries=entries)
+            except TooManyCommands:
+                continue
+            with self.subTest(program=program, input=input, eof=eof):
+                output, state, calls = self.run_hooked(program, input, 8, eof)
+                self.assertEqual((output, state), expected)
+                self.assertEqual(bytes(calls["on_output"]), output)
+                reads = sum(count for command, count in zip(program, counts) if command == ",")
+                past_end = None if eof == "unchanged" else int(eof)
+                self.assertEqual(calls["on_input"], [input[index] if index < len(input) else past_end
+                                                     for index in range(reads)])
+                # clear loops may be combined with the code around them
+                jumps = create_jumps_dictionary(program)
+                clear_loops = {index for index in range(len(program)) if program[index] == "["
+                               and compile_bytecode(program[index:jumps[index] + 1]) == [(CLEAR, 0)]}
+                self.assertEqual([index for index in calls["on_loop_enter"] if index not in clear_loops],
+                                 [index for index in entries if index not in clear_loops])
+                self.assertLessEqual(set(state[0]), set(calls["on_tape_write"]))
+                self.assertEqual(calls["on_step"], sorted(calls["on_step"]))
+
+    def test_calls(self):
+        output, state, calls = self.run_hooked("++[>+++[>+<-]<-],.>>.", b"a")
+        self.assertEqual((output, state), (b"a\x06", ({0: 97, 2: 6}, 2)))
+        self.assertEqual(calls["on_loop_enter"], [2, 7, 7])  # the linear loop once per entry
+        self.assertEqual(calls["on_input"], [97])
+        self.assertEqual(calls["on_output"], [97, 6])
+        self.assertEqual(set(calls["on_tape_write"]), {0, 1, 2})
+
+    def test_negative_addresses(self):
+        _, state, calls = self.run_hooked("+<<+>-")
+        self.assertEqual(state, ({-2: 1, 0: 1, -1: 255}, -1))
+        self.assertEqual(sorted(set(calls["on_tape_write"])), [-2, -1, 0])
+
+    def test_empty(self):
+        # a run without hooks registered doesn't look for them
+        hooks = Hooks()
+        self.assertTrue(hooks.is_empty())
+        with mock.patch.object(Engine, "run_bytecode_with_hooks", side_effect=AssertionError("hooks looked for")):
+            self.assertEqual(VM().run(Program("+++."), hooks=hooks), b"\x03")
+            hooks.register("on_output", print)
+            self.assertFalse(hooks.is_empty())
+            hooks.register("on_output", None)
+            self.assertEqual(VM().run(Program("+++."), hooks=hooks, stats=True), b"\x03")
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, "unknown hook 'on_exit'"):
+            Hooks().register("on_exit", print)
+        hooks = Hooks(on_output=print)
+        with self.assertRaisesRegex(ValueError, "stats or a sampler"):
+            VM().run(Program("+."), output=io.BytesIO(), hooks=hooks, stats=True)
+        with self.assertRaisesRegex(ValueError, "stats or a sampler"):
+            VM().run(Program("+."), output=io.BytesIO(), hooks=hooks, sampler=Sampler())
+
+    def test_backend(self):
+        # the other backends leave hooked runs to the interpreter
+        Engine.WARNINGS.clear()
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            output, _, calls = self.run_hooked("+++[>++<-]>.", backend="python")
+        self.assertEqual((output, calls["on_output"]), (b"\x06", [6]))
+        self.assertIn("doesn't support hooks", errors.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import re
+import random
+import unittest
+from unittest import mock
+
+from reference import TooManyCommands, run_reference, get_state, get_examples
+import Engine
+from Engine import VM, Program, create_tape, get_hint_code, get_hints, run_intrinsic
+from Compiler import Compiler
+
+NAMES = ("divmod", "mul", "arrget", "arrset")
+
+
+def run_hint_code(name, offset, values, data_pointer):
+    # runs the operation's code with the reference interpreter, on a tape that starts with the values
+    program = ",>" * len(values) + "<" * (len(values) - data_pointer) + get_hint_code(name, offset)
+    return run_reference(program, bytes(values), max_commands=10000)
+
+
+class IntrinsicTest(unittest.TestCase):
+    def test_operations(self):
+        # each operation performed at once leaves the tape as its code does
+        generator = random.Random(23)
+        for name in NAMES:
+            performed = 0
+            for _ in range(300):
+                values = [generator.randrange(256) if generator.random() < 0.5 else generator.randrange(8)
+                          for _ in range(generator.randint(1, 16))]
+                data_pointer = generator.randrange(len(values))
+                offset = 0
+                if name in ("arrget", "arrset"):
+                    # an array of up to 8 elements, then the cells the compiler uses to access it
+                    index = generator.randrange(8)
+                    offset = generator.randint(index + 1, 10)
+                    data_pointer = offset + (1 if name == "arrget" else 3)
+                    values = values + [0] * (data_pointer + index + 4 - len(values))
+                    values[data_pointer - (1 if name == "arrget" else 3)] = index
+                data = create_tape(8, len(values) + 20)
+                data[:len(values)] = bytes(values)
+                result = run_intrinsic(data, 8, data_pointer, name, offset)
+                if result is None:
+                    continue  # its code runs as is
+                try:
+                    expected = run_hint_code(name, offset, values, data_pointer)
+                except TooManyCommands:
+                    continue
+                performed += 1
+                with self.subTest(name=name, offset=offset, values=values, data_pointer=data_pointer):
+                    self.assertEqual((b"", get_state(data, result, 0)), expected)
+            self.assertGreater(performed, 50, name)
+
+    def test_tape_end(self):
+        # an operation that would reach beyond the tape is left to its code, which grows the tape
+        data = create_tape(8, 3)
+        data[:2] = b"\x07\x03"
+        self.assertIsNone(run_intrinsic(data, 8, 0, "divmod", 0))
+        self.assertIsNone(run_intrinsic(data, 8, 0, "mul", 0))
+        self.assertEqual(data, b"\x07\x03\x00")
+        self.assertEqual(VM().run(Program("+++++++>+++<" + "#divmod" + get_hint_code("divmod", 0) + "#end")), b"")
+
+    def test_wide_cells(self):
+        data = create_tape(16, 10)
+        data[0], data[1] = 1000, 300
+        self.assertEqual(run_intrinsic(data, 16, 0, "mul", 0), 1)
+        self.assertEqual(list(data[:4]), [1000 * 300 % 2 ** 16, 300, 0, 0])
+        data[0], data[1] = 1000, 300
+        self.assertEqual(run_intrinsic(data, 16, 0, "divmod", 0), 0)
+        self.assertEqual(list(data[:6]), [0, 200, 100, 3, 0, 0])
+
+    def test_hints(self):
+        for name in NAMES:
+            for offset in ([0] if name in ("divmod", "mul") else range(6)):
+                code = get_hint_code(name, offset)
+                program = "+>#" + name + code + "#end<"
+                with self.subTest(name=name, offset=offset):
+                    self.assertEqual(get_hints(program), {2: (name, offset, 3 + len(name), 3 + len(name) + len(code))})
+                    # code that isn't exactly the compiler's is not an intrinsic
+                    self.assertEqual(get_hints(program.replace(code, code[:-1] + "+" + code[-1])), dict())
+                    self.assertEqual(get_hints(program.replace("#end", "")), dict())
+
+    def test_examples(self):
+        # the compiled examples run the same with and without hints, and perform the operations at once
+        performed = set()
+
+        def record_intrinsic(data, bits, data_pointer, name, offset):
+            result = run_intrinsic(data, bits, data_pointer, name, offset)
+            if result is not None:
+                performed.add(name)
+            return result
+
+        for name, source, input in get_examples(".code"):
+            with self.subTest(name):
+                code = Compiler.compile(source)
+                hinted_code = Compiler.compile(source, False, True)
+                self.assertEqual(re.sub("#(divmod|mul|arrget|arrset|end)", "", hinted_code), code)
+                with mock.patch.object(Engine, "run_intrinsic", record_intrinsic):
+                    self.assertEqual(VM().run(Program(hinted_code), input), run_reference(code, input)[0])
+        self.assertEqual(performed, set(NAMES))
+
+
+if __name__ == "__main__":
+    unittest.main()
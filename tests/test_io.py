@@ -0,0 +1,131 @@
+import io
+import random
+import unittest
+
+from reference import TooManyCommands, run_reference, run_engine, get_random_program
+from Engine import VM, Program, OutputSink, InputSource, OUTPUT_FLUSH_THRESHOLD
+
+
+class RecordingStream(io.RawIOBase):
+    # a binary stream that keeps every write apart
+    def __init__(self):
+        io.RawIOBase.__init__(self)
+        self.writes = list()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+        return len(data)
+
+
+class PromptInput(io.RawIOBase):
+    # a binary stream that records the output written before each read from it
+    def __init__(self, data, output):
+        io.RawIOBase.__init__(self)
+        self.data = data
+        self.output = output
+        self.seen = list()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        self.seen.append(b"".join(self.output.writes))
+        if not self.data:
+            return 0
+        buffer[0] = self.data[0]
+        self.data = self.data[1:]
+        return 1
+
+
+class OutputTest(unittest.TestCase):
+    def test_large_chunks(self):
+        stream = RecordingStream()
+        program = "++++++++[>++++++++++++++++<-]>[>" + "+" * 200 + "[.-]<-]"  # 128 times 200 bytes
+        VM().run(Program(program), output=stream)
+        expected, _ = run_reference(program)
+        self.assertGreater(len(expected), 3 * OUTPUT_FLUSH_THRESHOLD)
+        self.assertEqual(b"".join(stream.writes), expected)
+        self.assertLessEqual(len(stream.writes), len(expected) // OUTPUT_FLUSH_THRESHOLD + 1)
+
+    def test_flush_before_input(self):
+        output = RecordingStream()
+        input = PromptInput(b"ab", output)
+        VM().run(Program("+++.,.>++++.,.>+++++.,."), input, output)
+        self.assertEqual(input.seen, [b"\x03", b"\x03a\x04", b"\x03a\x04b\x05"])
+        self.assertEqual(b"".join(output.writes), b"\x03a\x04b\x05\x00")
+
+    def test_flush_at_the_end(self):
+        stream = RecordingStream()
+        sink = OutputSink(stream)
+        sink.buffer += b"abc"
+        self.assertEqual(stream.writes, [])
+        sink.flush()
+        self.assertEqual(stream.writes, [b"abc"])
+        sink.flush()
+        self.assertEqual(stream.writes, [b"abc"])  # nothing more to write
+        self.assertEqual(sink.written, 3)
+
+        output = io.BytesIO()
+        VM().run(Program("+++++[>+++++++++<-]>.+.+."), output=output)
+        self.assertEqual(output.getvalue(), b"-./")
+
+    def test_returned_output(self):
+        program = "++++++++[>++++++++++++++++<-]>[>" + "+" * 200 + "[.-]<-]"  # 128 times 200 bytes
+        self.assertEqual(VM().run(Program(program)), run_reference(program)[0])
+        self.assertEqual(VM().run(Program(program, 16)), run_reference(program, bits=16)[0])
+
+
+class InputTest(unittest.TestCase):
+    def test_eof(self):
+        program = "+++>,<,.>."
+        self.assertEqual(VM(eof="0").run(Program(program), b"a"), b"\x00a")
+        self.assertEqual(VM(eof="255").run(Program(program), b"a"), b"\xffa")
+        self.assertEqual(VM(eof="unchanged").run(Program(program), b"a"), b"\x03a")
+        self.assertEqual(VM(eof="255").run(Program(program, 16), b""), "\xff\xff".encode("utf8"))
+
+    def test_binary_input(self):
+        data = bytes(range(256))
+        self.assertEqual(VM().run(Program(",[.,]"), data[1:]), data[1:])
+        self.assertEqual(VM().run(Program(",[.,]"), io.BytesIO(data[1:] * 100)), data[1:] * 100)
+
+    def test_blocks(self):
+        class Stream(io.BytesIO):
+            def read1(self, size=-1):
+                sizes.append(size)
+                return io.BytesIO.read1(self, size)
+
+        sizes = list()
+        source = InputSource(Stream(b"x" * 10000))
+        self.assertEqual(bytes(source.read() for _ in range(10000)), b"x" * 10000)
+        self.assertEqual(source.read(), 0)
+        self.assertEqual(sizes, [InputSource.BLOCK_SIZE] * 4)
+        self.assertEqual(source.consumed, 10000)
+
+        source = InputSource(b"abc", "unchanged")
+        self.assertEqual([source.read() for _ in range(5)], [97, 98, 99, None, None])
+        self.assertEqual(source.consumed, 3)
+        source = InputSource(io.BytesIO(b"abcdef"))
+        self.assertEqual(source.read(), 97)
+        self.assertEqual(source.read_all(), b"bcdef")
+        self.assertEqual(source.consumed, 6)
+
+    def test_random_programs(self):
+        generator = random.Random(6)
+        for _ in range(300):
+            eof = generator.choice(["0", "255", "unchanged"])
+            program = get_random_program(generator, generator.randint(1, 40), "+-<>,.[],,,")
+            input = bytes(generator.randrange(256) for _ in range(generator.randint(0, 5)))
+            try:
+                expected = run_reference(program, input, eof=eof, max_commands=10000)
+            except TooManyCommands:
+                continue
+            with self.subTest(program=program, input=input, eof=eof):
+                self.assertEqual(run_engine(program, input, eof=eof), expected)
+                self.assertEqual(run_engine(program, io.BytesIO(input), eof=eof), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import io
+import os
+import sys
+import time
+import shutil
+import random
+import tempfile
+import contextlib
+import subprocess
+import unittest
+
+from reference import TooManyCommands, run_reference, get_state, get_vm_state, get_random_program
+import Engine
+from Engine import VM, Program, ResourceLimitExceeded, InfiniteLoop, compile_bytecode, INFINITE_LOOP
+
+REPOSITORY_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+class LimitsTest(unittest.TestCase):
+    def check_state(self, vm, error):
+        # the state of the stopped program is in the error and in the VM
+        self.assertIsNotNone(error.tape)
+        self.assertEqual(error.tape, vm.tape)
+        self.assertEqual((error.data_pointer, error.origin), (vm.data_pointer, vm.origin))
+        self.assertEqual(error.instruction_pointer, vm.instruction_pointer)
+        self.assertLess(error.instruction_pointer, len(vm.program.bytecode))
+        self.assertEqual(error.output_size, vm.output_size)
+
+    def test_steps(self):
+        vm = VM(max_steps=1000)
+        output = io.BytesIO()
+        with self.assertRaises(ResourceLimitExceeded) as context:
+            vm.run(Program("-[>-[.-]<-]"), output=output)
+        error = context.exception
+        self.assertEqual(error.limit, "steps")
+        self.assertGreater(error.steps, 1000)
+        self.check_state(vm, error)
+        self.assertEqual(error.output_size, len(output.getvalue()))
+        self.assertTrue(run_reference("-[>-[.-]<-]")[0].startswith(output.getvalue()))
+
+    def test_timeout(self):
+        vm = VM(timeout=0.2)
+        started = time.monotonic()
+        with self.assertRaises(ResourceLimitExceeded) as context:
+            vm.run(Program("-[>-[>-[>-[-<+>]<-]<-]<-]"))
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(context.exception.limit, "time")
+        self.check_state(vm, context.exception)
+
+    def test_cells(self):
+        for program in ["+[>+]", "+[<+]", "+[>>>>>>>>+]"]:
+            with self.subTest(program):
+                vm = VM(max_cells=100)
+                with self.assertRaises(ResourceLimitExceeded) as context:
+                    vm.run(Program(program))
+                self.assertEqual(context.exception.limit, "cells")
+                self.assertLessEqual(len(context.exception.tape), 100)
+                self.check_state(vm, context.exception)
+        self.assertEqual(VM(max_cells=100).run(Program(">" * 99 + "+.")), b"\x01")
+
+    def test_output(self):
+        output = io.BytesIO()
+        vm = VM(max_output=100)
+        with self.assertRaises(ResourceLimitExceeded) as context:
+            vm.run(Program("+[.+]"), output=output)
+        self.assertEqual(context.exception.limit, "output")
+        self.assertEqual(output.getvalue(), bytes(range(1, 101)))
+        self.assertEqual(vm.output_size, 100)
+        self.assertEqual(VM(max_output=100).run(Program("+" * 100 + "[.-]")), bytes(range(100, 0, -1)))
+
+    def test_within_limits(self):
+        # limits that aren't breached don't change what programs do
+        generator = random.Random(10)
+        for _ in range(300):
+            program = get_random_program(generator, generator.randint(1, 40))
+            try:
+                expected = run_reference(program, b"\x03\x05\x07", max_commands=10000)
+            except TooManyCommands:
+                continue
+            with self.subTest(program):
+                vm = VM(max_steps=10 ** 6, timeout=60, max_cells=10 ** 6, max_output=10 ** 6)
+                output = vm.run(Program(program), b"\x03\x05\x07")
+                self.assertEqual((output, get_vm_state(vm)), expected)
+
+    def test_backend_fallback(self):
+        # only the interpreter checks the limits, the other backends warn that it's used instead
+        Engine.WARNINGS.clear()
+        errors = io.StringIO()
+        vm = VM(max_steps=1000)
+        with contextlib.redirect_stderr(errors):
+            with self.assertRaises(ResourceLimitExceeded) as context:
+                vm.run(Program("-[>-[.-]<-]", 8, "python"))
+            with self.assertRaises(ResourceLimitExceeded):
+                vm.run(Program("-[>-[.-]<-]", 8, "python"))
+        self.check_state(vm, context.exception)
+        self.assertEqual(errors.getvalue().count("WARNING"), 1)
+        self.assertIn("python backend doesn't support limits", errors.getvalue())
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "program.bf")
+            for program, arguments, message in [("+[.+]", ["--max-output", "10"], "grew beyond 10 bytes"),
+                                                ("-[>-[.-]<-]", ["--max-steps", "100"], "more than 100 instructions"),
+                                                ("+<+.", ["--negative-pointer", "error"], "left of the tape")]:
+                with open(path, "wt") as f:
+                    f.write(program)
+                with self.subTest(program):
+                    result = subprocess.run([sys.executable, os.path.join(REPOSITORY_DIRECTORY, "Interpreter.py"), path]
+                                            + arguments, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    self.assertEqual(result.returncode, 1)
+                    self.assertIn(message, result.stderr.decode())
+                    self.assertNotIn("Traceback", result.stderr.decode())
+
+
+class InfiniteLoopTest(unittest.TestCase):
+    backends = ["interpreter", "python"] + (["c"] if shutil.which(os.environ.get("CC", "cc")) else []) + \
+        (["jit"] if Engine.jit_supported(8) else []) + (["cpp"] if shutil.which(os.environ.get("CXX", "g++")) else [])
+
+    def setUp(self):
+        Engine.CACHE_DIRECTORY = tempfile.mkdtemp(prefix="BF-it-test-")  # for the C and C++ backends
+
+    def tearDown(self):
+        shutil.rmtree(Engine.CACHE_DIRECTORY, True)
+        Engine.CACHE_DIRECTORY = None
+
+    def test_detection(self):
+        for program in ["[]", "[>+<]", "[[-]+]", "[>[-]<]", "[+-]", "[>><<]", "[-]+[[-]+>+<]"]:
+            with self.subTest(program):
+                self.assertIn(INFINITE_LOOP, [op for op, _ in compile_bytecode(program)])
+        for program in ["[-]", "[>]", "[.]", "[,]", "[>+]", "[-[+]]", "[[-]>+<]", "[>[>]<]", "[->+<]"]:
+            with self.subTest(program):
+                self.assertNotIn(INFINITE_LOOP, [op for op, _ in compile_bytecode(program)])
+
+    def test_halting(self):
+        for backend in self.backends:
+            with self.subTest(backend):
+                self.assertEqual(VM().run(Program("[]>[>+<]+.", 8, backend)), b"\x01")  # never entered
+                vm = VM()
+                output = io.BytesIO()
+                with self.assertRaises(InfiniteLoop) as context:
+                    vm.run(Program("+++.>+<<+[>>+<<]", 8, backend), output=output)
+                error = context.exception
+                self.assertEqual(error.index, 9)
+                self.assertIn("infinite loop at index 9", str(error))
+                self.assertEqual(get_state(error.tape, error.data_pointer, error.origin), ({-1: 1, 0: 3, 1: 1}, -1))
+                self.assertEqual(output.getvalue(), b"\x03")
+                self.assertEqual(error.output_size, 1)
+
+    def test_random_programs(self):
+        # the programs that are stopped never end
+        generator = random.Random(11)
+        stopped = 0
+        for _ in range(1000):
+            program = get_random_program(generator, generator.randint(1, 30), "+-<>[]+-<>[]")
+            try:
+                VM(max_steps=10000).run(Program(program))
+            except InfiniteLoop:
+                stopped += 1
+                with self.subTest(program):
+                    with self.assertRaises(TooManyCommands):
+                        run_reference(program, max_commands=10 ** 5)
+            except ResourceLimitExceeded:
+                pass
+        self.assertGreater(stopped, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import random
+import tempfile
+import unittest
+
+from reference import EXAMPLES_DIRECTORY, TooManyCommands, run_reference, get_state, get_random_program, get_examples
+from Engine import Program
+import Batch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+if numpy is not None:
+    from Lockstep import LockstepVM
+
+
+@unittest.skipIf(numpy is None, "the lockstep VM needs NumPy")
+class LockstepTest(unittest.TestCase):
+    def check_program(self, program, inputs, bits=8, eof="0", max_commands=10 ** 6):
+        # compares every lane with the reference interpreter, for the programs that end for all the inputs
+        try:
+            expected = [run_reference(program, input, bits, eof, max_commands=max_commands) for input in inputs]
+        except TooManyCommands:
+            return False
+        vm = LockstepVM(eof=eof)
+        outputs = vm.run(Program(program, bits), inputs)
+        for lane, input in enumerate(inputs):
+            with self.subTest(program=program, input=input, bits=bits, eof=eof):
+                state = get_state(vm.tape[lane].tolist(), int(vm.data_pointers[lane]), vm.origin)
+                self.assertEqual((outputs[lane], state), expected[lane])
+                self.assertIsNone(vm.errors[lane])
+        return True
+
+    def test_random_programs(self):
+        generator = random.Random(17)
+        for _ in range(200):
+            program = get_random_program(generator, generator.randint(1, 50), "+-<>,.[]+-<>,[-]")
+            inputs = [bytes(generator.randrange(256) for _ in range(generator.randint(0, 6))) for _ in range(8)]
+            self.check_program(program, inputs, generator.choice([8, 16]), generator.choice(["0", "255", "unchanged"]),
+                               20000)
+
+    def test_examples(self):
+        inputs = {"do_while_loops.bf": [b"5\n", b"y\n3\n", b"a\n7\n", b"x\ny\n0\n"],
+                  "if_else.bf": [b"1\n4\n", b"2\n5\n", b"3\n3\n", b"8\n9\n", b"5\n7\n"]}
+        for name, program, input in get_examples():
+            self.assertTrue(self.check_program(program, inputs.get(name, [input] * 3)), name)
+
+    def test_errors(self):
+        # the lanes that fail are retired, the others go on
+        for program, error in [(",[>+<]+.", "infinite loop at index 1"), (",[<<]+.", "left of the tape"),
+                               (",[>+[-<+>]<-]+.", "executed more than 1000 instructions")]:
+            with self.subTest(program):
+                vm = LockstepVM("error", max_steps=1000)
+                self.assertEqual(vm.run(Program(program), [b"\x00", b"\x01", b"\x00"]), [b"\x01", b"", b"\x01"])
+                self.assertEqual(vm.errors[0::2], [None, None])
+                self.assertIn(error, vm.errors[1])
+
+    def test_batch(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "program.bf")
+            with open(path, "wt") as f:
+                f.write(",[.,]+[>+<]")
+            results = sorted(Batch.batch([path, os.path.join(EXAMPLES_DIRECTORY, "pow.code")], [b"", b"ab", b"xyz"],
+                                         workers=2, lockstep=True), key=lambda result: (result["file"], result["input"]))
+        with open(os.path.join(EXAMPLES_DIRECTORY, "pow.bf"), "rt") as f:
+            pow_output = run_reference(f.read())[0].decode("latin-1")
+        self.assertEqual([(result["output"], result["exit_status"]) for result in results],
+                         [(pow_output, 0)] * 3 + [("", 1), ("ab", 1), ("xyz", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import re
+import sys
+import signal
+import tempfile
+import subprocess
+import unittest
+
+from reference import EXAMPLES_DIRECTORY, run_reference, get_examples
+from Engine import VM, Program, Sampler
+from Compiler import Compiler
+
+
+class SourceMapTest(unittest.TestCase):
+    def test_source_maps(self):
+        for name, source, _ in get_examples(".code"):
+            with self.subTest(name):
+                code, source_map = Compiler.compile_with_source_map(source)
+                self.assertEqual(code, Compiler.compile(source))  # the markers are gone
+                position = 0
+                for start, end, function, line, call_sites in source_map:
+                    self.assertLessEqual(position, start)
+                    self.assertLess(start, end)
+                    self.assertTrue(function is None or isinstance(function, str))
+                    position = end
+                self.assertLessEqual(position, len(code))
+
+    def test_profile(self):
+        # each source line gets the commands executed in its code, counted one by one
+        for name, source, input in get_examples(".code"):
+            with self.subTest(name):
+                code, source_map = Compiler.compile_with_source_map(source)
+                counts = [0] * len(code)
+                run_reference(code, input, counts=counts)
+                expected = dict()
+                for start, end, function, line, _ in source_map:
+                    commands = sum(counts[start:end])
+                    if commands:
+                        expected[(function, line)] = expected.get((function, line), 0) + commands
+                unmapped = sum(counts) - sum(expected.values())
+                if unmapped:
+                    expected[(None, None)] = unmapped
+
+                vm = VM()
+                vm.run(Program(code), input, source_map=source_map)
+                self.assertEqual(vm.stats["lines"], expected)
+                self.assertEqual(vm.stats["commands"], sum(counts))
+                functions = vm.stats["functions"]
+                self.assertEqual(sum(own for own, _ in functions.values()), sum(counts))
+                for function, (own, total) in functions.items():
+                    self.assertEqual(own, sum(commands for (line_function, _), commands in expected.items()
+                                              if line_function == function))
+                    self.assertGreaterEqual(total, own)
+
+    def test_command_line(self):
+        repository = os.path.dirname(EXAMPLES_DIRECTORY)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "functions.bf")
+            subprocess.run([sys.executable, os.path.join(repository, "BF-it.py"),
+                            os.path.join(EXAMPLES_DIRECTORY, "functions.code"), "-o", path, "--source-map"],
+                           stdout=subprocess.PIPE, check=True)
+            result = subprocess.run([sys.executable, os.path.join(repository, "Interpreter.py"), path,
+                                     "--profile", path + ".map"], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    check=True)
+        with open(os.path.join(EXAMPLES_DIRECTORY, "functions.bf"), "rt") as f:
+            self.assertEqual(result.stdout, run_reference(f.read())[0])
+        self.assertIn(b"\nFunctions (own lines / including the functions they call):\n", result.stderr)
+        self.assertIn(b"  foo\n", result.stderr)
+        self.assertIn(b"\nLines:\n", result.stderr)
+
+
+class SamplerTest(unittest.TestCase):
+    PROGRAM = "+++[>++++++++[>-[.-]<-]<-]>>++++++++[<-[-.]>-]"  # the loop at 16 runs most, then the one at 39
+
+    def check_stacks(self, sampler):
+        stacks = dict()
+        for line in sampler.get_collapsed_stacks().splitlines():
+            match = re.fullmatch(r"(program(?:;loop@\d+)*) (\d+)", line)
+            self.assertIsNotNone(match, line)
+            stacks[match.group(1)] = int(match.group(2))
+        for stack in stacks:
+            for frame in stack.split(";")[1:]:
+                self.assertEqual(self.PROGRAM[int(frame[len("loop@"):])], "[")
+        return stacks
+
+    def test_interval(self):
+        sampler = Sampler(100)
+        output = VM().run(Program(self.PROGRAM), sampler=sampler)
+        self.assertEqual(output, run_reference(self.PROGRAM)[0])
+        stacks = self.check_stacks(sampler)
+        self.assertEqual(max(stacks, key=stacks.get), "program;loop@3;loop@13;loop@16")
+        self.assertGreater(stacks["program;loop@3;loop@13;loop@16"], stacks["program;loop@36;loop@39"])
+        # a sample every interval steps, see Limits
+        sparse_sampler = Sampler(1000)
+        VM().run(Program(self.PROGRAM), sampler=sparse_sampler)
+        self.assertLessEqual(abs(sum(stacks.values()) - 10 * sum(sparse_sampler.samples.values())), 10)
+
+    @unittest.skipUnless(hasattr(signal, "setitimer"), "sampling by time needs SIGPROF")
+    def test_timer(self):
+        sampler = Sampler(timer=0.001)
+        output = VM().run(Program(self.PROGRAM * 20), sampler=sampler)
+        self.assertEqual(output, run_reference(self.PROGRAM * 20)[0])
+        self.assertGreater(sum(sampler.samples.values()), 0)
+        self.assertEqual(signal.getsignal(signal.SIGPROF), signal.SIG_DFL)  # restored
+        self.assertEqual(signal.getitimer(signal.ITIMER_PROF), (0.0, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
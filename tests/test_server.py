@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import random
+import asyncio
+import subprocess
+import unittest
+
+from reference import EXAMPLES_DIRECTORY, TooManyCommands, run_reference, get_random_program
+from Server import Server
+
+RUNAWAY_PROGRAM = "+[>+[-<+>]<-]"  # never ends, and isn't detected as an infinite loop
+
+
+class Reader:
+    # a client that sends the given requests, then hangs up after delay seconds
+    def __init__(self, requests, delay=0.0):
+        self.lines = [(json.dumps(request) + "\n").encode() for request in requests]
+        self.delay = delay
+
+    async def readline(self):
+        if self.lines:
+            return self.lines.pop(0)
+        await asyncio.sleep(self.delay)
+        return b""
+
+
+class Writer:
+    def __init__(self):
+        self.events = list()
+        self.closed = False
+
+    def write(self, data):
+        self.events.extend(json.loads(line) for line in data.decode().splitlines())
+
+    async def drain(self):
+        await asyncio.sleep(0)
+
+    def close(self):
+        self.closed = True
+
+
+def get_sessions(events):
+    # returns the output and the exit event of each session, by its ID
+    sessions = dict()
+    for event in events:
+        output, exit_event = sessions.get(event.get("session"), ("", None))
+        if "output" in event:
+            output += event["output"]
+        if "exit_status" in event:
+            exit_event = event
+        sessions[event.get("session")] = (output, exit_event)
+    return sessions
+
+
+class ServerTest(unittest.TestCase):
+    def converse(self, server, requests, finish=True, delay=0.0):
+        # returns the events the server sent to a client that sent the requests
+        writer = Writer()
+
+        async def run():
+            await server.handle_connection(Reader(requests, delay), writer, finish)
+            await asyncio.sleep(0.01)
+            pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            self.assertEqual(pending, [])  # no session is left running
+        try:
+            asyncio.run(run())
+        finally:
+            server.close()
+        self.assertTrue(writer.closed)
+        return writer.events
+
+    def check_sessions(self, workers):
+        generator = random.Random(16)
+        programs = list()
+        while len(programs) < 20:
+            program = get_random_program(generator, generator.randint(1, 50))
+            input = bytes(generator.randrange(1, 256) for _ in range(generator.randint(0, 4)))
+            try:
+                programs.append((program, input.decode("latin-1"),
+                                 run_reference(program, input, max_commands=10000)[0].decode("latin-1")))
+            except TooManyCommands:
+                pass
+        requests = [{"op": "open", "session": session_id, "source": program}
+                    for session_id, (program, _, _) in enumerate(programs)]
+        for position in range(4):  # the input is given a byte at a time, interleaved between the sessions
+            for session_id, (_, input, _) in enumerate(programs):
+                if position < len(input):
+                    requests.append({"op": "input", "session": session_id, "data": input[position]})
+        requests += [{"op": "input", "session": session_id, "data": ""} for session_id in range(len(programs))]
+
+        sessions = get_sessions(self.converse(Server(slice_steps=5, workers=workers), requests))
+        self.assertEqual(sorted(sessions), list(range(len(programs))))
+        for session_id, (output, exit_event) in sessions.items():
+            with self.subTest(program=programs[session_id][0]):
+                self.assertEqual(output, programs[session_id][2])
+                self.assertEqual((exit_event["exit_status"], exit_event["error"]), (0, None))
+
+    def test_sessions(self):
+        self.check_sessions(0)
+
+    def test_workers(self):
+        # the sessions' state goes from worker to worker in snapshots
+        self.check_sessions(2)
+
+    def test_file(self):
+        with open(os.path.join(EXAMPLES_DIRECTORY, "pow.bf"), "rt") as f:
+            expected = run_reference(f.read())[0].decode("latin-1")
+        events = self.converse(Server(), [{"op": "open", "session": "a", "file": os.path.join(EXAMPLES_DIRECTORY,
+                                                                                             "pow.code")},
+                                          {"op": "open", "session": "b", "source": "+.", "bits": 16}])
+        sessions = get_sessions(events)
+        self.assertEqual(sessions["a"][0], expected)
+        self.assertEqual(sessions["b"][0], "\x01")
+
+    def test_errors(self):
+        events = self.converse(Server(max_steps=1000), [
+            {"op": "open", "session": 1, "source": ",[.,]"},
+            {"op": "open", "session": 1, "source": "+"},
+            {"op": "jump", "session": 1},
+            {"op": "input", "session": 2, "data": "x"},
+            {"op": "open", "session": 3, "source": "+[>+<]"},
+            {"op": "open", "session": 4, "source": RUNAWAY_PROGRAM},
+            {"op": "open", "session": 5, "source": "[[]"}])
+        errors = [event["error"] for event in events if "session" not in event]
+        self.assertEqual(len(errors), 4)
+        self.assertIn("session 1 is already open", errors[0])
+        self.assertIn("unknown op \"jump\"", errors[1])
+        self.assertIn("KeyError", errors[2])
+        self.assertIn("SyntaxError", errors[3])
+        sessions = get_sessions(events)
+        self.assertEqual(sessions[1][1]["exit_status"], 0)
+        self.assertIn("infinite loop", sessions[3][1]["error"])
+        self.assertIn("executed more than 1000 instructions", sessions[4][1]["error"])
+
+    def test_close(self):
+        events = self.converse(Server(slice_steps=100), [{"op": "open", "session": "a", "source": RUNAWAY_PROGRAM},
+                                                         {"op": "open", "session": "b", "source": ",[.,]"},
+                                                         {"op": "close", "session": "a"},
+                                                         {"op": "input", "session": "b", "data": "hi"}])
+        sessions = get_sessions(events)
+        self.assertNotIn("a", sessions)  # stopped, it didn't end
+        self.assertEqual(sessions["b"], ("hi", {"session": "b", "exit_status": 0, "error": None}))
+
+    def test_disconnect(self):
+        # the sessions of a client that hangs up are stopped (converse checks that none is left running)
+        for workers in [0, 2]:
+            with self.subTest(workers=workers):
+                events = self.converse(Server(slice_steps=100, workers=workers),
+                                       [{"op": "open", "session": "a", "source": RUNAWAY_PROGRAM},
+                                        {"op": "open", "session": "b", "source": ",[.,]"}], False, 0.1)
+                self.assertFalse(any("exit_status" in event for event in events))
+
+    def test_command_line(self):
+        # on the standard input and output, the sessions run until they end after the requests end
+        requests = [{"op": "open", "session": "a", "source": ",[.,]"}, {"op": "input", "session": "a", "data": "hi"},
+                    {"op": "open", "session": "b", "source": "+++[>+++<-]>."}]
+        result = subprocess.run([sys.executable, os.path.join(os.path.dirname(EXAMPLES_DIRECTORY), "Interpreter.py"),
+                                 "serve", "--no-cache"], input="".join(json.dumps(request) + "\n" for request in requests)
+                                .encode(), stdout=subprocess.PIPE, check=True, timeout=60)
+        sessions = get_sessions(json.loads(line) for line in result.stdout.decode().splitlines())
+        self.assertEqual(sessions, {"a": ("hi", {"session": "a", "exit_status": 0, "error": None}),
+                                    "b": ("\t", {"session": "b", "exit_status": 0, "error": None})})
+
+
+if __name__ == "__main__":
+    unittest.main()
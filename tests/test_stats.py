@@ -0,0 +1,136 @@
+import os
+import sys
+import random
+import tempfile
+import subprocess
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import Interpreter
+
+EXAMPLES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples")
+EXAMPLE_INPUTS = {"calc.bf": b"12\n+\n30\n", "chars.bf": b"a\nb\nz\n", "do_while_loops.bf": b"y\n5\n3\n",
+                  "if_else.bf": b"5\n7\n"}
+
+
+def run_naively(program, input, max_commands=None):
+    # runs the program one command at a time (8-bit cells, 0 at the end of the input)
+    # returns the output, the amount of commands executed, and how many times loop bodies ran
+    # (the loops of calc.bf and chars.bf wait for more input forever, so they're stopped after max_commands)
+    jumps = Interpreter.create_jumps_dictionary(program)
+    tape = [0]
+    data_pointer = 0
+    instruction_pointer = 0
+    input_position = 0
+    output = bytearray()
+    commands = 0
+    loop_iterations = 0
+    while instruction_pointer < len(program) and (max_commands is None or commands < max_commands):
+        command = program[instruction_pointer]
+        if command in "+-<>.,[]":
+            commands += 1
+        if command == "+":
+            tape[data_pointer] = (tape[data_pointer] + 1) & 255
+        elif command == "-":
+            tape[data_pointer] = (tape[data_pointer] - 1) & 255
+        elif command == ">":
+            data_pointer += 1
+            if data_pointer == len(tape):
+                tape.append(0)
+        elif command == "<":
+            data_pointer -= 1
+        elif command == ".":
+            output.append(tape[data_pointer])
+        elif command == ",":
+            tape[data_pointer] = input[input_position] if input_position < len(input) else 0
+            input_position = min(input_position + 1, len(input))
+        elif command == "[":
+            if tape[data_pointer] == 0:
+                instruction_pointer = jumps[instruction_pointer]
+            else:
+                loop_iterations += 1
+        elif command == "]":
+            if tape[data_pointer] != 0:
+                instruction_pointer = jumps[instruction_pointer]
+                loop_iterations += 1
+        instruction_pointer += 1
+    return bytes(output), commands, loop_iterations
+
+
+def get_random_program(generator, length):
+    program = ""
+    depth = 0
+    for _ in range(length):
+        command = generator.choice("+-<>,.[]+-><[-]")
+        if command == "]":
+            if depth == 0:
+                continue
+            depth -= 1
+        elif command == "[":
+            depth += 1
+        program += command
+    return ">" * 4 + program + "]" * depth  # room to the left, the tape can't grow there
+
+
+class StatsTest(unittest.TestCase):
+    def check_counts(self, program, input, max_steps=None):
+        output, commands, loop_iterations = run_naively(program, input)
+        vm = Interpreter.VM("error", max_steps=max_steps)
+        self.assertEqual(vm.run(Interpreter.Program(program), input, stats=True), output)
+        self.assertEqual(vm.stats["commands"], commands)
+        self.assertEqual(vm.stats["loop_iterations"], loop_iterations)
+
+    def test_examples(self):
+        for name in sorted(os.listdir(EXAMPLES_DIRECTORY)):
+            if not name.endswith(".bf") or name in ("calc.bf", "chars.bf"):
+                continue
+            with open(os.path.join(EXAMPLES_DIRECTORY, name), "rt") as f:
+                program = f.read()
+            with self.subTest(name):
+                self.check_counts(program, EXAMPLE_INPUTS.get(name, b""))
+
+    def test_clear_loops(self):
+        for program in ["+++++[-]", "+++[+]", "+++++[---]", ">+++<+++++[>[-]+++<-]", "+-[-]", "++[-]+-", "[-+]",
+                        "+++[[-]]", "++>+++[<[-]>-]", "+++++[->+<]>[>+>+<<-]+-"]:
+            with self.subTest(program):
+                self.check_counts(program, b"")
+
+    def test_random_programs(self):
+        generator = random.Random(0)
+        for _ in range(500):
+            program = get_random_program(generator, generator.randint(1, 40))
+            try:
+                Interpreter.VM("error", max_steps=10000).run(Interpreter.Program(program), b"\x03\x05\x07")
+            except (Interpreter.ExecutionStopped, IndexError):
+                continue  # doesn't end, or moves to the left of the tape
+            with self.subTest(program):
+                self.check_counts(program, b"\x03\x05\x07")
+
+    def test_fields(self):
+        vm = Interpreter.VM()
+        vm.run(Interpreter.Program(">>>+.<<,.,.>[-]<<+<<"), b"ab", stats=True)
+        self.assertEqual(vm.stats["max_cell"], 3)
+        self.assertEqual(vm.stats["output_bytes"], 3)
+        self.assertEqual(vm.stats["input_bytes"], 2)
+        self.assertEqual(vm.stats["commands"], 18)  # the [ of the loop that is skipped, not its body
+        self.assertEqual(vm.stats["loop_iterations"], 0)
+        self.assertLessEqual(vm.stats["instructions"], vm.stats["commands"])
+        self.assertGreaterEqual(vm.stats["seconds"], 0)
+
+    def test_command_line(self):
+        program = "++++++++[>++++[>++>+++>+++>+<<<<-]>+>+>->>+[<]<-]>>.>---.+++++++..+++."
+        _, commands, loop_iterations = run_naively(program, b"")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hello.bf")
+            with open(path, "wt") as f:
+                f.write(program)
+            result = subprocess.run([sys.executable, os.path.join(os.path.dirname(EXAMPLES_DIRECTORY), "Interpreter.py"),
+                                     path, "--stats"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        self.assertTrue(result.stdout.startswith(b"Hello"))
+        self.assertIn(b"Brainfuck commands executed: %d\n" % commands, result.stderr)
+        self.assertIn(b"Loop iterations: %d\n" % loop_iterations, result.stderr)
+        self.assertIn(b"Output bytes: 5, input bytes: 0\n", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
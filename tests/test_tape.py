@@ -0,0 +1,76 @@
+import array
+import random
+import unittest
+
+from reference import TooManyCommands, run_reference, run_engine, get_random_program
+from Engine import VM, Program, create_tape, fit_tape
+
+
+class TapeTest(unittest.TestCase):
+    def test_cell_types(self):
+        self.assertIsInstance(create_tape(8, 4), bytearray)
+        self.assertIsInstance(create_tape(1, 4), bytearray)
+        for bits in [16, 32, 64]:
+            tape = create_tape(bits, 4)
+            self.assertIsInstance(tape, array.array)
+            self.assertEqual(len(tape), 4)
+            self.assertGreaterEqual(tape.itemsize * 8, bits)
+            tape[3] = 2 ** bits - 1  # fits
+        self.assertEqual(create_tape(16, 4).itemsize, 2)
+        with self.assertRaises(ValueError):
+            create_tape(65, 4)
+
+    def test_fit_tape(self):
+        tape = bytearray(b"\x01\x02\x03")
+        self.assertEqual(fit_tape(tape, 8, 5, "grow"), 0)
+        self.assertGreater(len(tape), 5)
+        self.assertEqual(tape[:3], b"\x01\x02\x03")
+
+        tape = bytearray(b"\x01\x02\x03")
+        shift = fit_tape(tape, 8, -2, "grow")
+        self.assertGreaterEqual(shift, 2)
+        self.assertEqual(tape[shift:shift + 3], b"\x01\x02\x03")
+        self.assertEqual(tape[:shift], bytes(shift))
+
+        tape = bytearray(b"\x01\x02\x03")
+        self.assertEqual(fit_tape(tape, 8, 3, "grow", exact=True), 0)
+        self.assertEqual(tape, b"\x01\x02\x03\x00")
+        self.assertEqual(fit_tape(tape, 8, -1, "grow", exact=True), 1)
+        self.assertEqual(tape, b"\x00\x01\x02\x03\x00")
+
+        with self.assertRaises(IndexError):
+            fit_tape(bytearray(3), 8, -1, "error")
+
+    def test_wrapping(self):
+        for bits in [8, 16, 32, 64]:
+            with self.subTest(bits=bits):
+                vm = VM()
+                vm.run(Program("->+++[-<->]", bits))
+                self.assertEqual(vm.tape[vm.origin], 2 ** bits - 4)
+
+    def test_negative_pointer(self):
+        for program in ["<+", "+[<]", "+[-<+>]<[->>+<<]", "<<<[-]"]:
+            with self.subTest(program):
+                vm = VM()
+                vm.run(Program(program))
+                self.assertLess(vm.data_pointer - vm.origin, 0)
+                with self.assertRaises(IndexError):
+                    VM("error").run(Program(program))
+        VM("error").run(Program("<+->+<>"))  # folded away, see VM
+
+    def test_random_programs(self):
+        # the tape grows to both sides like the reference interpreter's
+        generator = random.Random(5)
+        for _ in range(300):
+            bits = generator.choice([8, 16, 32, 64])
+            program = get_random_program(generator, generator.randint(1, 40), "+-<,[]+-<<<>[-]")
+            try:
+                expected = run_reference(program, b"\xff\x80\x07", bits, max_commands=10000)
+            except TooManyCommands:
+                continue
+            with self.subTest(program=program, bits=bits):
+                self.assertEqual(run_engine(program, b"\xff\x80\x07", bits), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from reference import EXAMPLES_DIRECTORY, TooManyCommands, run_reference, get_vm_state, get_random_program
+import Engine
+from Engine import VM, Program, Snapshot, ResourceLimitExceeded, brainfuck, load_program, get_error_message
+
+
+class VMTest(unittest.TestCase):
+    def test_reuse(self):
+        # a prepared program runs any amount of times, each time on a new tape
+        generator = random.Random(12)
+        for _ in range(200):
+            program = get_random_program(generator, generator.randint(1, 40))
+            prepared = Program(program)
+            vm = VM()
+            for input in [b"", b"\x01\x02", b"\x05\x04\x03\x02"]:
+                try:
+                    expected = run_reference(program, input, max_commands=10000)
+                except TooManyCommands:
+                    continue
+                with self.subTest(program=program, input=input):
+                    self.assertEqual(vm.run(prepared, input), expected[0])
+                    self.assertEqual(get_vm_state(vm), expected[1])
+                    self.assertEqual(VM().run(prepared, io.BytesIO(input)), expected[0])
+
+    def test_state(self):
+        vm = VM()
+        prepared = Program(",>,>,<.")
+        self.assertEqual(vm.run(prepared, b"abcd"), b"b")
+        self.assertIs(vm.program, prepared)
+        self.assertEqual((vm.data_pointer - vm.origin, vm.input_offset, vm.output_size), (1, 3, 1))
+        self.assertEqual(vm.instruction_pointer, len(prepared.bytecode))
+        self.assertEqual(vm.tape[vm.origin:vm.origin + 3], b"abc")
+
+    def test_output_stream(self):
+        output = io.BytesIO()
+        self.assertIsNone(VM().run(Program("++++++[>+++++++<-]>."), output=output))
+        self.assertEqual(output.getvalue(), b"*")
+
+    def test_load_program(self):
+        program = load_program(os.path.join(EXAMPLES_DIRECTORY, "pow.code"))
+        with open(os.path.join(EXAMPLES_DIRECTORY, "pow.bf"), "rt") as f:
+            expected = run_reference(f.read())[0]
+        self.assertEqual(VM().run(program), expected)
+        self.assertEqual(VM().run(load_program(os.path.join(EXAMPLES_DIRECTORY, "pow.bf"))), expected)
+
+    def test_brainfuck(self):
+        output = io.BytesIO()
+        self.assertIsNone(brainfuck(",[.,]", output=output, input=b"abc"))
+        self.assertEqual(output.getvalue(), b"abc")
+        stats = brainfuck(",[.,]", output=io.BytesIO(), input=b"abc", stats=True)
+        self.assertEqual(stats["commands"], 2 + 3 * 3)
+
+    def test_error_message(self):
+        vm = VM(max_steps=10)
+        try:
+            vm.run(Program("-[-.]"), output=io.BytesIO())
+        except ResourceLimitExceeded as error:
+            message = get_error_message(error)
+        self.assertRegex(message, r"^Brainfuck: executed more than 10 instructions \(after \d+ steps, at instruction "
+                                  r"\d+, data pointer \d+\)$")
+        self.assertEqual(get_error_message(IndexError("left")), "IndexError: left")
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_round_trip(self):
+        for bits in [8, 16, 32, 64]:
+            tape = Engine.create_tape(bits, 100)
+            tape[3] = 2 ** bits - 1
+            tape[50] = 7
+            snapshot = Snapshot("ab" * 32, bits, tape, 60, 2, 17, 5, 9)
+            with self.subTest(bits=bits):
+                loaded = Snapshot.from_bytes(snapshot.to_bytes())
+                self.assertEqual(vars(loaded), vars(snapshot))
+                self.assertEqual(type(loaded.tape), type(tape))
+                self.assertLess(len(snapshot.to_bytes()), Snapshot.HEADER.size + 50)  # compressed
+
+    def test_resume(self):
+        # a program stopped by the steps limit resumes where it stopped, in another VM
+        generator = random.Random(14)
+        resumed = 0
+        for _ in range(500):
+            program = get_random_program(generator, generator.randint(10, 60), "+-<>,.[]+-<>[]")
+            input = bytes(generator.randrange(1, 256) for _ in range(8))
+            try:
+                expected = run_reference(program, input, max_commands=20000)
+            except TooManyCommands:
+                continue
+            prepared = Program(program)
+            vm = VM(max_steps=generator.randint(1, 20))
+            output = io.BytesIO()
+            try:
+                vm.run(prepared, input, output)
+                continue  # ended before the limit
+            except ResourceLimitExceeded:
+                pass
+            resumed += 1
+            with self.subTest(program=program):
+                snapshot = Snapshot.from_bytes(vm.snapshot().to_bytes())
+                vm = VM()
+                vm.run(Program(program), input[snapshot.input_offset:], output, snapshot=snapshot)
+                self.assertEqual((output.getvalue(), get_vm_state(vm)), expected)
+        self.assertGreater(resumed, 20)
+
+    def test_save(self):
+        vm = VM(max_steps=2)
+        prepared = Program("+++++[>+++++[>+<-]<-],[.,]")
+        with self.assertRaises(ResourceLimitExceeded):
+            vm.run(prepared, b"abc")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot")
+            vm.snapshot().save(path)
+            snapshot = Snapshot.load(path)
+        self.assertEqual((snapshot.input_offset, snapshot.output_size), (0, 0))
+        vm = VM()
+        self.assertEqual(vm.run(prepared, b"abc", snapshot=snapshot), b"abc")
+        self.assertEqual(get_vm_state(vm), ({2: 25}, 0))
+
+    def test_errors(self):
+        vm = VM(max_steps=100)
+        with self.assertRaises(ResourceLimitExceeded):
+            vm.run(Program("-[>-[-]<-]+[.+]"), output=io.BytesIO())
+        data = vm.snapshot().to_bytes()
+
+        with self.assertRaisesRegex(ValueError, "another program"):
+            VM().run(Program("+"), snapshot=Snapshot.from_bytes(data))
+        with self.assertRaisesRegex(ValueError, "another version of the interpreter"):
+            Snapshot.from_bytes(b"BFSNAP1\n" + data[8:])
+        version = Snapshot.HEADER.unpack_from(data)[1]
+        with self.assertRaisesRegex(ValueError, "another version of the interpreter"):
+            Snapshot.from_bytes(data[:8] + (version + 1).to_bytes(4, "little") + data[12:])
+        with self.assertRaisesRegex(ValueError, "not a snapshot"):
+            Snapshot.from_bytes(b"#!/bin/sh\n" + data)
+        with self.assertRaisesRegex(ValueError, "stats"):
+            VM().run(Program("-[>-[-]<-]+[.+]"), snapshot=Snapshot.from_bytes(data), stats=True)
+        vm = VM()
+        vm.run(Program("+."), stats=True)
+        with self.assertRaisesRegex(ValueError, "stats"):
+            vm.snapshot()
+        with self.assertRaisesRegex(ValueError, "no run"):
+            VM().snapshot()
+
+
+class ExecuteTest(unittest.TestCase):
+    def run_interactively(self, vm, execution, input):
+        # runs the program to its end, giving it the input a byte at a time when it waits for it
+        output = b""
+        try:
+            chunk = next(execution)
+            while True:
+                output += chunk
+                if vm.waiting_for_input:
+                    chunk = execution.send(input[:1])
+                    input = input[1:]
+                else:
+                    chunk = next(execution)
+        except StopIteration:
+            return output
+
+    def test_input(self):
+        vm = VM()
+        execution = vm.execute(Program(",[.,]"))
+        self.assertEqual(next(execution), b"")
+        self.assertTrue(vm.waiting_for_input)
+        self.assertEqual(execution.send(b"ab"), b"ab")
+        self.assertEqual(execution.send(b"c"), b"c")
+        self.assertEqual(vm.input_offset, 3)
+        with self.assertRaises(StopIteration):
+            execution.send(b"")  # ends the input
+        self.assertFalse(vm.waiting_for_input)
+
+    def test_slices(self):
+        program = "++++++++[>++++++++++++++++<-]>[>" + "+" * 200 + "[.-]<-]"
+        vm = VM()
+        chunks = list(vm.execute(Program(program), slice_steps=1000))
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual(b"".join(chunks), run_reference(program)[0])
+        self.assertGreater(vm.steps, 1000 * len(chunks) // 2)
+
+    def test_random_programs(self):
+        generator = random.Random(15)
+        for _ in range(300):
+            program = get_random_program(generator, generator.randint(1, 50))
+            input = bytes(generator.randrange(1, 256) for _ in range(generator.randint(0, 4)))
+            try:
+                expected = run_reference(program, input, max_commands=10000)
+            except TooManyCommands:
+                continue
+            with self.subTest(program=program, input=input):
+                vm = VM()
+                output = self.run_interactively(vm, vm.execute(Program(program), slice_steps=generator.randint(1, 10)),
+                                                input)
+                self.assertEqual((output, get_vm_state(vm)), expected)
+
+    def test_limits(self):
+        # the limits are of the whole run, not of a slice
+        vm = VM(max_steps=5000)
+        chunks = list()
+        with self.assertRaises(ResourceLimitExceeded):
+            for chunk in vm.execute(Program("-[>-[.-]<-]"), slice_steps=1000):
+                chunks.append(chunk)
+        self.assertGreaterEqual(len(chunks), 5)
+        self.assertGreater(vm.steps, 4000)
+        self.assertEqual(vm.output_size, len(b"".join(chunks)))
+
+    def test_snapshot(self):
+        program = Program("+++++[>+++++[>+<-]<-],[.,]>>.")
+        vm = VM()
+        execution = vm.execute(program, slice_steps=3)
+        next(execution)
+        execution.close()  # stops the program, its state is kept
+        snapshot = Snapshot.from_bytes(vm.snapshot().to_bytes())
+        vm = VM()
+        self.assertEqual(self.run_interactively(vm, vm.execute(program, snapshot=snapshot), b"xy"), b"xy\x19")
+        self.assertEqual(get_vm_state(vm), ({2: 25}, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()